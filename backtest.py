@@ -0,0 +1,116 @@
+# backtest.py
+
+import numpy as np
+import pandas as pd
+
+from indicators import calculate_indicators
+from signal_generator import generate_signals
+
+
+def signals_to_positions(final_signal):
+    """Map final signals ('Buy'/'Sell' or int8 codes) to target positions: +1 for Buy, -1 for Sell, 0 otherwise."""
+    final_signal = np.asarray(final_signal)
+    if final_signal.dtype != object:
+        return np.nan_to_num(final_signal).astype(np.int8)
+    return np.where(final_signal == 'Buy', 1, np.where(final_signal == 'Sell', -1, 0)).astype(np.int8)
+
+
+def simulate_trades(open_prices, close_prices, signal_positions, lot_size=0.1, contract_size=1.0,
+                    spread=0.0, slippage=0.0):
+    """
+    Vectorized position accounting for market orders filled at the next bar's open.
+    The signal of bar t sets the position held from the open of bar t + 1 to the open of bar t + 2,
+    the last bar is marked at its close. Every change of position pays half the spread plus the
+    slippage per unit traded, like a place_trade fill at ask/bid within the allowed deviation.
+    :param spread: Spread in price units, scalar or one value per bar.
+    :param slippage: Slippage in price units per fill.
+    :return: DataFrame with position, gross_pnl, costs, pnl, equity and drawdown per bar.
+    """
+    open_prices = np.asarray(open_prices, dtype=float)
+    close_prices = np.asarray(close_prices, dtype=float)
+    units = lot_size * contract_size
+
+    position = np.zeros(len(open_prices), dtype=np.int8)
+    position[1:] = signal_positions[:-1]
+    next_open = np.append(open_prices[1:], close_prices[-1:])
+    gross_pnl = position * (next_open - open_prices) * units
+
+    traded = np.abs(np.diff(position, prepend=0))
+    costs = traded * (np.asarray(spread, dtype=float) / 2 + slippage) * units
+    pnl = gross_pnl - costs
+    equity = np.cumsum(pnl)
+    drawdown = equity - np.maximum.accumulate(np.maximum(equity, 0))
+    return pd.DataFrame({
+        'position': position,
+        'gross_pnl': gross_pnl,
+        'costs': costs,
+        'pnl': pnl,
+        'equity': equity,
+        'drawdown': drawdown,
+    })
+
+
+def trade_statistics(ledger):
+    """
+    Summarize a ledger from simulate_trades. A trade is a run of bars with the same non-zero position.
+    :return: Dictionary with PnL, drawdown and per-trade statistics.
+    """
+    position = ledger['position'].to_numpy()
+    pnl = ledger['pnl'].to_numpy()
+    trade_id = np.cumsum(np.diff(position, prepend=0) != 0)
+    in_trade = position != 0
+    trade_pnl = np.bincount(trade_id[in_trade], weights=pnl[in_trade])
+    trade_pnl = trade_pnl[np.unique(trade_id[in_trade])] if in_trade.any() else trade_pnl[:0]
+    wins = trade_pnl[trade_pnl > 0]
+    losses = trade_pnl[trade_pnl < 0]
+    return {
+        'total_pnl': float(pnl.sum()),
+        'total_costs': float(ledger['costs'].sum()),
+        'max_drawdown': float(ledger['drawdown'].min()) if len(ledger) else 0.0,
+        'num_trades': int(len(trade_pnl)),
+        'win_rate': float(len(wins) / len(trade_pnl)) if len(trade_pnl) else 0.0,
+        'avg_trade': float(trade_pnl.mean()) if len(trade_pnl) else 0.0,
+        'profit_factor': float(wins.sum() / -losses.sum()) if len(losses) else float('inf'),
+    }
+
+
+def run_backtest(df, symbol='Unknown', lot_size=0.1, point=0.01, contract_size=1.0, deviation=10,
+                 slippage_points=0):
+    """
+    Replay MT5 history through calculate_indicators and generate_signals and simulate the trades.
+    :param df: M1 history as returned by data_loader.fetch_mt5_data (indexed by time, with an
+        optional MT5 'spread' column in points).
+    :param point: Price of one point for the symbol.
+    :param slippage_points: Assumed slippage per fill, capped at the order deviation.
+    :return: (ledger DataFrame indexed by time with the int8 signal per bar, statistics dictionary)
+    """
+    frame = df.reset_index()
+    frame['Symbol'] = symbol
+    df_indicators = calculate_indicators(frame.copy())
+    df_signals = generate_signals(df_indicators.copy(), align='time', encoding='int8')
+    # Only keep signals for bars that exist in the history (the resampled grid also has gaps)
+    final_signal = df_signals.set_index('time')['final_signal'].reindex(df.index).fillna(0).astype(np.int8)
+
+    spread = df['spread'].to_numpy() * point if 'spread' in df.columns else 0.0
+    slippage = min(slippage_points, deviation) * point
+    ledger = simulate_trades(df['open'], df['close'], signals_to_positions(final_signal),
+                             lot_size=lot_size, contract_size=contract_size, spread=spread, slippage=slippage)
+    ledger.index = df.index
+    ledger.insert(0, 'final_signal', final_signal.to_numpy())
+    return ledger, trade_statistics(ledger)
+
+
+if __name__ == "__main__":
+    from config import MT5_SYMBOLS, HISTORICAL_DATA_COUNT
+    from data_loader import connect_mt5, fetch_mt5_data, history_cache
+    from mt5_backend import mt5
+
+    if connect_mt5():
+        for symbol in MT5_SYMBOLS:
+            df = fetch_mt5_data(symbol, mt5.TIMEFRAME_M1, HISTORICAL_DATA_COUNT, cache=history_cache)
+            if df is None or df.empty:
+                continue
+            info = mt5.symbol_info(symbol)
+            point = info.point if info is not None else 0.01
+            _, stats = run_backtest(df, symbol, point=point)
+            print(f"{symbol}: {stats}")
@@ -0,0 +1,179 @@
+# bar_builder.py
+
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class BarBuilder:
+    """
+    Incrementally aggregates ticks into OHLC bars of a fixed frequency.
+    Each tick only touches the currently open bar, so the per-tick cost is constant
+    and memory is bounded by max_bars closed bars.
+    """
+
+    def __init__(self, frequency='1min', max_bars=10000):
+        self.frequency = frequency
+        self.period = int(pd.Timedelta(frequency).total_seconds())
+        self.bars = deque(maxlen=max_bars)  # Closed bars as (start_epoch, open, high, low, close)
+        self.current = None  # Open bar as [start_epoch, open, high, low, close]
+        self.tick_count = 0
+        self.history_bars = 0  # Bars loaded by seed()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.bars) + (1 if self.current is not None else 0)
+
+    def update(self, epoch, quote):
+        """
+        Add a single tick to the open bar.
+        :return: List of bars closed by this tick (empty unless a new bar was started).
+        """
+        epoch = int(epoch)
+        quote = float(quote)
+        start = epoch - epoch % self.period
+        with self._lock:
+            bar = self.current
+            if bar is None:
+                self.current = [start, quote, quote, quote, quote]
+                self.tick_count += 1
+                return []
+            if start == bar[0]:
+                if quote > bar[2]:
+                    bar[2] = quote
+                elif quote < bar[3]:
+                    bar[3] = quote
+                bar[4] = quote
+                self.tick_count += 1
+                return []
+            if start < bar[0]:
+                # Late tick for a bar that is already closed, ignore it
+                return []
+            closed = tuple(bar)
+            self.bars.append(closed)
+            self.current = [start, quote, quote, quote, quote]
+            self.tick_count += 1
+            return [closed]
+
+    def _history_rows(self, history):
+        times = history['time'] if 'time' in history.columns else history.index
+        starts = np.asarray(times, dtype='datetime64[s]').astype(np.int64)
+        starts = starts - starts % self.period
+        return list(zip(starts.tolist(), *(history[column].astype(float).tolist()
+                                           for column in ('open', 'high', 'low', 'close'))))
+
+    def seed(self, history):
+        """
+        Load historical bars in front of the streamed ticks, e.g. MT5 history from data_loader.fetch_mt5_data.
+        The last historical bar becomes the open bar, so ticks inside it extend it and older ticks are
+        dropped as already covered. Where bars were already built from ticks, those win over history.
+        :param history: DataFrame indexed by bar time (or with a 'time' column) with open/high/low/close.
+        :return: Number of historical bars loaded.
+        """
+        rows = self._history_rows(history)
+        with self._lock:
+            if self.current is not None:
+                first_start = self.bars[0][0] if self.bars else self.current[0]
+                rows = [row for row in rows if row[0] < first_start]
+                loaded = len(rows)
+                rows.extend(self.bars)
+            else:
+                loaded = len(rows)
+                if rows:
+                    self.current = list(rows.pop())
+            self.bars = deque(rows, maxlen=max(self.bars.maxlen, len(rows)))
+            self.history_bars = loaded
+        return loaded
+
+    def catch_up(self, history):
+        """
+        Fill the gap after a restore: the open bar is replaced by its historical version (which also
+        has the ticks missed while down), newer historical bars are appended and the last one becomes
+        the open bar. Without an open bar this is the same as seed().
+        :param history: DataFrame as for seed(), covering at least the open bar.
+        :return: List of (start_epoch, open, high, low, close) rows applied, oldest first.
+        """
+        rows = self._history_rows(history)
+        with self._lock:
+            if self.current is not None:
+                rows = [row for row in rows if row[0] >= self.current[0]]
+                if rows:
+                    if rows[0][0] > self.current[0]:
+                        self.bars.append(tuple(self.current))
+                    self.bars.extend(rows[:-1])
+                    self.current = list(rows[-1])
+                return rows
+        self.seed(history)
+        return rows
+
+    def rows_since(self, start=None):
+        """
+        Bars starting at or after `start` (all bars if None), including the open bar.
+        :return: List of (start_epoch, open, high, low, close) rows, oldest first.
+        """
+        with self._lock:
+            if start is None:
+                rows = list(self.bars)
+            else:
+                # Walk back from the newest bar, so a call between two cycles only touches the new bars
+                rows = []
+                for row in reversed(self.bars):
+                    if row[0] < start:
+                        break
+                    rows.append(row)
+                rows.reverse()
+            if self.current is not None and (start is None or self.current[0] >= start):
+                rows.append(tuple(self.current))
+        return rows
+
+    def get_state(self):
+        """Closed bars, open bar and counters as NumPy arrays, for snapshot files."""
+        with self._lock:
+            bars = np.array(self.bars, dtype=float).reshape(-1, 5)
+            current = np.array(self.current if self.current is not None else [], dtype=float)
+            counters = np.array([self.tick_count, self.history_bars, self.period], dtype=np.int64)
+        return {'bars': bars, 'current': current, 'counters': counters}
+
+    def set_state(self, state):
+        """Restore bars saved by get_state; bar times are whole seconds, so the float round trip is exact."""
+        tick_count, history_bars, period = np.asarray(state['counters']).tolist()
+        if period != self.period:
+            raise ValueError(f"Saved bars have a period of {period}s, not {self.period}s.")
+        rows = [(int(row[0]),) + tuple(row[1:]) for row in np.asarray(state['bars']).tolist()]
+        current = np.asarray(state['current']).tolist()
+        with self._lock:
+            self.bars = deque(rows, maxlen=max(self.bars.maxlen, len(rows)))
+            self.current = [int(current[0])] + current[1:] if current else None
+            self.tick_count = tick_count
+            self.history_bars = history_bars
+
+    def update_many(self, tick_list):
+        """
+        Add a batch of tick dictionaries (each containing 'epoch' and 'quote').
+        :return: List of bars closed by the batch.
+        """
+        closed = []
+        for tick in tick_list:
+            closed.extend(self.update(tick['epoch'], tick['quote']))
+        return closed
+
+    def to_frame(self, include_open=True):
+        """
+        Return the bars as a DataFrame in the same shape as utils.process_tick_data:
+        columns time, open, high, low, close, with empty bars as NaN rows.
+        """
+        with self._lock:
+            rows = list(self.bars)
+            if include_open and self.current is not None:
+                rows.append(tuple(self.current))
+        if not rows:
+            return None
+        df = pd.DataFrame(rows, columns=['time', 'open', 'high', 'low', 'close'])
+        df['time'] = pd.to_datetime(df['time'], unit='s')
+        df.set_index('time', inplace=True)
+        # Resampling emits a NaN row for every interval without ticks, mirror that
+        df = df.asfreq(self.frequency)
+        df.index.name = 'time'
+        return df.reset_index()
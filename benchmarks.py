@@ -0,0 +1,296 @@
+# benchmarks.py
+#
+# Offline benchmark harness for the data and signal pipeline.
+#
+#   python benchmarks.py                          # 1k..1M bars, 1 and 4 symbols, JSON to stdout
+#   python benchmarks.py --full -o results.json   # include 10M bars
+#   python benchmarks.py -o new.json --compare old.json
+#
+# MetaTrader5 is replaced by the fake backend from mt5_backend and nothing connects to the
+# Deriv feed, so no terminal, network connection or credentials are needed.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+FULL_SIZES = DEFAULT_SIZES + (10000000,)
+DEFAULT_SYMBOL_COUNTS = (1, 4)
+LIST_INPUT_MAX = 1000000  # Larger Python-level tick lists do not fit in memory comfortably
+START_EPOCH = 1704067200  # 2024-01-01 00:00:00 UTC
+
+
+def install_offline_stubs():
+    """Select the fake MT5 backend; config.py is only read by functions the benchmarks do not call."""
+    from mt5_backend import FakeMT5, set_backend
+    set_backend(FakeMT5())
+
+
+# --- Synthetic data ---
+def synthetic_ticks(count, seed=0, start_epoch=START_EPOCH, interval=2.0, start_price=1000.0):
+    """
+    Random-walk ticks like a Deriv volatility index stream.
+    :param interval: Mean seconds between ticks.
+    :return: Dictionary of NumPy arrays: epoch (int64), quote, bid, ask.
+    """
+    rng = np.random.default_rng(seed)
+    epoch = start_epoch + np.cumsum(rng.exponential(interval, size=count)).astype(np.int64)
+    quote = start_price + np.cumsum(rng.normal(scale=0.1, size=count))
+    spread = rng.uniform(0.01, 0.05, size=count)
+    return {'epoch': epoch, 'quote': quote, 'bid': quote - spread / 2, 'ask': quote + spread / 2}
+
+
+def ticks_to_list(ticks):
+    """Tick arrays as the list of tick dictionaries the WebSocket handler used to accumulate."""
+    return [{'epoch': int(e), 'quote': float(q), 'bid': float(b), 'ask': float(a)}
+            for e, q, b, a in zip(ticks['epoch'], ticks['quote'], ticks['bid'], ticks['ask'])]
+
+
+def synthetic_ohlc(num_bars, seed=0, frequency='1min', start='2024-01-01', symbol='R_75'):
+    """Random-walk OHLC bars with a 'time' column, shaped like the output of process_tick_data."""
+    rng = np.random.default_rng(seed)
+    close = 1000.0 + np.cumsum(rng.normal(size=num_bars))
+    open_prices = np.r_[close[:1], close[:-1]] + rng.normal(scale=0.2, size=num_bars)
+    high = np.maximum(open_prices, close) + rng.exponential(0.5, size=num_bars)
+    low = np.minimum(open_prices, close) - rng.exponential(0.5, size=num_bars)
+    return pd.DataFrame({
+        'time': pd.date_range(start, periods=num_bars, freq=frequency),
+        'open': open_prices,
+        'high': high,
+        'low': low,
+        'close': close,
+        'Symbol': symbol,
+    })
+
+
+# --- Benchmarks ---
+# Each benchmark takes (size, num_symbols) and returns (setup, run): setup() builds the inputs
+# outside the timed region and run(inputs) is what gets timed.
+
+def bench_process_tick_data_list(size, num_symbols):
+    from utils import process_tick_data
+
+    def setup():
+        return [ticks_to_list(synthetic_ticks(size, seed=i)) for i in range(num_symbols)]
+
+    def run(inputs):
+        for tick_list in inputs:
+            process_tick_data(tick_list)
+    return setup, run
+
+
+def bench_process_tick_data_store(size, num_symbols):
+    from tick_store import TickStore
+    from utils import process_tick_data
+
+    def setup():
+        stores = []
+        for i in range(num_symbols):
+            ticks = synthetic_ticks(size, seed=i)
+            store = TickStore(capacity=size)
+            for e, q, b, a in zip(ticks['epoch'].tolist(), ticks['quote'].tolist(),
+                                  ticks['bid'].tolist(), ticks['ask'].tolist()):
+                store.append(e, q, b, a)
+            stores.append(store)
+        return stores
+
+    def run(inputs):
+        for store in inputs:
+            process_tick_data(store)
+    return setup, run
+
+
+def bench_store_tick(size, num_symbols):
+    """Live ingestion: tick store append, incremental bar building and online indicators per tick."""
+    import data_loader
+
+    symbols = [f'BENCH_{i}' for i in range(num_symbols)]
+
+    def setup():
+        columns = []
+        for i, symbol in enumerate(symbols):
+            ticks = synthetic_ticks(size, seed=i)
+            columns.append(zip([symbol] * size, ticks['epoch'].tolist(), ticks['quote'].tolist(),
+                               ticks['bid'].tolist(), ticks['ask'].tolist()))
+        # Interleave the symbols the way a multiplexed feed delivers them
+        return [tick for ticks_at_once in zip(*columns) for tick in ticks_at_once]
+
+    def run(inputs):
+        # Fresh state per run, otherwise repeated runs would only replay late ticks
+        for symbol in symbols:
+            data_loader.all_ticks.pop(symbol, None)
+            data_loader.register_symbol(symbol)
+        store_tick = data_loader.store_tick
+        for tick in inputs:
+            store_tick(*tick)
+    return setup, run
+
+
+def bench_calculate_indicators(size, num_symbols):
+    from indicators import calculate_indicators
+
+    def setup():
+        return [synthetic_ohlc(size, seed=i) for i in range(num_symbols)]
+
+    def run(inputs):
+        for df in inputs:
+            calculate_indicators(df.copy())
+    return setup, run
+
+
+def _indicator_frames(size, num_symbols):
+    from indicators import calculate_indicators
+    return [calculate_indicators(synthetic_ohlc(size, seed=i)) for i in range(num_symbols)]
+
+
+def bench_generate_weighted_signals(size, num_symbols):
+    from signal_generator import generate_weighted_signals
+
+    def run(inputs):
+        for df in inputs:
+            generate_weighted_signals(df.copy())
+    return (lambda: _indicator_frames(size, num_symbols)), run
+
+
+def _bench_generate_signals(align, encoding='str'):
+    def bench(size, num_symbols):
+        from signal_generator import generate_signals
+
+        def run(inputs):
+            for df in inputs:
+                generate_signals(df.copy(), align=align, encoding=encoding)
+        return (lambda: _indicator_frames(size, num_symbols)), run
+    return bench
+
+
+BENCHMARKS = {
+    'process_tick_data[list]': (bench_process_tick_data_list, LIST_INPUT_MAX),
+    'process_tick_data[store]': (bench_process_tick_data_store, None),
+    'store_tick': (bench_store_tick, LIST_INPUT_MAX),
+    'calculate_indicators': (bench_calculate_indicators, None),
+    'generate_weighted_signals': (bench_generate_weighted_signals, None),
+    'generate_signals[position]': (_bench_generate_signals('position'), None),
+    'generate_signals[time]': (_bench_generate_signals('time'), None),
+    'generate_signals[time,int8]': (_bench_generate_signals('time', 'int8'), None),
+}
+
+
+def run_benchmark(name, size, num_symbols, repeat=3):
+    """
+    Time one benchmark. The run is repeated `repeat` times on the same inputs.
+    :return: Result dictionary with the timings in seconds and throughput in rows per second.
+    """
+    factory, _ = BENCHMARKS[name]
+    setup, run = factory(size, num_symbols)
+    inputs = setup()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(inputs)
+        durations.append(time.perf_counter() - start)
+    best = min(durations)
+    rows = size * num_symbols
+    return {
+        'benchmark': name,
+        'size': size,
+        'symbols': num_symbols,
+        'repeat': repeat,
+        'best': best,
+        'median': statistics.median(durations),
+        'mean': statistics.fmean(durations),
+        'per_symbol': best / num_symbols,  # Latency of one symbol's call
+        'per_row': best / rows,
+        'rows_per_second': rows / best if best > 0 else float('inf'),
+    }
+
+
+def environment_info():
+    """Versions and commit the results were produced with."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        import talib
+        talib_version = talib.__version__
+    except (ImportError, AttributeError):
+        talib_version = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'talib': talib_version,
+    }
+
+
+def compare_results(current, baseline):
+    """
+    Match results by (benchmark, size, symbols) and compute the ratio of best times.
+    :return: List of (key, baseline best, current best, ratio) with ratio > 1 meaning slower now.
+    """
+    baseline_best = {(r['benchmark'], r['size'], r['symbols']): r['best'] for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        key = (r['benchmark'], r['size'], r['symbols'])
+        if key in baseline_best:
+            rows.append((key, baseline_best[key], r['best'], r['best'] / baseline_best[key]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for tick ingestion, bars and signals.")
+    parser.add_argument('--sizes', type=int, nargs='+', help="History sizes (ticks or bars) to run")
+    parser.add_argument('--full', action='store_true', help="Include 10M bars in the default sizes")
+    parser.add_argument('--symbols', type=int, nargs='+', default=list(DEFAULT_SYMBOL_COUNTS),
+                        help="Symbol counts to run")
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', help="Write the JSON results to this file instead of stdout")
+    parser.add_argument('--compare', help="Earlier JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    install_offline_stubs()
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    results = []
+    for name in args.benchmarks:
+        max_size = BENCHMARKS[name][1]
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            for num_symbols in args.symbols:
+                result = run_benchmark(name, size, num_symbols, repeat=args.repeat)
+                results.append(result)
+                print(f"{name:<30} size={size:<9} symbols={num_symbols:<3} best={result['best'] * 1000:10.2f}ms "
+                      f"{result['rows_per_second']:14,.0f} rows/s", file=sys.stderr)
+
+    report = {'environment': environment_info(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for (name, size, num_symbols), old, new, ratio in compare_results(report, baseline):
+            print(f"{name:<30} size={size:<9} symbols={num_symbols:<3} {old * 1000:10.2f}ms -> {new * 1000:10.2f}ms "
+                  f"x{ratio:.2f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
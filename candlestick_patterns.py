@@ -0,0 +1,115 @@
+# candlestick_patterns.py
+
+import numpy as np
+
+# Pattern bits in the uint32 mask returned by detect_patterns
+DOJI = 1 << 0
+BULLISH_ENGULFING = 1 << 1
+BEARISH_ENGULFING = 1 << 2
+BULLISH_PIN_BAR = 1 << 3
+BEARISH_PIN_BAR = 1 << 4
+HAMMER = 1 << 5
+SHOOTING_STAR = 1 << 6
+BULLISH_HARAMI = 1 << 7
+BEARISH_HARAMI = 1 << 8
+MORNING_STAR = 1 << 9
+EVENING_STAR = 1 << 10
+
+PATTERN_NAMES = {
+    DOJI: 'Doji',
+    BULLISH_ENGULFING: 'Bullish_Engulfing',
+    BEARISH_ENGULFING: 'Bearish_Engulfing',
+    BULLISH_PIN_BAR: 'Bullish_Pin_Bar',
+    BEARISH_PIN_BAR: 'Bearish_Pin_Bar',
+    HAMMER: 'Hammer',
+    SHOOTING_STAR: 'Shooting_Star',
+    BULLISH_HARAMI: 'Bullish_Harami',
+    BEARISH_HARAMI: 'Bearish_Harami',
+    MORNING_STAR: 'Morning_Star',
+    EVENING_STAR: 'Evening_Star',
+}
+
+# Number of bars a pattern can look at (the current bar plus two previous ones)
+LOOKBACK = 3
+
+
+def _shift(values, periods):
+    """Shift an array forward by `periods`, filling the start with NaN (like Series.shift)."""
+    shifted = np.empty_like(values)
+    shifted[:periods] = np.nan
+    shifted[periods:] = values[:-periods]
+    return shifted
+
+
+def detect_patterns(open_prices, high, low, close):
+    """
+    Detects all candlestick patterns for every bar in one pass over raw price arrays.
+    Doji, engulfing and pin bar use the same rules as signal_generator.identify_candlestick_patterns;
+    bars without enough history or with missing prices match nothing.
+    :return: uint32 array with the pattern bits set for each bar.
+    """
+    o = np.asarray(open_prices, dtype=np.float64)
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    mask = np.zeros(len(c), dtype=np.uint32)
+    if len(c) == 0:
+        return mask
+
+    body = np.abs(c - o)
+    upper_shadow = h - np.fmax(c, o)
+    lower_shadow = np.fmin(c, o) - l
+    bullish = c > o
+    bearish = c < o
+
+    o1, c1 = _shift(o, 1), _shift(c, 1)
+    body1 = np.abs(c1 - o1)
+    bullish1 = c1 > o1
+    bearish1 = c1 < o1
+
+    bullish_pin = (lower_shadow > body * 2) & (upper_shadow < body)
+    bearish_pin = (upper_shadow > body * 2) & (lower_shadow < body)
+
+    with np.errstate(invalid='ignore'):
+        mask |= (body < (h - l) * 0.1) * np.uint32(DOJI)
+        mask |= (bearish1 & bullish & (c > o1) & (o < c1)) * np.uint32(BULLISH_ENGULFING)
+        mask |= (bullish1 & bearish & (o > c1) & (c < o1)) * np.uint32(BEARISH_ENGULFING)
+        mask |= bullish_pin * np.uint32(BULLISH_PIN_BAR)
+        mask |= bearish_pin * np.uint32(BEARISH_PIN_BAR)
+        # Hammer / shooting star: pin bar shapes that follow a bar moving the other way
+        mask |= (bullish_pin & bearish1) * np.uint32(HAMMER)
+        mask |= (bearish_pin & bullish1) * np.uint32(SHOOTING_STAR)
+        # Harami: the body sits inside the previous, opposite coloured body
+        mask |= (bearish1 & bullish & (o > c1) & (c < o1)) * np.uint32(BULLISH_HARAMI)
+        mask |= (bullish1 & bearish & (o < c1) & (c > o1)) * np.uint32(BEARISH_HARAMI)
+
+        # Morning / evening star: strong bar, small-bodied bar, then a close past the first body's midpoint
+        o2, c2, h2, l2 = _shift(o, 2), _shift(c, 2), _shift(h, 2), _shift(l, 2)
+        body2 = np.abs(c2 - o2)
+        strong2 = body2 > (h2 - l2) * 0.5
+        small1 = body1 < body2 * 0.3
+        midpoint2 = (o2 + c2) / 2
+        mask |= ((c2 < o2) & strong2 & small1 & bullish & (c > midpoint2)) * np.uint32(MORNING_STAR)
+        mask |= ((c2 > o2) & strong2 & small1 & bearish & (c < midpoint2)) * np.uint32(EVENING_STAR)
+    return mask
+
+
+def detect_latest(open_prices, high, low, close):
+    """
+    Pattern mask of the last bar only, looking at no more than LOOKBACK bars, for the live loop.
+    :return: uint32 mask (0 for empty input).
+    """
+    if len(close) == 0:
+        return np.uint32(0)
+    window = [np.asarray(values)[-LOOKBACK:] for values in (open_prices, high, low, close)]
+    return detect_patterns(*window)[-1]
+
+
+def has_pattern(mask, patterns):
+    """Boolean array (or bool) telling whether any of the given pattern bits is set."""
+    return (mask & np.uint32(patterns)) != 0
+
+
+def pattern_names(mask):
+    """Names of the patterns set in a single bar's mask."""
+    return [name for bit, name in PATTERN_NAMES.items() if int(mask) & bit]
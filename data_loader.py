@@ -1,138 +1,266 @@
-import MetaTrader5 as mt5
-import pandas as pd
-import threading
-import websocket
-import json
-from config import MT5_APP_ID, MT5_LOGIN, MT5_PASSWORD, MT5_SERVER, MT5_SYMBOLS, HISTORICAL_DATA_COUNT, TIMEFRAME
-
-# Global dictionaries to store tick data
-latest_ticks = {}
-all_ticks = {}
-
-# Initialize tick storage for each volatility symbol (e.g., symbols starting with "R_")
-for symbol in MT5_SYMBOLS:
-    if symbol.startswith("R_"):
-        all_ticks[symbol] = []  # This list will accumulate tick data
-
-
-# --- MetaTrader 5 Historical Data Functions ---
-def connect_mt5():
-    if not mt5.initialize():
-        print("MT5 initialization failed")
-        return False
-    authorized = mt5.login(MT5_LOGIN, password=MT5_PASSWORD, server=MT5_SERVER)
-    if not authorized:
-        print("MT5 login failed")
-        return False
-    print("Connected to MetaTrader 5")
-    return True
-
-
-def fetch_mt5_data(symbol, timeframe=mt5.TIMEFRAME_M1, data_count=HISTORICAL_DATA_COUNT):
-    """Fetch historical data for a given symbol and timeframe."""
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, data_count)
-    if rates is None:
-        print("No data fetched for symbol:", symbol)
-        return None
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df.set_index('time', inplace=True)
-    return df
-
-
-def fetch_all_mt5_data():
-    """Fetch data for multiple timeframes from 1-minute to 1-day for all symbols."""
-    all_data = {}
-    for symbol in MT5_SYMBOLS:
-        symbol_data = {}
-        for tf, label in TIMEFRAME.items():
-            df = fetch_mt5_data(symbol, tf)
-            if df is not None:
-                symbol_data[label] = df
-        all_data[symbol] = symbol_data
-    return all_data
-
-
-# --- Deriv WebSocket (Real-Time Data) Functions ---
-def on_message(ws, message):
-    try:
-        data = json.loads(message)
-        if 'tick' in data:
-            tick = data['tick']
-            symbol = tick['symbol']
-            latest_ticks[symbol] = tick
-            # Append tick to our storage list
-            if symbol in all_ticks:
-                all_ticks[symbol].append(tick)
-            print(f"Received tick for {symbol}: {tick}")
-    except Exception as e:
-        print("Error in on_message:", e)
-
-
-def on_error(ws, error):
-    print("WebSocket error:", error)
-
-
-def on_close(ws, close_status_code, close_msg):
-    print("### WebSocket Closed ###")
-
-
-def on_open(ws):
-    print("WebSocket Connection Established")
-    # Subscribe to tick data for every volatility symbol in our symbols list
-    for symbol in MT5_SYMBOLS:
-        if symbol.startswith("R_"):
-            request = {"ticks": symbol}
-            ws.send(json.dumps(request))
-            print("Subscribed to ticks for:", symbol)
-
-
-def start_deriv_websocket():
-    # Using the app_id from config.py
-    ws_url = f"wss://ws.derivws.com/websockets/v3?app_id={MT5_APP_ID}"  # Dynamically use API key from config
-    ws_app = websocket.WebSocketApp(
-        ws_url,
-        on_open=on_open,
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close
-    )
-    ws_app.run_forever()
-
-
-def start_deriv_ws_in_thread():
-    ws_thread = threading.Thread(target=start_deriv_websocket)
-    ws_thread.daemon = True  # so it exits with the main program
-    ws_thread.start()
-
-
-# --- Combined Data Processing Functions ---
-def process_combined_data():
-    """Process combined data from both historical data (MT5) and real-time ticks (Deriv)."""
-    all_data = fetch_all_mt5_data()  # Get historical data for all timeframes and symbols
-
-    # Combine real-time tick data with historical data
-    for symbol in all_ticks:
-        if symbol in all_data:
-            for timeframe, df in all_data[symbol].items():
-                # Process both historical data and real-time data here, e.g., combining them or applying strategies
-                print(f"Processing data for {symbol} at timeframe {timeframe}")
-                print(f"Historical data length: {len(df)}")
-                print(f"Real-time tick data length: {len(all_ticks[symbol])}")
-
-                # Example of combining the data for analysis
-                df_ticks = pd.DataFrame(all_ticks[symbol])
-                df_ticks['time'] = pd.to_datetime(df_ticks['time'], unit='s')
-                df_ticks.set_index('time', inplace=True)
-
-                combined_df = pd.concat([df, df_ticks], axis=0).sort_index()
-
-                # You can now perform technical analysis or strategy calculations on combined_df
-                print(combined_df.tail())
-
-
-# --- Main Execution ---
-if __name__ == "__main__":
-    if connect_mt5():
-        start_deriv_ws_in_thread()
-        process_combined_data()
+import pandas as pd
+import logging
+import threading
+import time
+from bar_builder import BarBuilder
+from deriv_feed import DERIV_WS_URL, DerivFeed
+from history_cache import HistoryCache
+from instrumentation import recorder
+from mt5_backend import mt5, connect_mt5
+from signal_engine import SignalEngine
+from structured_logging import get_tick_logger, setup_logging
+from tick_journal import TickJournal, default_journal_path
+from tick_store import TickStore
+
+TICK_STORE_CAPACITY = 100000  # Ticks kept in memory per symbol
+
+logger = logging.getLogger(__name__)
+tick_log = get_tick_logger()  # DEBUG level and rate-limited per symbol
+
+# Global dictionaries to store tick data
+all_ticks = {}
+bar_builders = {}  # Incrementally built 1-minute OHLC bars per symbol
+signal_engines = {}  # Online multi-timeframe signals over the 1-minute bars per symbol, fed by the signal loop
+history_cache = HistoryCache()  # On-disk MT5 history, only new bars are downloaded
+tick_listeners = []  # Callables notified with the symbol after each stored tick
+tick_journal = None  # Binary journal of received ticks, see enable_tick_journal
+state_lock = threading.Lock()  # Held while a tick updates a symbol's state, so snapshots are consistent
+
+
+def register_symbol(symbol):
+    """Create the tick store, bar builder and signal engine of a symbol (no-op if it already has them)."""
+    if symbol not in all_ticks:
+        reset_symbol(symbol)
+
+
+def reset_symbol(symbol):
+    """Give a symbol an empty tick store, bar builder and signal engine, dropping any state it had."""
+    all_ticks[symbol] = TickStore(capacity=TICK_STORE_CAPACITY)  # Bounded ring buffer of ticks
+    bar_builders[symbol] = BarBuilder(frequency='1min')
+    signal_engines[symbol] = SignalEngine()
+
+
+def config_value(name):
+    """Read a setting from config.py at call time, so importing this module does not need the file."""
+    import config
+    return getattr(config, name)
+
+
+def configured_symbols():
+    """Volatility symbols from config.py (symbols starting with "R_")."""
+    return [symbol for symbol in config_value('MT5_SYMBOLS') if symbol.startswith("R_")]
+
+
+def register_configured_symbols():
+    """Initialize tick storage for each configured volatility symbol; returns the symbols."""
+    symbols = configured_symbols()
+    for symbol in symbols:
+        register_symbol(symbol)
+    return symbols
+
+
+# --- MetaTrader 5 Historical Data Functions ---
+def rates_to_frame(rates):
+    """Convert an MT5 rates array into a DataFrame indexed by bar time."""
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    df.set_index('time', inplace=True)
+    return df
+
+
+def fetch_mt5_data(symbol, timeframe=None, data_count=None, cache=None):
+    """
+    Fetch historical data for a given symbol and timeframe (M1 by default).
+    With a HistoryCache only bars newer than the cached ones are downloaded.
+    :param data_count: Number of bars, HISTORICAL_DATA_COUNT from config.py by default.
+    """
+    if timeframe is None:
+        timeframe = mt5.TIMEFRAME_M1
+    if data_count is None:
+        data_count = config_value('HISTORICAL_DATA_COUNT')
+    if cache is not None:
+        rates = cache.update(symbol, timeframe, data_count)
+    else:
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, data_count)
+    if rates is None:
+        logger.warning("No data fetched", extra={'symbol': symbol})
+        return None
+    return rates_to_frame(rates)
+
+
+def fetch_all_mt5_data(cache=None):
+    """Fetch data for multiple timeframes from 1-minute to 1-day for all symbols."""
+    all_data = {}
+    for symbol in config_value('MT5_SYMBOLS'):
+        symbol_data = {}
+        for tf, label in config_value('TIMEFRAME').items():
+            df = fetch_mt5_data(symbol, tf, cache=cache)
+            if df is not None:
+                symbol_data[label] = df
+        all_data[symbol] = symbol_data
+    return all_data
+
+
+def warm_start(data_count=None, cache=None):
+    """
+    Seed the bar builder of every volatility symbol with M1 history, so indicators and signals
+    are valid before the first tick arrives. Ticks streamed afterwards continue the last historical
+    bar; ticks for older bars are ignored as duplicates. Call it before the feed is started.
+    :return: Dictionary of symbol -> number of historical bars loaded.
+    """
+    register_configured_symbols()
+    loaded = {}
+    for symbol in all_ticks:
+        count = _warm_start_symbol(symbol, data_count, cache)
+        if count is not None:
+            loaded[symbol] = count
+    return loaded
+
+
+def _warm_start_symbol(symbol, data_count, cache):
+    df = fetch_mt5_data(symbol, mt5.TIMEFRAME_M1, data_count, cache=cache)
+    if df is None or df.empty:
+        return None
+    builder = bar_builders[symbol]
+    loaded = builder.seed(df)
+    # History may have been merged in front of streamed bars, so the engine starts over from the builder
+    signal_engines[symbol] = SignalEngine()
+    logger.info("Warm start", extra={'symbol': symbol, 'bars': loaded})
+    return loaded
+
+
+def catch_up(cache=None):
+    """
+    Bring state restored from a snapshot up to date: only the M1 bars since each symbol's open
+    bar are fetched and applied to the bar builder, the signal engine picks them up on its next
+    sync. Symbols without restored bars get a full warm start, and so do symbols whose snapshot is
+    older than HISTORICAL_DATA_COUNT bars or whose missed bars cannot be fetched back to the open bar,
+    since their restored bars could not be continued without a hole. Call it before the feed is started.
+    :return: Dictionary of symbol -> number of bars applied.
+    """
+    register_configured_symbols()
+    data_count = config_value('HISTORICAL_DATA_COUNT')
+    applied = {}
+    for symbol in all_ticks:
+        builder = bar_builders[symbol]
+        if builder.current is None:
+            count = _warm_start_symbol(symbol, data_count, cache)
+            if count is not None:
+                applied[symbol] = count
+            continue
+        gap = max(0, int(time.time()) - builder.current[0]) // builder.period + 1
+        if gap <= data_count:
+            df = fetch_mt5_data(symbol, mt5.TIMEFRAME_M1, gap, cache=cache)
+            if df is not None and not df.empty and int(df.index[0].timestamp()) <= builder.current[0] + builder.period:
+                rows = builder.catch_up(df)
+                applied[symbol] = len(rows)
+                logger.info("Caught up", extra={'symbol': symbol, 'bars': len(rows)})
+                continue
+        logger.warning("Snapshot cannot be caught up, warm starting instead", extra={'symbol': symbol, 'bars': gap})
+        with state_lock:
+            reset_symbol(symbol)
+        count = _warm_start_symbol(symbol, data_count, cache)
+        if count is not None:
+            applied[symbol] = count
+    return applied
+
+
+def add_tick_listener(listener):
+    """Register a callable that is called with the symbol whenever a new tick is stored."""
+    tick_listeners.append(listener)
+
+
+# --- Deriv WebSocket (Real-Time Data) Functions ---
+def store_tick(symbol, epoch, quote, bid=None, ask=None):
+    """Store a tick and update the symbol's bars in constant time."""
+    if symbol not in all_ticks:
+        return
+    start = time.perf_counter()
+    with state_lock:
+        all_ticks[symbol].append(epoch, quote, bid, ask)
+        stored = time.perf_counter()
+        bar_builders[symbol].update(epoch, quote)
+    recorder.record('store', symbol, stored - start)
+    recorder.record('bar_build', symbol, time.perf_counter() - stored)
+    for listener in tick_listeners:
+        listener(symbol)
+
+
+def latest_price(symbol):
+    """
+    Latest streamed tick of a symbol as (epoch, bid, ask, quote), bid/ask NaN if the feed has none.
+    :return: Tuple, or None if no tick was stored yet.
+    """
+    store = all_ticks.get(symbol)
+    if store is None or len(store) == 0:
+        return None
+    window = store.last(1)
+    return (int(window['epoch'][0]), float(window['bid'][0]), float(window['ask'][0]), float(window['quote'][0]))
+
+
+def enable_tick_journal(path=None):
+    """Start recording every received tick to a journal file (a new file under tick_journal/ by default)."""
+    global tick_journal
+    if tick_journal is None:
+        tick_journal = TickJournal(path or default_journal_path())
+        logger.info("Recording ticks", extra={'path': tick_journal.path})
+    return tick_journal
+
+
+def receive_tick(symbol, epoch, quote, bid=None, ask=None):
+    """Entry point for ticks from the feed: journal the tick if recording is enabled, then store it."""
+    if tick_journal is not None:
+        tick_journal.record(symbol, epoch, quote, bid, ask)
+    store_tick(symbol, epoch, quote, bid, ask)
+    if tick_log.isEnabledFor(logging.DEBUG):
+        tick_log.debug("Tick", extra={'symbol': symbol, 'epoch': epoch, 'quote': quote})
+
+
+def start_deriv_feed_in_thread():
+    """
+    Start the asyncio Deriv feed for every volatility symbol in a background thread.
+    All symbols share one connection and ticks go straight into receive_tick.
+    """
+    symbols = register_configured_symbols()
+    feed = DerivFeed(symbols, receive_tick, DERIV_WS_URL.format(app_id=config_value('MT5_APP_ID')))
+    feed.start_in_thread()
+    return feed
+
+
+# Older name of the feed starter; there is a single feed, so both start the same one
+start_deriv_ws_in_thread = start_deriv_feed_in_thread
+
+
+# --- Combined Data Processing Functions ---
+def process_combined_data():
+    """Process combined data from both historical data (MT5) and real-time ticks (Deriv)."""
+    register_configured_symbols()
+    all_data = fetch_all_mt5_data(cache=history_cache)  # Get historical data for all timeframes and symbols
+
+    # Combine real-time tick data with historical data
+    for symbol in all_ticks:
+        if symbol in all_data:
+            for timeframe, df in all_data[symbol].items():
+                # Process both historical data and real-time data here, e.g., combining them or applying strategies
+                logger.info("Processing data", extra={'symbol': symbol, 'timeframe': timeframe,
+                                                      'history': len(df), 'ticks': len(all_ticks[symbol])})
+
+                # Example of combining the data for analysis: both parts are already in time order,
+                # so only ticks after the last historical bar are appended and nothing is re-sorted
+                store = all_ticks[symbol]
+                last_epoch = int(df.index[-1].value // 10**9)
+                newer = len(store.between(start_epoch=last_epoch + 1)['epoch'])
+                df_ticks = store.to_frame(newer)
+
+                combined_df = pd.concat([df, df_ticks], axis=0)
+
+                # You can now perform technical analysis or strategy calculations on combined_df
+                logger.info("Combined data\n%s", combined_df.tail(), extra={'symbol': symbol})
+
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    setup_logging()
+    if connect_mt5():
+        start_deriv_feed_in_thread()
+        process_combined_data()
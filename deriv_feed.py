@@ -0,0 +1,131 @@
+# deriv_feed.py
+
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+
+from instrumentation import recorder
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+DERIV_WS_URL = "wss://ws.derivws.com/websockets/v3?app_id={app_id}"
+
+# Fields of the flat "tick" object in a Deriv tick frame
+_TICK_FIELD = re.compile(r'"(ask|bid|epoch|quote|symbol)"\s*:\s*"?([^,"}\s]+)')
+
+
+def parse_tick(message):
+    """
+    Extract (symbol, epoch, quote, bid, ask) from a Deriv tick frame without decoding the whole
+    message into dictionaries.
+    :return: Tuple of tick fields, or None if the message is not a well-formed tick frame.
+    """
+    start = message.find('"tick":')
+    if start < 0:
+        return None
+    end = message.find('}', start)
+    if end < 0:
+        return None
+    fields = dict(_TICK_FIELD.findall(message, start, end))
+    try:
+        return (
+            fields['symbol'],
+            int(fields['epoch']),
+            float(fields['quote']),
+            float(fields['bid']) if 'bid' in fields else None,
+            float(fields['ask']) if 'ask' in fields else None,
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+class DerivFeed:
+    """
+    Asyncio Deriv tick feed that multiplexes all symbol subscriptions over one connection.
+    Ticks are passed to on_tick(symbol, epoch, quote, bid, ask) as they arrive. The connection
+    is re-established with exponential backoff and all symbols are subscribed again.
+    :param symbols: Symbols to subscribe to.
+    :param on_tick: Callback invoked on the feed thread for every tick.
+    :param url: WebSocket URL, e.g. a local stand-in server for testing.
+    """
+
+    def __init__(self, symbols, on_tick, url, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.symbols = list(symbols)
+        self.on_tick = on_tick
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = threading.Event()
+        self._loop = None
+        self._ws = None
+        self._stopped = False
+
+    async def subscribe(self, ws):
+        """Subscribe to every symbol with a single batched ticks request."""
+        await ws.send(json.dumps({"ticks": self.symbols, "subscribe": 1}))
+
+    def handle_message(self, message):
+        """Dispatch one frame; tick frames take the fast path, everything else is fully decoded."""
+        if '"msg_type":"tick"' in message or '"msg_type": "tick"' in message:
+            start = time.perf_counter()
+            tick = parse_tick(message)
+            if tick is not None:
+                recorder.record('decode', tick[0], time.perf_counter() - start)
+                self.on_tick(*tick)
+                return
+        data = _loads(message)
+        if 'error' in data:
+            logger.error("Deriv feed error: %s", data['error'].get('message', data['error']))
+        elif 'tick' in data:
+            tick = data['tick']
+            self.on_tick(tick['symbol'], int(tick['epoch']), float(tick['quote']), tick.get('bid'), tick.get('ask'))
+
+    async def run(self):
+        """Connect, subscribe and consume frames until stop() is called, reconnecting on failures."""
+        import websockets
+
+        self._loop = asyncio.get_running_loop()
+        delay = self.reconnect_delay
+        while not self._stopped:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self._ws = ws
+                    await self.subscribe(ws)
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    async for message in ws:
+                        try:
+                            self.handle_message(message)
+                        except Exception:
+                            logger.exception("Error handling Deriv message")
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                # WebSocketException also covers rejected handshakes (e.g. HTTP 429/503) and lost connections
+                logger.warning("Deriv feed disconnected: %s", e, extra={'retry_in': delay})
+            finally:
+                self._ws = None
+                self.connected.clear()
+            if self._stopped:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start_in_thread(self):
+        """Run the feed's event loop in a daemon thread and return the thread."""
+        thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Stop the feed and close the connection; safe to call from another thread."""
+        self._stopped = True
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
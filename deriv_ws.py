@@ -1,46 +1,35 @@
-import websocket
-import json
-
-
-def on_message(ws, message):
-    try:
-        data = json.loads(message)
-        print("Received Message:", data)
-    except Exception as e:
-        print("Error parsing message:", e)
-
-
-def on_error(ws, error):
-    print("Error:", error)
-
-
-def on_close(ws, close_status_code, close_msg):
-    print("### WebSocket Closed ###")
-
-
-def on_open(ws):
-    print("WebSocket Connection Established")
-    # Subscribe to tick data for Volatility 75 Index (symbol R_75)
-    subscription_request = {
-        "ticks": "R_75"
-    }
-    ws.send(json.dumps(subscription_request))
-    print("Subscription Request Sent:", subscription_request)
-
-
-if __name__ == "__main__":
-    # Use the demo endpoint for Binary/Deriv API
-    ws_url = "wss://ws.binaryws.com/websockets/v3?app_id=1089"
-
-    # If you're using a live account, you might try:
-    # ws_url = "wss://ws.deriv.com/websockets/v3"
-
-    ws_app = websocket.WebSocketApp(
-        ws_url,
-        on_open=on_open,
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close
-    )
-
-    ws_app.run_forever()
+# deriv_ws.py
+
+import asyncio
+import logging
+
+from deriv_feed import DERIV_WS_URL, DerivFeed
+from structured_logging import setup_logging
+
+DEMO_APP_ID = 1089  # Public demo app_id of the Deriv API
+
+logger = logging.getLogger(__name__)
+
+
+def log_tick(symbol, epoch, quote, bid=None, ask=None):
+    logger.info("Tick", extra={'symbol': symbol, 'epoch': epoch, 'quote': quote, 'bid': bid, 'ask': ask})
+
+
+def run(symbols, app_id=DEMO_APP_ID):
+    """Stream ticks of the given symbols through the shared DerivFeed client and log each one."""
+    feed = DerivFeed(symbols, log_tick, DERIV_WS_URL.format(app_id=app_id))
+    try:
+        asyncio.run(feed.run())
+    except KeyboardInterrupt:
+        feed.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print the live Deriv tick stream.")
+    parser.add_argument('symbols', nargs='*', default=['R_75'], help="Symbols to subscribe to (R_75 by default)")
+    parser.add_argument('--app-id', type=int, default=DEMO_APP_ID, help="Deriv API app_id")
+    args = parser.parse_args()
+    setup_logging()
+    run(args.symbols, args.app_id)
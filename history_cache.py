@@ -0,0 +1,152 @@
+# history_cache.py
+
+import logging
+import os
+
+import numpy as np
+
+from mt5_backend import RATES_DTYPE, mt5
+
+logger = logging.getLogger(__name__)
+
+HISTORY_CACHE_DIR = "history_cache"
+HISTORY_MAGIC = b'MT5RATE1'
+HEADER_SIZE = len(HISTORY_MAGIC) + 16  # Magic, record size and flags, both as uint64
+HISTORY_COMPLETE = 1  # Flag: the cache starts at the first bar the terminal has for the symbol
+MAX_FETCH_BARS = 100000  # Largest request used to close a gap, the terminal's default "Max bars in chart"
+
+
+class HistoryCache:
+    """
+    Local cache of MT5 rates with one file per symbol and timeframe: a small header followed by
+    RATES_DTYPE records, oldest first. Updates only download the bars newer than the last cached
+    bar and append them (replacing the last cached bar, which may have still been open), so the
+    cost of an update does not grow with the size of the cache. The file is only rewritten when
+    older history has to be put in front of it.
+    The cached bars never have a hole: if the new bars cannot be fetched back to the last cached
+    one, the cache is started over from the new bars.
+    :param cache_dir: Directory holding the cached files (created on first write).
+    :param source: Module or object providing copy_rates_from_pos, the active MT5 backend by default.
+    """
+
+    def __init__(self, cache_dir=HISTORY_CACHE_DIR, source=None, max_fetch=MAX_FETCH_BARS):
+        self.cache_dir = cache_dir
+        self.source = source if source is not None else mt5
+        self.max_fetch = max_fetch
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.cache_dir, f"{symbol}_{timeframe}.bin")
+
+    def _read_header(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:len(HISTORY_MAGIC)] != HISTORY_MAGIC:
+            return None
+        itemsize, flags = np.frombuffer(header, dtype='<u8', offset=len(HISTORY_MAGIC)).tolist()
+        if itemsize != RATES_DTYPE.itemsize:
+            return None
+        return flags
+
+    def flags(self, symbol, timeframe):
+        """Header flags of the cached file (0 if nothing is cached)."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return 0
+        return self._read_header(path) or 0
+
+    def load(self, symbol, timeframe, mmap_mode=None):
+        """
+        Return the cached rates array, or None if nothing (usable) is cached yet.
+        A trailing partial record (e.g. after a crash during an append) is ignored.
+        :param mmap_mode: 'r' to memory-map the file instead of reading it.
+        """
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        if self._read_header(path) is None:
+            logger.warning("Ignoring history cache in another format", extra={'path': path})
+            return None
+        count = (os.path.getsize(path) - HEADER_SIZE) // RATES_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=RATES_DTYPE)
+        if mmap_mode is not None:
+            return np.memmap(path, dtype=RATES_DTYPE, mode=mmap_mode, offset=HEADER_SIZE, shape=(count,))
+        return np.fromfile(path, dtype=RATES_DTYPE, count=count, offset=HEADER_SIZE)
+
+    def _header(self, flags):
+        return HISTORY_MAGIC + np.array([RATES_DTYPE.itemsize, flags], dtype='<u8').tobytes()
+
+    def save(self, symbol, timeframe, rates, flags=0):
+        """Write the whole rates array atomically, so readers never see a partial file."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(symbol, timeframe)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._header(flags))
+            f.write(np.ascontiguousarray(rates, dtype=RATES_DTYPE).tobytes())
+        os.replace(tmp_path, path)
+
+    def append(self, symbol, timeframe, rates, keep):
+        """
+        Keep the first `keep` cached bars and append rates after them. Only the replaced tail and the
+        new records are written; a crash in between leaves a shorter but gap-free cache.
+        """
+        path = self.path(symbol, timeframe)
+        with open(path, 'r+b') as f:
+            f.truncate(HEADER_SIZE + keep * RATES_DTYPE.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(rates, dtype=RATES_DTYPE).tobytes())
+
+    def _fetch_since(self, symbol, timeframe, last_time, data_count):
+        """Fetch the most recent bars, widening the request until it reaches back to last_time."""
+        count = min(64, data_count)
+        limit = max(data_count, self.max_fetch)
+        while True:
+            rates = self.source.copy_rates_from_pos(symbol, timeframe, 0, count)
+            if rates is None or len(rates) == 0:
+                return rates
+            if rates['time'][0] <= last_time or len(rates) < count or count >= limit:
+                return rates
+            count = min(count * 4, limit)
+
+    def update(self, symbol, timeframe, data_count):
+        """
+        Bring the cache up to date and return at most data_count of the latest bars.
+        The cache keeps every bar it has seen; a full download only happens while it holds fewer
+        than data_count bars and does not yet reach back to the first bar the terminal has.
+        :return: Structured rates array, or None if nothing is cached and nothing could be fetched.
+        """
+        cached = self.load(symbol, timeframe, mmap_mode='r')
+        flags = self.flags(symbol, timeframe) if cached is not None else 0
+        if cached is None or len(cached) == 0 or (len(cached) < data_count and not flags & HISTORY_COMPLETE):
+            fetched = self.source.copy_rates_from_pos(symbol, timeframe, 0, data_count)
+            if fetched is None or len(fetched) == 0:
+                return None if cached is None else np.array(cached[-data_count:])
+            # Fewer bars than requested: that is all the history there is, later updates only append
+            flags = HISTORY_COMPLETE if len(fetched) < data_count else 0
+            if cached is not None and len(cached) and cached['time'][-1] >= fetched['time'][0]:
+                older = np.array(cached[cached['time'] < fetched['time'][0]])
+                rates = np.concatenate([older, fetched.astype(RATES_DTYPE)])
+            else:
+                # Cached bars that do not overlap the download would leave a hole, so they are dropped
+                rates = fetched
+            self.save(symbol, timeframe, rates, flags)
+            return rates[-data_count:]
+
+        last_time = cached['time'][-1]
+        fetched = self._fetch_since(symbol, timeframe, last_time, data_count)
+        if fetched is None or len(fetched) == 0:
+            return np.array(cached[-data_count:])
+        if fetched['time'][0] > last_time:
+            # Offline for longer than the terminal can send back: start over rather than keep a hole
+            logger.warning("History cache is older than the available bars, starting over",
+                           extra={'symbol': symbol, 'timeframe': timeframe})
+            self.save(symbol, timeframe, fetched)
+            return fetched[-data_count:]
+        # The last cached bar may have still been open, so the fetched copy replaces it
+        fetched = fetched[fetched['time'] >= last_time].astype(RATES_DTYPE)
+        keep = len(cached) - 1
+        rates = np.concatenate([cached[:keep][-data_count:], fetched])[-data_count:]
+        del cached  # Release the memory map before the file is changed
+        self.append(symbol, timeframe, fetched, keep)
+        return rates
@@ -0,0 +1,340 @@
+# indicator_engine.py
+
+from collections import deque
+
+import numpy as np
+
+
+def _pack_undo(undo, size):
+    """Encode an undo tuple (or None) as a float array: a presence flag followed by the values (None as NaN)."""
+    if undo is None:
+        return np.full(size + 1, np.nan)
+    return np.array([1.0] + [np.nan if value is None else float(value) for value in undo])
+
+
+def _unpack_undo(packed):
+    """Inverse of _pack_undo; returns None or a tuple of floats."""
+    packed = np.asarray(packed, dtype=float)
+    if np.isnan(packed[0]):
+        return None
+    return tuple(packed[1:].tolist())
+
+
+class OnlineSMA:
+    """Simple Moving Average updated one value at a time (same running sum as TA-Lib SMA)."""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()  # Last period - 1 inputs
+        self.total = 0.0  # Sum of the values in window
+        self.value = np.nan
+        self._undo = None
+
+    def update(self, x):
+        """Add a new value and return the current SMA."""
+        self._undo = (self.total, self.value, None)
+        if len(self.window) < self.period - 1:
+            self.window.append(x)
+            self.total += x
+            self.value = np.nan
+            return self.value
+        temp = self.total + x
+        self.value = temp / self.period
+        if self.period > 1:
+            trailing = self.window.popleft()
+            self.window.append(x)
+            self._undo = (self._undo[0], self._undo[1], trailing)
+        else:
+            trailing = x
+        self.total = temp - trailing
+        return self.value
+
+    def revise(self, x):
+        """Replace the most recent value (e.g. the close of a bar that is still open)."""
+        if self._undo is None:
+            return self.update(x)
+        self.total, self.value, trailing = self._undo
+        if self.period > 1:
+            self.window.pop()
+            if trailing is not None:
+                self.window.appendleft(trailing)
+        return self.update(x)
+
+    def get_state(self):
+        return {
+            'window': np.array(self.window, dtype=float),
+            'values': np.array([self.total, self.value]),
+            'undo': _pack_undo(self._undo, 3),
+        }
+
+    def set_state(self, state):
+        self.window = deque(np.asarray(state['window'], dtype=float).tolist())
+        self.total, self.value = np.asarray(state['values'], dtype=float).tolist()
+        undo = _unpack_undo(state['undo'])
+        if undo is not None and np.isnan(undo[2]):
+            undo = (undo[0], undo[1], None)
+        self._undo = undo
+
+
+class OnlineEMA:
+    """Exponential Moving Average seeded with the SMA of the first period values, as in TA-Lib."""
+
+    def __init__(self, period):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = np.nan
+        self._undo = None
+
+    def update(self, x):
+        """Add a new value and return the current EMA."""
+        self._undo = (self.count, self.seed_total, self.value)
+        self.count += 1
+        if self.count < self.period:
+            self.seed_total += x
+        elif self.count == self.period:
+            self.seed_total += x
+            self.value = self.seed_total / self.period
+        else:
+            self.value = ((x - self.value) * self.k) + self.value
+        return self.value
+
+    def revise(self, x):
+        """Replace the most recent value."""
+        if self._undo is not None:
+            self.count, self.seed_total, self.value = self._undo
+        return self.update(x)
+
+    def get_state(self):
+        return {
+            'values': np.array([self.count, self.seed_total, self.value]),
+            'undo': _pack_undo(self._undo, 3),
+        }
+
+    def set_state(self, state):
+        count, self.seed_total, self.value = np.asarray(state['values'], dtype=float).tolist()
+        self.count = int(count)
+        undo = _unpack_undo(state['undo'])
+        self._undo = None if undo is None else (int(undo[0]), undo[1], undo[2])
+
+
+class OnlineRSI:
+    """Wilder's Relative Strength Index, matching TA-Lib RSI with the default unstable period."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.count = 0
+        self.prev_close = np.nan
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value = np.nan
+        self._undo = None
+
+    def _rsi(self):
+        total = self.avg_gain + self.avg_loss
+        # Written as TA-Lib does, so a missing close (NaN total) gives 0 like a flat market
+        if total > 0.00000001 or total < -0.00000001:
+            return 100.0 * (self.avg_gain / total)
+        return 0.0
+
+    def update(self, x):
+        """Add a new close and return the current RSI."""
+        self._undo = (self.count, self.prev_close, self.avg_gain, self.avg_loss, self.value)
+        self.count += 1
+        if self.count == 1:
+            self.prev_close = x
+            return self.value
+        diff = x - self.prev_close
+        self.prev_close = x
+        if self.count <= self.period + 1:
+            # Accumulate the initial period before smoothing starts
+            if diff < 0:
+                self.avg_loss -= diff
+            else:
+                self.avg_gain += diff
+            if self.count == self.period + 1:
+                self.avg_loss /= self.period
+                self.avg_gain /= self.period
+                self.value = self._rsi()
+            return self.value
+        self.avg_loss *= (self.period - 1)
+        self.avg_gain *= (self.period - 1)
+        if diff < 0:
+            self.avg_loss -= diff
+        else:
+            self.avg_gain += diff
+        self.avg_loss /= self.period
+        self.avg_gain /= self.period
+        self.value = self._rsi()
+        return self.value
+
+    def revise(self, x):
+        """Replace the most recent close."""
+        if self._undo is not None:
+            self.count, self.prev_close, self.avg_gain, self.avg_loss, self.value = self._undo
+        return self.update(x)
+
+    def get_state(self):
+        return {
+            'values': np.array([self.count, self.prev_close, self.avg_gain, self.avg_loss, self.value]),
+            'undo': _pack_undo(self._undo, 5),
+        }
+
+    def set_state(self, state):
+        count, self.prev_close, self.avg_gain, self.avg_loss, self.value = \
+            np.asarray(state['values'], dtype=float).tolist()
+        self.count = int(count)
+        undo = _unpack_undo(state['undo'])
+        self._undo = None if undo is None else (int(undo[0]),) + undo[1:]
+
+
+class OnlineMACD:
+    """
+    MACD line and signal line matching TA-Lib MACD: the fast EMA starts (slow - fast) values
+    later so both EMAs produce their first value on the same bar, and no output is reported
+    until the signal line is available.
+    """
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        if slow_period < fast_period:
+            fast_period, slow_period = slow_period, fast_period
+        self.fast = OnlineEMA(fast_period)
+        self.slow = OnlineEMA(slow_period)
+        self.signal_ema = OnlineEMA(signal_period)
+        self.offset = slow_period - fast_period
+        self.count = 0
+        self.macd = np.nan
+        self.signal = np.nan
+        self._undo = None
+
+    def update(self, x):
+        """Add a new close and return (macd, signal)."""
+        self.count += 1
+        fast_updated = self.count > self.offset
+        if fast_updated:
+            self.fast.update(x)
+        self.slow.update(x)
+        # Once the slow EMA has started, a missing close (NaN) flows into the signal line as in TA-Lib
+        signal_updated = self.slow.count >= self.slow.period
+        if signal_updated:
+            self.signal_ema.update(self.fast.value - self.slow.value)
+        self._undo = (self.macd, self.signal, fast_updated, signal_updated)
+        if np.isnan(self.signal_ema.value):
+            self.macd, self.signal = np.nan, np.nan
+        else:
+            self.macd = self.fast.value - self.slow.value
+            self.signal = self.signal_ema.value
+        return self.macd, self.signal
+
+    def revise(self, x):
+        """Replace the most recent close."""
+        if self._undo is None:
+            return self.update(x)
+        self.macd, self.signal, fast_updated, signal_updated = self._undo
+        if fast_updated:
+            self.fast.revise(x)
+        self.slow.revise(x)
+        if signal_updated:
+            self.signal_ema.revise(self.fast.value - self.slow.value)
+        if np.isnan(self.signal_ema.value):
+            self.macd, self.signal = np.nan, np.nan
+        else:
+            self.macd = self.fast.value - self.slow.value
+            self.signal = self.signal_ema.value
+        return self.macd, self.signal
+
+    def get_state(self):
+        state = {
+            'values': np.array([self.count, self.macd, self.signal]),
+            'undo': _pack_undo(self._undo, 4),
+        }
+        for name in ('fast', 'slow', 'signal_ema'):
+            for key, value in getattr(self, name).get_state().items():
+                state[f'{name}.{key}'] = value
+        return state
+
+    def set_state(self, state):
+        count, self.macd, self.signal = np.asarray(state['values'], dtype=float).tolist()
+        self.count = int(count)
+        undo = _unpack_undo(state['undo'])
+        self._undo = None if undo is None else (undo[0], undo[1], bool(undo[2]), bool(undo[3]))
+        for name in ('fast', 'slow', 'signal_ema'):
+            getattr(self, name).set_state({key[len(name) + 1:]: value for key, value in state.items()
+                                           if key.startswith(name + '.')})
+
+
+class IndicatorEngine:
+    """
+    Stateful counterpart of indicators.calculate_indicators. Each new or updated bar costs O(1),
+    and the values match the TA-Lib batch output for the same close series.
+    """
+
+    def __init__(self):
+        self.sma_50 = OnlineSMA(50)
+        self.sma_200 = OnlineSMA(200)
+        self.ema_20 = OnlineEMA(20)
+        self.rsi = OnlineRSI(14)
+        self.macd = OnlineMACD(12, 26, 9)
+        self.last_time = None
+
+    def update(self, close, new_bar=True):
+        """
+        Feed the close of a new bar, or with new_bar=False revise the close of the latest bar.
+        :return: Dictionary with the current indicator values.
+        """
+        if new_bar:
+            for indicator in (self.sma_50, self.sma_200, self.ema_20, self.rsi, self.macd):
+                indicator.update(close)
+        else:
+            for indicator in (self.sma_50, self.sma_200, self.ema_20, self.rsi, self.macd):
+                indicator.revise(close)
+        return self.values
+
+    def update_bar(self, bar_time, close):
+        """Feed a bar close keyed by bar time; repeated times revise the open bar."""
+        new_bar = bar_time != self.last_time
+        self.last_time = bar_time
+        return self.update(close, new_bar=new_bar)
+
+    def _indicators(self):
+        return {'sma_50': self.sma_50, 'sma_200': self.sma_200, 'ema_20': self.ema_20, 'rsi': self.rsi,
+                'macd': self.macd}
+
+    def get_state(self):
+        """Accumulators of all indicators as a flat dictionary of NumPy arrays (for snapshot files)."""
+        state = {'last_time': np.array(np.nan if self.last_time is None else self.last_time, dtype=float)}
+        for name, indicator in self._indicators().items():
+            for key, value in indicator.get_state().items():
+                state[f'{name}.{key}'] = value
+        return state
+
+    def set_state(self, state):
+        """Restore the accumulators saved by get_state, so updates continue exactly where they left off."""
+        last_time = float(state['last_time'])
+        self.last_time = None if np.isnan(last_time) else int(last_time)
+        for name, indicator in self._indicators().items():
+            indicator.set_state({key[len(name) + 1:]: value for key, value in state.items()
+                                 if key.startswith(name + '.')})
+
+    def seed(self, closes, last_time=None):
+        """
+        Replay a historical close series so the engine continues where the batch output ends.
+        :param last_time: Bar time of the last close; update_bar with the same time then revises it.
+        """
+        for close in np.asarray(closes, dtype=float):
+            self.update(close)
+        self.last_time = last_time
+        return self.values
+
+    @property
+    def values(self):
+        """Current values using the same names as the calculate_indicators columns."""
+        return {
+            'SMA_50': self.sma_50.value,
+            'SMA_200': self.sma_200.value,
+            'EMA_20': self.ema_20.value,
+            'RSI': self.rsi.value,
+            'MACD': self.macd.macd,
+            'MACD_signal': self.macd.signal,
+        }
@@ -1,18 +1,75 @@
-# indicators.py
-
-import pandas as pd
-import talib
-
-def calculate_indicators(df):
-    if 'close' not in df.columns:
-        print("DataFrame does not contain 'close' column.")
-        return df
-
-    df['SMA_50'] = talib.SMA(df['close'], timeperiod=50)
-    df['SMA_200'] = talib.SMA(df['close'], timeperiod=200)
-    df['EMA_20'] = talib.EMA(df['close'], timeperiod=20)
-    df['RSI'] = talib.RSI(df['close'], timeperiod=14)
-    macd, macd_signal, macd_hist = talib.MACD(df['close'])
-    df['MACD'] = macd
-    df['MACD_signal'] = macd_signal
-    return df
+# indicators.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+def calculate_indicators(df, engine=None):
+    """
+    Add SMA_50, SMA_200, EMA_20, RSI and MACD columns to the DataFrame.
+    If an IndicatorEngine is given it is seeded with the close series, so it can continue
+    bar by bar from where this batch calculation ends.
+    """
+    if 'close' not in df.columns:
+        logger.error("DataFrame does not contain 'close' column")
+        return df
+
+    import talib
+
+    df['SMA_50'] = talib.SMA(df['close'], timeperiod=50)
+    df['SMA_200'] = talib.SMA(df['close'], timeperiod=200)
+    df['EMA_20'] = talib.EMA(df['close'], timeperiod=20)
+    df['RSI'] = talib.RSI(df['close'], timeperiod=14)
+    macd, macd_signal, macd_hist = talib.MACD(df['close'])
+    df['MACD'] = macd
+    df['MACD_signal'] = macd_signal
+    if engine is not None:
+        engine.seed(df['close'])
+    return df
+
+def calculate_indicator_matrix(closes, sma_periods=(50, 200), ema_periods=(20,), rsi_periods=(14,),
+                               macd_params=((12, 26, 9),)):
+    """
+    Compute many indicators for many symbols into one preallocated float64 block.
+    TA-Lib is called directly on contiguous NumPy columns and its output is copied into the block,
+    so there is no per-column Series construction or DataFrame insertion.
+    :param closes: DataFrame of close prices with one column per symbol (rows aligned in time).
+    :param sma_periods, ema_periods, rsi_periods: Periods to compute for every symbol.
+    :param macd_params: (fast, slow, signal) tuples; each adds a MACD and a MACD_signal column.
+    :return: DataFrame with (symbol, indicator) column MultiIndex that is a view of the block.
+    """
+    import talib
+
+    names = [f'SMA_{p}' for p in sma_periods] + [f'EMA_{p}' for p in ema_periods] + [f'RSI_{p}' for p in rsi_periods]
+    for fast, slow, signal in macd_params:
+        names += [f'MACD_{fast}_{slow}_{signal}', f'MACD_signal_{fast}_{slow}_{signal}']
+
+    symbols = list(closes.columns)
+    # One contiguous row of close prices per symbol
+    prices = np.ascontiguousarray(closes.to_numpy(dtype=np.float64).T)
+    block = np.empty((len(symbols), len(names), len(closes)), dtype=np.float64)
+
+    for s in range(len(symbols)):
+        close = prices[s]
+        k = 0
+        for period in sma_periods:
+            block[s, k] = talib.SMA(close, timeperiod=period)
+            k += 1
+        for period in ema_periods:
+            block[s, k] = talib.EMA(close, timeperiod=period)
+            k += 1
+        for period in rsi_periods:
+            block[s, k] = talib.RSI(close, timeperiod=period)
+            k += 1
+        for fast, slow, signal in macd_params:
+            macd, macd_signal, _ = talib.MACD(close, fastperiod=fast, slowperiod=slow, signalperiod=signal)
+            block[s, k] = macd
+            block[s, k + 1] = macd_signal
+            k += 2
+
+    columns = pd.MultiIndex.from_product([symbols, names], names=['symbol', 'indicator'])
+    # The transposed (bars x columns) block is wrapped without copying
+    return pd.DataFrame(block.reshape(-1, len(closes)).T, index=closes.index, columns=columns, copy=False)
@@ -0,0 +1,239 @@
+# instrumentation.py
+
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Histogram buckets grow geometrically by BUCKET_RATIO starting at MIN_SECONDS,
+# which keeps percentile estimates within ~10% while recording in constant time
+MIN_SECONDS = 1e-6
+BUCKET_RATIO = 1.1
+NUM_BUCKETS = 200  # Covers 1 microsecond up to ~173 s (1e-6 * 1.1 ** 199); longer timings land in the last bucket
+_LOG_RATIO = math.log(BUCKET_RATIO)
+
+# Create this file to profile a running process, delete it to stop (see start_periodic_summary)
+PROFILE_FLAG_FILE = "profile.flag"
+PROFILE_POLL_SECONDS = 1.0  # How often the summary thread looks for the flag file
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram of durations in seconds."""
+
+    def __init__(self):
+        self.buckets = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= MIN_SECONDS:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / MIN_SECONDS) / _LOG_RATIO) + 1, NUM_BUCKETS - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100), capped at the observed max."""
+        if self.count == 0:
+            return 0.0
+        target = math.ceil(self.count * q / 100.0)
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min(MIN_SECONDS * BUCKET_RATIO ** index, self.max)
+        return self.max
+
+    def stats(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class LatencyRecorder:
+    """
+    Per-symbol, per-stage latency histograms for the live pipeline
+    (e.g. decode, store, bar_build, calculate_indicators, generate_signals, order_send).
+    Recording can be switched off at runtime with `enabled`.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._summary_thread = None
+
+    def record(self, stage, symbol, seconds):
+        """Add one duration for a stage of a symbol."""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get((symbol, stage))
+            if histogram is None:
+                histogram = self.histograms[(symbol, stage)] = LatencyHistogram()
+            histogram.add(seconds)
+
+    @contextmanager
+    def timer(self, stage, symbol):
+        """Context manager recording the duration of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, symbol, time.perf_counter() - start)
+
+    def summary(self):
+        """Return {symbol: {stage: {count, mean, p50, p99, max}}} with durations in seconds."""
+        with self._lock:
+            items = [(key, histogram.stats()) for key, histogram in self.histograms.items()]
+        result = {}
+        for (symbol, stage), stats in sorted(items, key=lambda item: (str(item[0][0]), item[0][1])):
+            result.setdefault(symbol, {})[stage] = stats
+        return result
+
+    def format_summary(self):
+        lines = []
+        for symbol, stages in self.summary().items():
+            for stage, stats in stages.items():
+                lines.append(f"{symbol:>10} {stage:<22} n={stats['count']:<8} p50={stats['p50'] * 1000:.3f}ms "
+                             f"p99={stats['p99'] * 1000:.3f}ms max={stats['max'] * 1000:.3f}ms")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def start_periodic_summary(self, interval=60.0, output=print, profile_flag=PROFILE_FLAG_FILE):
+        """
+        Emit format_summary() every `interval` seconds from a daemon thread. The thread also runs the
+        sampling profiler while the file `profile_flag` exists, adds its top locations to each summary
+        and emits the final ones when the file is deleted.
+        :param profile_flag: Path of the flag file, None to leave the profiler alone.
+        """
+        def run():
+            next_summary = time.monotonic() + interval
+            while True:
+                time.sleep(min(interval, PROFILE_POLL_SECONDS))
+                if profile_flag is not None:
+                    top = apply_profile_flag(profile_flag)
+                    if top:
+                        output("--- Profile ---\n" + format_profile(top))
+                if time.monotonic() < next_summary:
+                    continue
+                next_summary += interval
+                text = self.format_summary()
+                if profiler is not None:
+                    text = "\n".join(part for part in (text, "--- Profile ---", format_profile(profiler.top()))
+                                     if part)
+                if text:
+                    output("--- Latency summary ---\n" + text)
+
+        if self._summary_thread is None:
+            self._summary_thread = threading.Thread(target=run, daemon=True)
+            self._summary_thread.start()
+        return self._summary_thread
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler: a background thread samples the current frame of every other
+    thread every `interval` seconds and counts where they are. Costs nothing while stopped.
+    """
+
+    def __init__(self, interval=0.005, depth=1):
+        self.interval = interval
+        self.depth = depth
+        self.samples = Counter()
+        self._running = False
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while self._running:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename}:{frame.f_lineno}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[" <- ".join(stack)] += 1
+            time.sleep(self.interval)
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def top(self, n=20):
+        """Most frequently sampled locations as (location, share of samples)."""
+        total = sum(self.samples.values())
+        return [(location, count / total) for location, count in self.samples.most_common(n)] if total else []
+
+
+recorder = LatencyRecorder()  # Shared recorder used by the live pipeline
+profiler = None
+_flag_profiler = False  # Whether the running profiler was started by apply_profile_flag
+
+
+def enable_profiler(interval=0.005, depth=1):
+    """Start the sampling profiler at runtime (no-op if it is already running)."""
+    global profiler
+    if profiler is None:
+        profiler = SamplingProfiler(interval, depth)
+        profiler.start()
+    return profiler
+
+
+def disable_profiler(n=20):
+    """Stop the sampling profiler and return its top n locations."""
+    global profiler
+    if profiler is None:
+        return []
+    profiler.stop()
+    top = profiler.top(n)
+    profiler = None
+    return top
+
+
+def apply_profile_flag(path=PROFILE_FLAG_FILE):
+    """
+    Start the sampling profiler if the flag file exists and stop it once the file is gone;
+    a profiler started with enable_profiler is left running.
+    :return: Top locations of a profiler stopped by this call, otherwise None.
+    """
+    global _flag_profiler
+    if os.path.exists(path):
+        if profiler is None:
+            enable_profiler()
+            _flag_profiler = True
+        return None
+    if _flag_profiler:
+        _flag_profiler = False
+        return disable_profiler()
+    return None
+
+
+def format_profile(top):
+    """One line per location of SamplingProfiler.top(), with its share of the samples."""
+    return "\n".join(f"{share * 100:6.2f}% {location}" for location, share in top)
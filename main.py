@@ -1,157 +1,175 @@
-import MetaTrader5 as mt5
-import pandas as pd
-import threading
-import websocket
-import json
-import time
-from config import MT5_APP_ID, MT5_LOGIN, MT5_PASSWORD, MT5_SERVER, MT5_SYMBOLS, HISTORICAL_DATA_COUNT, TIMEFRAME
-from data_loader import start_deriv_ws_in_thread, all_ticks
-from indicators import calculate_indicators
-from signal_generator import generate_signals  # Modified signal generation function (weighted algorithm)
-from trade_executor import place_trade
-from utils import process_tick_data
-
-# Global dictionaries to store tick data
-latest_ticks = {}
-all_ticks = {}
-
-# Initialize tick storage for each volatility symbol (e.g., symbols starting with "R_")
-for symbol in MT5_SYMBOLS:
-    if symbol.startswith("R_"):
-        all_ticks[symbol] = []  # This list will accumulate tick data
-
-# --- MetaTrader 5 Historical Data Functions ---
-def connect_mt5():
-    """Initialize the MT5 connection."""
-    if not mt5.initialize():
-        print("MT5 initialization failed")
-        return False
-    authorized = mt5.login(MT5_LOGIN, password=MT5_PASSWORD, server=MT5_SERVER)
-    if not authorized:
-        print("MT5 login failed")
-        return False
-    print("Connected to MetaTrader 5")
-    return True
-
-def fetch_mt5_data(symbol):
-    """Fetch historical data from MT5 for a given symbol."""
-    timeframe = mt5.TIMEFRAME_M1  # 1-minute timeframe
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, HISTORICAL_DATA_COUNT)
-    if rates is None:
-        print(f"No data fetched for symbol: {symbol}")
-        return None
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    return df
-
-# --- Deriv WebSocket (Real-Time Data) Functions ---
-def on_message(ws, message):
-    """Handle incoming messages from the WebSocket."""
-    try:
-        data = json.loads(message)
-        if 'tick' in data:
-            tick = data['tick']
-            symbol = tick['symbol']
-            latest_ticks[symbol] = tick
-            # Append tick to our storage list
-            if symbol in all_ticks:
-                all_ticks[symbol].append(tick)
-            print(f"Received tick for {symbol}: {tick}")
-    except Exception as e:
-        print("Error in on_message:", e)
-
-def on_error(ws, error):
-    """Handle WebSocket errors."""
-    print("WebSocket error:", error)
-
-def on_close(ws, close_status_code, close_msg):
-    """Handle WebSocket closure."""
-    print("### WebSocket Closed ###")
-
-def on_open(ws):
-    """Handle WebSocket connection establishment."""
-    print("WebSocket Connection Established")
-    # Subscribe to tick data for every volatility symbol in our symbols list
-    for symbol in MT5_SYMBOLS:
-        if symbol.startswith("R_"):
-            request = {"ticks": symbol}
-            ws.send(json.dumps(request))
-            print(f"Subscribed to ticks for: {symbol}")
-
-def start_deriv_websocket():
-    """Start the WebSocket connection."""
-    ws_url = f"wss://ws.derivws.com/websockets/v3?app_id={MT5_APP_ID}"  # Dynamically use API key from config
-    ws_app = websocket.WebSocketApp(
-        ws_url,
-        on_open=on_open,
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close
-    )
-    ws_app.run_forever()
-
-def start_deriv_ws_in_thread():
-    """Start Deriv WebSocket in a separate thread."""
-    ws_thread = threading.Thread(target=start_deriv_websocket)
-    ws_thread.daemon = True  # So it exits with the main program
-    ws_thread.start()
-
-def main():
-    """Main function to process real-time tick data from Deriv API and generate signals."""
-    # Connect to MT5
-    if not connect_mt5():
-        print("Unable to connect to MetaTrader 5, exiting...")
-        return
-
-    # Start real-time data feed via Deriv WebSocket (runs in background)
-    start_deriv_ws_in_thread()
-
-    print("Collecting real-time tick data...")
-
-    # Symbol of interest (e.g., VIX75, but it can be changed to any other symbol)
-    symbol = "R_75"  # Example symbol: Volatility 75 Index
-    while True:
-        tick_list = all_ticks.get(symbol, [])
-        if len(tick_list) < 5:
-            print("Not enough tick data yet, waiting...")
-            time.sleep(5)
-            continue  # Skip iteration if not enough data
-
-        # Convert tick data to OHLC format using our utility
-        ohlc_df = process_tick_data(tick_list, frequency='1min')
-        if ohlc_df is not None and not ohlc_df.empty:
-            ohlc_df['Symbol'] = symbol  # Add Symbol column
-            print("\n--- Processed OHLC Data ---")
-            print(ohlc_df.tail())
-
-            # Compute additional indicators (e.g., RSI, MACD, etc.)
-            df_indicators = calculate_indicators(ohlc_df.copy())
-
-            # Generate Buy/Sell signals across multiple timeframes (weighted algorithm)
-            df_signals = generate_signals(df_indicators.copy())
-            # Ensure the 'Symbol' column is carried forward (if not, add it here)
-            df_signals['Symbol'] = symbol
-
-            # Filter and display generated signals
-            signals = df_signals[df_signals['final_signal'].notnull()]
-            if not signals.empty:
-                print("\n--- Trading Signals ---")
-                for _, row in signals.iterrows():
-                    print(f"Time: {row['time']}, Symbol: {row['Symbol']}, Final Signal: {row['final_signal']}")
-
-                # Execute the latest signal
-                latest_signal = df_signals.iloc[-1].get('final_signal')
-                print(f"\nLatest Signal for {symbol}: {latest_signal}")
-                if latest_signal == 'Buy':
-                    place_trade(symbol, 'buy')
-                elif latest_signal == 'Sell':
-                    place_trade(symbol, 'sell')
-            else:
-                print("No signals generated.")
-        else:
-            print("No sufficient tick data to generate OHLC.")
-
-        time.sleep(5)  # Delay before processing next batch
-
-if __name__ == "__main__":
-    main()
+import logging
+
+from data_loader import (connect_mt5, start_deriv_feed_in_thread, bar_builders, signal_engines, add_tick_listener,
+                         enable_tick_journal, store_tick, warm_start, catch_up, history_cache, register_symbol,
+                         register_configured_symbols, latest_price)
+from instrumentation import recorder
+from order_router import OrderIntent, OrderRouter, TerminalSession
+from pipeline import SignalScheduler  # Runs the weighted multi-timeframe signal algorithm per symbol
+from position_manager import PositionManager
+from snapshot import restore_snapshot, save_snapshot, start_periodic_snapshot
+from structured_logging import setup_logging
+from tick_journal import TickReplay
+
+SIGNAL_COALESCE_SECONDS = 0.05  # Ticks arriving within this window are processed together
+LATENCY_SUMMARY_SECONDS = 60  # How often per-stage latency percentiles are printed
+TRADE_LOT_SIZE = 0.1
+TRADE_COOLDOWN_SECONDS = 60  # Minimum time between two orders for the same symbol
+POSITION_SYNC_SECONDS = 30  # How often the position cache is reconciled with the terminal
+
+logger = logging.getLogger('main')
+logged_signals = {}  # symbol -> (bar time, signal) of the newest signal already logged
+
+# Orders of one cycle are sent as a batch off the signal thread. The MetaTrader5 package drives one
+# terminal per process, so a single session is used; more only help with separate terminals/backends.
+# Prices come from the streamed ticks, the terminal is only asked again after a requote.
+router = OrderRouter([TerminalSession(price_source=latest_price)], default_lot=TRADE_LOT_SIZE)
+# Open exposure per symbol; orders are only sent when a signal changes it
+positions = PositionManager(lot_size=TRADE_LOT_SIZE, cooldown=TRADE_COOLDOWN_SECONDS,
+                            sync_interval=POSITION_SYNC_SECONDS, magic=router.magic)
+
+def has_enough_bars(symbol):
+    """Whether a symbol has history or enough ticks for signals."""
+    builder = bar_builders.get(symbol)
+    if builder is None or (builder.tick_count < 5 and builder.history_bars == 0):
+        logger.debug("Not enough tick data yet, waiting", extra={'symbol': symbol})
+        return False
+    if logger.isEnabledFor(logging.DEBUG):
+        last = builder.current
+        logger.debug("Bars", extra={'symbol': symbol, 'bars': len(builder), 'bar_time': last[0], 'close': last[4]})
+    return True
+
+def handle_signals(symbol, df_signals, execute=True):
+    """
+    Log the signals of a symbol that were not logged before and turn the latest one into order intents.
+    :return: List of OrderIntent (empty if nothing changes or execute is False).
+    """
+    signals = df_signals[df_signals['final_signal'].notnull()]
+    if signals.empty:
+        logger.debug("No signals generated", extra={'symbol': symbol})
+        return []
+
+    # Only bars newer than the last logged signal (or a changed signal on that bar) are logged,
+    # never the whole history; on the first cycle that is just the latest bar
+    newest = (signals['time'].iloc[-1], signals['final_signal'].iloc[-1])
+    logged = logged_signals.get(symbol)
+    if logged is None:
+        new_signals = signals.iloc[-1:]
+    else:
+        new_signals = signals.iloc[signals['time'].searchsorted(logged[0], side='right'):]
+        if new_signals.empty and newest != logged:
+            new_signals = signals.iloc[-1:]
+    for bar_time, signal in zip(new_signals['time'], new_signals['final_signal']):
+        logger.info("Signal", extra={'symbol': symbol, 'bar_time': bar_time, 'signal': signal})
+    logged_signals[symbol] = newest
+
+    # Execute the latest signal
+    latest_signal = df_signals.iloc[-1].get('final_signal')
+    if not execute:
+        return []
+    return [OrderIntent(symbol, action, volume, position=ticket,
+                        callback=lambda result, a=action, v=volume, t=ticket: positions.on_fill(symbol, a, v, t, result))
+            for action, volume, ticket in positions.on_signal(symbol, latest_signal)]
+
+def run_signal_cycle(scheduler, symbols, execute=True):
+    """
+    Update the Buy/Sell signals across multiple timeframes (weighted algorithm) of the given symbols
+    from their online signal engines and send the resulting orders. Symbols are handled in sorted
+    order, so the log of a replayed session is reproducible.
+    """
+    ready = [symbol for symbol in sorted(symbols) if has_enough_bars(symbol)]
+    results = scheduler.run_engine_cycle(bar_builders, signal_engines, symbols=ready)
+    intents = []
+    for symbol, df_signals in results.items():
+        intents.extend(handle_signals(symbol, df_signals, execute=execute))
+    if intents:
+        # Sent on the router's threads so the signal loop never waits on MT5
+        router.submit(intents)
+
+def main(replay_path=None, replay_speed=1.0):
+    """
+    Main function to process real-time tick data from Deriv API and generate signals.
+    With replay_path the ticks recorded in that journal are fed through the pipeline instead
+    (speed 1.0 = real time, None = as fast as possible); signals are then printed but not traded.
+    A fast replay cuts signal cycles at the recorded tick arrival times instead of the wall clock,
+    so replaying the same journal always gives the same cycles and signals.
+    """
+    setup_logging()
+    replaying = replay_path is not None
+    journal = None
+    snapshots = None
+    # Connect to MT5
+    if not replaying and not connect_mt5():
+        logger.error("Unable to connect to MetaTrader 5, exiting")
+        return
+
+    # Signals are updated incrementally, only for symbols that received ticks since their last run
+    scheduler = SignalScheduler()
+    add_tick_listener(scheduler.mark_dirty)
+
+    if replaying:
+        if replay_speed is None:
+            replay = TickReplay(replay_path, store_tick, speed=None, batch_window=SIGNAL_COALESCE_SECONDS,
+                                on_batch=lambda: run_signal_cycle(scheduler, scheduler.take_dirty(), execute=False))
+        else:
+            replay = TickReplay(replay_path, store_tick, speed=replay_speed)
+        # The journal names the symbols, so an offline replay does not need config.py
+        for symbol in replay.recorded_symbols():
+            register_symbol(symbol)
+        if replay_speed is not None:
+            replay.start_in_thread()
+        logger.info("Replaying ticks", extra={'ticks': len(replay.records), 'path': replay_path})
+    else:
+        register_configured_symbols()
+        # Resume from the last snapshot and fetch only the bars missed since, or seed bars and
+        # indicators from cached MT5 history, so signals are valid from the first tick
+        if restore_snapshot(positions=positions):
+            catch_up(cache=history_cache)
+        else:
+            warm_start(cache=history_cache)
+        # Start from the positions already open in the terminal, then reconcile on a timer thread
+        # so the signal loop never waits on positions_get
+        positions.sync(force=True)
+        positions.start_periodic_sync()
+        snapshots = start_periodic_snapshot(positions=positions)
+        # Record the raw tick stream so any live session can be reproduced later
+        journal = enable_tick_journal()
+        # Start real-time data feed via the asyncio Deriv client (runs in background)
+        start_deriv_feed_in_thread()
+        logger.info("Collecting real-time tick data")
+    # Creating instrumentation.PROFILE_FLAG_FILE in the working directory profiles the running process,
+    # the hottest locations are then logged with every summary
+    recorder.start_periodic_summary(LATENCY_SUMMARY_SECONDS, output=logger.info)
+
+    try:
+        if replaying and replay_speed is None:
+            replay.run()
+            logger.info("Replay finished", extra={'ticks': replay.replayed})
+            return
+        while True:
+            # Sleep until the WebSocket handler reports new ticks, then batch the burst
+            dirty_symbols = scheduler.wait_for_dirty(coalesce=SIGNAL_COALESCE_SECONDS,
+                                                     timeout=1.0 if replaying else None)
+            if replaying and not dirty_symbols and replay.finished.is_set():
+                logger.info("Replay finished", extra={'ticks': replay.replayed})
+                break
+            run_signal_cycle(scheduler, dirty_symbols, execute=not replaying)
+    finally:
+        scheduler.shutdown()
+        positions.stop_periodic_sync()
+        router.shutdown()
+        if journal is not None:
+            journal.close()
+        if snapshots is not None:
+            snapshots.set()
+            save_snapshot(positions=positions)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Live trading signals from Deriv ticks.")
+    parser.add_argument('--replay', metavar='JOURNAL', help="Replay a recorded tick journal instead of the live feed")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Replay speed relative to real time, 0 for as fast as possible")
+    args = parser.parse_args()
+    main(replay_path=args.replay, replay_speed=args.speed or None)
@@ -0,0 +1,226 @@
+# mt5_backend.py
+
+import importlib
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MT5_BACKEND_ENV = "MT5_BACKEND"  # "fake" selects FakeMT5, anything else names the module to import
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+
+class FakeMT5:
+    """
+    In-process stand-in for the MetaTrader5 module for offline runs and load tests.
+    Rates are a deterministic function of symbol and bar time, so repeated and incremental
+    downloads agree. Orders fill immediately at the current bid/ask and are kept as positions.
+    :param latency: Seconds added to every call that would go to the terminal.
+    :param order_latency: Extra seconds added to order_send.
+    :param spread_points: Spread of every symbol in points.
+    :param requote_rate: Share of orders answered with a requote instead of a fill.
+    """
+
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_M30 = 30
+    TIMEFRAME_H1 = 16385
+    TIMEFRAME_H4 = 16388
+    TIMEFRAME_D1 = 16408
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    POSITION_TYPE_BUY = 0
+    POSITION_TYPE_SELL = 1
+    TRADE_ACTION_DEAL = 1
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    TRADE_RETCODE_REQUOTE = 10004
+    TRADE_RETCODE_REJECT = 10006
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_PRICE_CHANGED = 10020
+    TRADE_RETCODE_PRICE_OFF = 10021
+
+    TIMEFRAME_SECONDS = {1: 60, 5: 300, 15: 900, 30: 1800, 16385: 3600, 16388: 14400, 16408: 86400}
+
+    def __init__(self, latency=0.0, order_latency=0.0, spread_points=20, point=0.01, requote_rate=0.0, seed=None):
+        self.latency = latency
+        self.order_latency = order_latency
+        self.requote_rate = requote_rate
+        self._random = random.Random(seed)
+        self.spread_points = spread_points
+        self.point = point
+        self.initialized = False
+        self.positions = {}  # ticket -> position namespace
+        self._next_ticket = 1
+        self._lock = threading.Lock()
+
+    def _wait(self, extra=0.0):
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def _prices(self, symbol, bar_times):
+        """Close prices of a symbol at the given bar start times."""
+        phase = zlib.crc32(symbol.encode()) % 1000
+        t = np.asarray(bar_times, dtype=float) / 60.0 + phase
+        noise = ((np.asarray(bar_times, dtype=np.int64) // 60 * 2654435761 + phase) % 4294967296) / 4294967296.0 - 0.5
+        return 1000.0 + 50.0 * np.sin(t / 500.0) + 10.0 * np.sin(t / 37.0) + noise
+
+    # --- Session ---
+    def initialize(self, *args, **kwargs):
+        self._wait()
+        self.initialized = True
+        return True
+
+    def login(self, *args, **kwargs):
+        self._wait()
+        return True
+
+    def shutdown(self):
+        self.initialized = False
+
+    def last_error(self):
+        return (1, 'Success')
+
+    # --- Market data ---
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self._wait()
+        period = self.TIMEFRAME_SECONDS.get(timeframe)
+        if period is None or count <= 0:
+            return None
+        now = int(time.time())
+        last = now - now % period - start_pos * period
+        times = last - period * np.arange(count - 1, -1, -1, dtype=np.int64)
+        close = self._prices(symbol, times)
+        open_prices = self._prices(symbol, times - period)
+        rates = np.zeros(count, dtype=RATES_DTYPE)
+        rates['time'] = times
+        rates['open'] = open_prices
+        rates['close'] = close
+        rates['high'] = np.maximum(open_prices, close) + 0.5
+        rates['low'] = np.minimum(open_prices, close) - 0.5
+        rates['tick_volume'] = period // 2
+        rates['spread'] = self.spread_points
+        return rates
+
+    def symbol_info(self, symbol):
+        self._wait()
+        return SimpleNamespace(name=symbol, visible=True, point=self.point, digits=2, spread=self.spread_points,
+                               volume_min=0.01, volume_max=100.0, volume_step=0.01, trade_contract_size=1.0)
+
+    def symbol_select(self, symbol, enable=True):
+        self._wait()
+        return True
+
+    def symbol_info_tick(self, symbol):
+        self._wait()
+        now = int(time.time())
+        mid = float(self._prices(symbol, [now - now % 60])[0])
+        half_spread = self.spread_points * self.point / 2
+        return SimpleNamespace(time=now, bid=mid - half_spread, ask=mid + half_spread, last=mid)
+
+    # --- Trading ---
+    def order_send(self, request):
+        self._wait(self.order_latency)
+        tick = self.symbol_info_tick(request['symbol'])
+        buy = request['type'] == self.ORDER_TYPE_BUY
+        price = tick.ask if buy else tick.bid
+        with self._lock:
+            if self.requote_rate and self._random.random() < self.requote_rate:
+                return SimpleNamespace(retcode=self.TRADE_RETCODE_REQUOTE, deal=0, order=0, volume=0.0, price=0.0,
+                                       bid=tick.bid, ask=tick.ask, comment='Requote', request=request)
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            closing = request.get('position')
+            if closing is not None:
+                position = self.positions.get(closing)
+                if position is not None:
+                    position.volume = round(position.volume - request['volume'], 8)
+                    if position.volume <= 0:
+                        del self.positions[closing]
+            else:
+                self.positions[ticket] = SimpleNamespace(
+                    ticket=ticket, symbol=request['symbol'], volume=request['volume'], price_open=price,
+                    type=self.POSITION_TYPE_BUY if buy else self.POSITION_TYPE_SELL, time=tick.time,
+                    magic=request.get('magic', 0), comment=request.get('comment', ''))
+        return SimpleNamespace(retcode=self.TRADE_RETCODE_DONE, deal=ticket, order=ticket, volume=request['volume'],
+                               price=price, bid=tick.bid, ask=tick.ask, comment='Request executed', request=request)
+
+    def positions_get(self, symbol=None, ticket=None, **kwargs):
+        self._wait()
+        with self._lock:
+            positions = list(self.positions.values())
+        if symbol is not None:
+            positions = [p for p in positions if p.symbol == symbol]
+        if ticket is not None:
+            positions = [p for p in positions if p.ticket == ticket]
+        return tuple(positions)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def set_backend(backend):
+    """Use the given module or object as the MT5 backend, e.g. FakeMT5() for offline runs."""
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    """
+    Return the active MT5 backend, importing it on first use: the MetaTrader5 package, or
+    FakeMT5 when the MT5_BACKEND environment variable is "fake".
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get(MT5_BACKEND_ENV, 'MetaTrader5')
+                _backend = FakeMT5() if name == 'fake' else importlib.import_module(name)
+    return _backend
+
+
+class _LazyMT5:
+    """Module-like proxy, so callers keep writing mt5.initialize(), mt5.TIMEFRAME_M1, ..."""
+
+    def __getattr__(self, name):
+        return getattr(get_backend(), name)
+
+
+mt5 = _LazyMT5()
+
+
+def connect_mt5():
+    """Initialize the terminal and log in with the credentials from config.py."""
+    from config import MT5_LOGIN, MT5_PASSWORD, MT5_SERVER
+
+    if not mt5.initialize():
+        logger.error("MT5 initialization failed: %s", mt5.last_error())
+        return False
+    authorized = mt5.login(MT5_LOGIN, password=MT5_PASSWORD, server=MT5_SERVER)
+    if not authorized:
+        logger.error("MT5 login failed", extra={'login': MT5_LOGIN, 'server': MT5_SERVER})
+        return False
+    logger.info("Connected to MetaTrader 5", extra={'server': MT5_SERVER})
+    return True
@@ -0,0 +1,206 @@
+# optimizer.py
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import simulate_trades, trade_statistics
+from candlestick_patterns import BULLISH_ENGULFING, BULLISH_PIN_BAR, detect_patterns, has_pattern
+from signal_generator import (TIMEFRAMES, DEFAULT_INDICATOR_WEIGHTS, DEFAULT_TIMEFRAME_WEIGHTS, calculate_ema,
+                              calculate_macd, calculate_rsi, calculate_sma, resample_timeframes)
+
+# Parameters a sweep can vary, with the values generate_signals uses by default
+DEFAULT_PARAMS = dict(
+    {f'{name.lower()}_weight': weight for name, weight in DEFAULT_INDICATOR_WEIGHTS.items()},
+    rsi_upper=70,
+    rsi_lower=30,
+    **{f'tf_{timeframe}': weight for timeframe, weight in DEFAULT_TIMEFRAME_WEIGHTS.items()}
+)
+
+STAT_COLUMNS = ['total_pnl', 'max_drawdown', 'num_trades', 'win_rate', 'avg_trade', 'profit_factor']
+
+
+def prepare_features(df, timeframes=TIMEFRAMES):
+    """
+    Compute everything the signal parameters do not affect, once per history: the resampled bars,
+    indicator values and sub-signals, candlestick flags and the time alignment of every timeframe
+    to the 1-minute bars and of those to the history rows.
+    :param df: M1 history indexed by time with open/high/low/close columns.
+    :return: Dictionary of name -> NumPy array.
+    """
+    features = {
+        'open': df['open'].to_numpy(dtype=float),
+        'close': df['close'].to_numpy(dtype=float),
+        'spread': df['spread'].to_numpy(dtype=float) if 'spread' in df.columns else np.zeros(len(df)),
+    }
+    bars_by_timeframe = resample_timeframes(df, timeframes)
+    base_index = bars_by_timeframe[timeframes[0]].index
+    base_close = pd.DataFrame({'close_time': base_index + pd.Timedelta(timeframes[0])})
+    features['row_to_base'] = base_index.get_indexer(df.index.floor(timeframes[0])).astype(np.int64)
+
+    for timeframe in timeframes:
+        bars = bars_by_timeframe[timeframe]
+        close = bars['close'].to_numpy()
+        macd = calculate_macd(bars).to_numpy()
+        features[f'{timeframe}_rsi'] = calculate_rsi(bars).to_numpy()
+        features[f'{timeframe}_macd'] = np.where(macd > 0, 1.0, np.where(macd < 0, -1.0, 0.0))
+        features[f'{timeframe}_sma'] = np.where(calculate_sma(bars).to_numpy() > close, 1.0, -1.0)
+        features[f'{timeframe}_ema'] = np.where(calculate_ema(bars).to_numpy() > close, 1.0, -1.0)
+        pattern_mask = detect_patterns(bars['open'], bars['high'], bars['low'], close)
+        features[f'{timeframe}_bullish'] = has_pattern(pattern_mask, BULLISH_ENGULFING | BULLISH_PIN_BAR)
+        # Latest bar of this timeframe closed by the close of each 1-minute bar (-1 if none yet)
+        timeframe_close = pd.DataFrame({
+            'close_time': bars.index + pd.Timedelta(timeframe),
+            'position': np.arange(len(bars), dtype=float)
+        })
+        aligned = pd.merge_asof(base_close, timeframe_close, on='close_time', direction='backward')
+        features[f'{timeframe}_align'] = aligned['position'].fillna(-1).to_numpy().astype(np.int64)
+    return features
+
+
+def evaluate_params(features, params, segments, timeframes=TIMEFRAMES, lot_size=0.1, point=0.01):
+    """
+    Score one parameter combination, reproducing generate_signals(align='time') on the prepared features.
+    :param segments: List of (start, stop) history row ranges to compute statistics for.
+    :return: List with one statistics dictionary per segment.
+    """
+    fused = np.zeros(len(features[f'{timeframes[0]}_align']))
+    for timeframe in timeframes:
+        rsi = features[f'{timeframe}_rsi']
+        rsi_signal = np.where(rsi > params['rsi_upper'], -1.0, np.where(rsi < params['rsi_lower'], 1.0, 0.0))
+        weighted = (rsi_signal * params['rsi_weight'] +
+                    features[f'{timeframe}_macd'] * params['macd_weight'] +
+                    features[f'{timeframe}_sma'] * params['sma_weight'] +
+                    features[f'{timeframe}_ema'] * params['ema_weight'])
+        buy = (weighted > 0) | ((weighted == 0) & features[f'{timeframe}_bullish'])
+        signal_values = np.where(buy, 1.0, -1.0)
+        signal_values[:1] = -1.0
+        align = features[f'{timeframe}_align']
+        fused += params[f'tf_{timeframe}'] * np.where(align >= 0, signal_values[align], 0.0)
+
+    signal_positions = np.where(fused[features['row_to_base']] > 0, 1, -1).astype(np.int8)
+    results = []
+    for start, stop in segments:
+        ledger = simulate_trades(features['open'][start:stop], features['close'][start:stop],
+                                 signal_positions[start:stop], lot_size=lot_size,
+                                 spread=features['spread'][start:stop] * point)
+        results.append(trade_statistics(ledger))
+    return results
+
+
+# --- Worker process state (features are attached from shared memory once per worker) ---
+_worker_shm = None
+_worker_features = None
+
+
+def _to_shared_memory(features):
+    """Copy the feature arrays into one shared memory block; return (block, layout)."""
+    layout = {}
+    offset = 0
+    for name, array in features.items():
+        layout[name] = (offset, array.shape, array.dtype.str)
+        offset += (array.nbytes + 7) // 8 * 8
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+    for name, array in features.items():
+        start, shape, dtype = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = array
+    return shm, layout
+
+
+def _init_worker(shm_name, layout):
+    global _worker_shm, _worker_features
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_features = {
+        name: np.ndarray(shape, dtype=dtype, buffer=_worker_shm.buf, offset=start)
+        for name, (start, shape, dtype) in layout.items()
+    }
+
+
+def _evaluate_chunk(param_chunk, segments, lot_size, point):
+    return [evaluate_params(_worker_features, params, segments, lot_size=lot_size, point=point)
+            for params in param_chunk]
+
+
+def parameter_grid(grid):
+    """Expand {name: [values]} into parameter dictionaries, filling unlisted names from DEFAULT_PARAMS."""
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(DEFAULT_PARAMS, **dict(zip(names, values)))
+
+
+def run_sweep(features, param_list, segments, max_workers=None, chunk_size=64, lot_size=0.1, point=0.01):
+    """
+    Evaluate every parameter combination on every segment using a process pool. The features
+    are placed in shared memory once and read by all workers without copying.
+    :return: List (per combination) of lists (per segment) of statistics dictionaries.
+    """
+    param_list = list(param_list)
+    if max_workers == 1:
+        return [evaluate_params(features, params, segments, lot_size=lot_size, point=point) for params in param_list]
+
+    shm, layout = _to_shared_memory(features)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(shm.name, layout)) as pool:
+            chunks = [param_list[i:i + chunk_size] for i in range(0, len(param_list), chunk_size)]
+            results = []
+            for chunk_result in pool.map(_evaluate_chunk, chunks, itertools.repeat(segments),
+                                         itertools.repeat(lot_size), itertools.repeat(point)):
+                results.extend(chunk_result)
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def sweep(df, grid, max_workers=None, output_path=None, **kwargs):
+    """
+    Run a parameter sweep over the whole history.
+    :param grid: Dictionary of parameter name -> list of values (see DEFAULT_PARAMS for the names).
+    :param output_path: Optional file the results table is written to (CSV, compressed for .gz).
+    :return: DataFrame with one row per combination, sorted by total_pnl.
+    """
+    features = prepare_features(df)
+    param_list = list(parameter_grid(grid))
+    results = run_sweep(features, param_list, [(0, len(df))], max_workers=max_workers, **kwargs)
+    table = pd.DataFrame(param_list)
+    stats = pd.DataFrame([segment_stats[0] for segment_stats in results])
+    table = pd.concat([table, stats[STAT_COLUMNS]], axis=1).sort_values('total_pnl', ascending=False, ignore_index=True)
+    if output_path is not None:
+        table.to_csv(output_path, index=False, float_format='%.6g')
+    return table
+
+
+def walk_forward(df, grid, num_folds=5, train_folds=2, metric='total_pnl', max_workers=None, output_path=None,
+                 **kwargs):
+    """
+    Walk-forward optimization: the history is split into num_folds consecutive folds; for every
+    window of train_folds folds the best combination by `metric` is picked and scored on the next fold.
+    All windows are evaluated in a single sweep.
+    :return: DataFrame with one row per test fold: the chosen parameters, train metric and test statistics.
+    """
+    features = prepare_features(df)
+    param_list = list(parameter_grid(grid))
+    bounds = np.linspace(0, len(df), num_folds + 1).astype(int)
+    windows = []
+    for fold in range(train_folds, num_folds):
+        windows.append(((bounds[fold - train_folds], bounds[fold]), (bounds[fold], bounds[fold + 1])))
+    segments = [segment for window in windows for segment in window]
+    results = run_sweep(features, param_list, segments, max_workers=max_workers, **kwargs)
+
+    rows = []
+    for w, (train, test) in enumerate(windows):
+        train_scores = np.array([combination[2 * w][metric] for combination in results])
+        best = int(np.argmax(train_scores))
+        row = {'train_start': df.index[train[0]], 'test_start': df.index[test[0]], 'test_end': df.index[test[1] - 1]}
+        row.update(param_list[best])
+        row[f'train_{metric}'] = train_scores[best]
+        row.update({f'test_{name}': results[best][2 * w + 1][name] for name in STAT_COLUMNS})
+        rows.append(row)
+    table = pd.DataFrame(rows)
+    if output_path is not None:
+        table.to_csv(output_path, index=False, float_format='%.6g')
+    return table
@@ -0,0 +1,211 @@
+# order_router.py
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import recorder
+from mt5_backend import mt5
+from trade_executor import TradeExecutor
+
+logger = logging.getLogger(__name__)
+
+# Backend retcodes after which the order is sent again with a fresh price
+RETRY_RETCODES = ('TRADE_RETCODE_REQUOTE', 'TRADE_RETCODE_PRICE_CHANGED', 'TRADE_RETCODE_PRICE_OFF')
+
+
+class OrderIntent:
+    """
+    One order to route.
+    :param action: 'buy' or 'sell'.
+    :param volume: Lots before normalization; None uses the router's lot size for the symbol.
+    :param price: Limit for the first attempt; None (and every retry) uses the current bid/ask.
+    :param position: Ticket of the position to close (hedging accounts).
+    :param account: Account whose sessions send the order (None for the default account).
+    :param callback: Called with the final order_send result (None on failure) on a router thread.
+    """
+
+    def __init__(self, symbol, action, volume=None, price=None, magic=None, comment=None, position=None,
+                 account=None, callback=None):
+        self.symbol = symbol
+        self.action = action.lower()
+        self.volume = volume
+        self.price = price
+        self.magic = magic
+        self.comment = comment
+        self.position = position
+        self.account = account
+        self.callback = callback
+
+    def __repr__(self):
+        return f"OrderIntent({self.symbol!r}, {self.action!r}, volume={self.volume}, account={self.account!r})"
+
+
+class OrderResult:
+    """Outcome of one intent: the last order_send result, its retcode and how many attempts it took."""
+
+    def __init__(self, intent, result, attempts, latency):
+        self.intent = intent
+        self.result = result
+        self.retcode = result.retcode if result is not None else None
+        self.attempts = attempts
+        self.latency = latency
+
+    @property
+    def ok(self):
+        return self.retcode == mt5.TRADE_RETCODE_DONE
+
+
+class TerminalSession(TradeExecutor):
+    """
+    One logged-in terminal connection: a TradeExecutor (request templates, symbol info, pricing and
+    order_send) with its own credentials. The MetaTrader5 package talks to a single terminal per
+    process, so calls through sessions sharing that backend run one at a time; sessions only send
+    in parallel when each has its own backend (e.g. a terminal bridged from another process).
+    :param backend: MT5 module or object, the active backend from mt5_backend by default.
+    :param login: Account to log in to; without it the session logs in like TradeExecutor, with the
+        credentials from config.py.
+    :param path: Terminal executable passed to initialize, if several terminals are installed.
+    :param executor_kwargs: Passed on to TradeExecutor, e.g. price_source.
+    """
+
+    def __init__(self, backend=None, account=None, login=None, password=None, server=None, path=None,
+                 **executor_kwargs):
+        super().__init__(backend=backend, **executor_kwargs)
+        self.account = account
+        self.login = login
+        self.password = password
+        self.server = server
+        self.path = path
+
+    def _login(self):
+        if self.login is None:
+            return super()._login()
+        kwargs = {'path': self.path} if self.path else {}
+        if not self.backend.initialize(**kwargs):
+            logger.error("MT5 initialization failed: %s", self.backend.last_error(), extra={'account': self.account})
+            return False
+        if not self.backend.login(self.login, password=self.password, server=self.server):
+            logger.error("MT5 login failed", extra={'account': self.account})
+            return False
+        return True
+
+
+class OrderRouter:
+    """
+    Sends batches of order intents through a bounded pool of terminal sessions, off the caller's thread.
+    Requests are built by the sessions' TradeExecutor templates, volumes are normalized per symbol
+    to the cached symbol_info volume_min/volume_step/volume_max, requotes and price changes are
+    retried with a refreshed price on the same session, and a lost connection is re-established
+    once before giving up. Retcodes of all orders are counted in `retcodes`.
+    :param sessions: TerminalSession objects; at most this many orders are in flight at once.
+    :param lot_sizes: Optional symbol -> lots used for intents without a volume.
+    """
+
+    def __init__(self, sessions, lot_sizes=None, default_lot=0.1, deviation=10, magic=234000,
+                 comment="Trend detection trade", max_retries=3):
+        if not sessions:
+            raise ValueError("OrderRouter needs at least one session.")
+        self.lot_sizes = dict(lot_sizes or {})
+        self.default_lot = default_lot
+        self.deviation = deviation
+        self.magic = magic
+        self.comment = comment
+        self.max_retries = max_retries
+        self.sessions = {}
+        for session in sessions:
+            self.sessions.setdefault(session.account, queue.Queue()).put(session)
+        self.retcodes = Counter()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=len(sessions))
+
+    def _request(self, session, intent, info, price):
+        volume = intent.volume if intent.volume is not None else self.lot_sizes.get(intent.symbol, self.default_lot)
+        return session.build_request(
+            intent.symbol, intent.action, session.normalize_volume(info, volume), price, intent.position,
+            deviation=self.deviation,
+            magic=intent.magic if intent.magic is not None else self.magic,
+            comment=intent.comment if intent.comment is not None else self.comment)
+
+    def _send(self, intent, submitted_at):
+        sessions = self.sessions.get(intent.account)
+        if sessions is None:
+            logger.error("No terminal session", extra={'account': intent.account})
+            return self._finish(OrderResult(intent, None, 0, 0.0))
+        session = sessions.get()
+        result = None
+        attempts = 0
+        try:
+            retry_retcodes = {getattr(session.backend, name) for name in RETRY_RETCODES}
+            price = intent.price
+            fresh = False
+            reconnected = False
+            while attempts <= self.max_retries:
+                if not session.connect():
+                    break
+                info = session.get_symbol_info(intent.symbol)
+                if info is None:
+                    logger.error("Unknown symbol", extra={'symbol': intent.symbol})
+                    break
+                if price is None:
+                    price = session.current_price(intent.symbol, intent.action, info, fresh=fresh)
+                    if price is None:
+                        logger.warning("No tick data", extra={'symbol': intent.symbol})
+                        break
+                attempts += 1
+                result = session.order_send(self._request(session, intent, info, price))
+                if result is None:
+                    # Connection lost (order_send marked the session disconnected): log in again once
+                    if reconnected:
+                        break
+                    reconnected = True
+                elif result.retcode in retry_retcodes:
+                    # Requoted: retry at the terminal's current price without reconnecting
+                    price = None
+                    fresh = True
+                else:
+                    break
+        finally:
+            sessions.put(session)
+        latency = time.perf_counter() - submitted_at
+        recorder.record('submit_to_fill', intent.symbol, latency)
+        return self._finish(OrderResult(intent, result, attempts, latency))
+
+    def _finish(self, order_result):
+        with self._lock:
+            self.retcodes[order_result.retcode] += 1
+        intent = order_result.intent
+        fields = {'symbol': intent.symbol, 'action': intent.action, 'account': intent.account,
+                  'retcode': order_result.retcode, 'attempts': order_result.attempts,
+                  'latency_ms': round(order_result.latency * 1000, 1)}
+        if order_result.ok:
+            logger.info("Order filled", extra=dict(fields, volume=order_result.result.volume,
+                                                   price=order_result.result.price))
+        else:
+            logger.error("Order failed", extra=fields)
+        if order_result.intent.callback is not None:
+            try:
+                order_result.intent.callback(order_result.result)
+            except Exception:
+                logger.exception("Error in order callback", extra={'symbol': intent.symbol})
+        return order_result
+
+    def submit(self, intents):
+        """Dispatch a batch of intents without waiting; returns one future (of OrderResult) per intent."""
+        submitted_at = time.perf_counter()
+        return [self._pool.submit(self._send, intent, submitted_at) for intent in intents]
+
+    def route(self, intents):
+        """Send a batch of intents in parallel and wait for all of them; returns OrderResults in input order."""
+        return [future.result() for future in self.submit(intents)]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def retcode_summary(order_results):
+    """Count the retcodes of a batch of OrderResults (None for orders that could not be sent)."""
+    return Counter(order_result.retcode for order_result in order_results)
@@ -0,0 +1,163 @@
+# pipeline.py
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from indicators import calculate_indicators
+from instrumentation import recorder
+from signal_generator import generate_signals
+from structured_logging import setup_worker_logging, worker_log_queue
+
+logger = logging.getLogger(__name__)
+
+# Worker processes are started fresh instead of forked: the pool is created once the feed, journal,
+# snapshot and logging threads run, and a forked child could inherit one of their locks held
+WORKER_START_METHOD = 'spawn'
+
+
+def run_signal_pipeline(symbol, ohlc_df):
+    """
+    Run indicators and signal generation for one symbol's OHLC bars.
+    Kept at module level so it can be sent to a worker process; stage durations travel back
+    with the result in df_signals.attrs['timings'].
+    """
+    ohlc_df['Symbol'] = symbol
+    start = time.perf_counter()
+    df_indicators = calculate_indicators(ohlc_df.copy())
+    indicators_done = time.perf_counter()
+    df_signals = generate_signals(df_indicators.copy(), align='time')
+    df_signals['Symbol'] = symbol
+    df_signals.attrs['timings'] = {
+        'calculate_indicators': indicators_done - start,
+        'generate_signals': time.perf_counter() - indicators_done,
+    }
+    return df_signals
+
+
+def run_signal_engine(symbol, builder, engine):
+    """
+    Incremental counterpart of run_signal_pipeline for the live loop: feed the bars the builder
+    added or revised since the last call into the symbol's signal_engine.SignalEngine and return its
+    recent signals, the rows generate_signals(align='time') would give for them. The cost depends on
+    the new bars only, not on the length of the history.
+    """
+    start = time.perf_counter()
+    engine.sync(builder)
+    df_signals = engine.to_frame(symbol)
+    df_signals.attrs['timings'] = {'generate_signals': time.perf_counter() - start}
+    return df_signals
+
+
+class SignalScheduler:
+    """
+    Runs the signal pipeline for every symbol whose data changed since its last run,
+    one task per symbol on a worker pool, so a cycle takes about as long as the slowest
+    symbol instead of the sum over all symbols.
+    run_engine_cycle does the same with the symbols' online signal engines in the calling thread,
+    which is how the live loop runs; the pool is only created by the first run_cycle.
+    :param max_workers: Pool size, defaults to the executor's own default.
+    :param use_processes: Use a process pool (true parallelism for the pandas/TA-Lib work)
+        instead of a thread pool.
+    :param start_method: multiprocessing start method of the worker processes.
+    """
+
+    def __init__(self, max_workers=None, use_processes=True, start_method=WORKER_START_METHOD):
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.start_method = start_method
+        self.executor = None
+        self.dirty = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def mark_dirty(self, symbol):
+        """Flag a symbol as having new data and wake up wait_for_dirty; safe to call from the WebSocket thread."""
+        with self._changed:
+            self.dirty.add(symbol)
+            self._changed.notify()
+
+    def wait_for_dirty(self, coalesce=0.05, timeout=None):
+        """
+        Block until at least one symbol is dirty, then keep collecting for `coalesce` seconds
+        so a burst of ticks is processed as one batch.
+        :return: Set of dirty symbols (empty if the timeout expired first).
+        """
+        with self._changed:
+            if not self._changed.wait_for(lambda: self.dirty, timeout=timeout):
+                return set()
+        if coalesce > 0:
+            time.sleep(coalesce)
+        return self.take_dirty()
+
+    def take_dirty(self):
+        """Return and clear the set of symbols flagged since the last call."""
+        with self._lock:
+            dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def run_cycle(self, load_bars, symbols=None):
+        """
+        Run the pipeline for the given symbols (default: the dirty ones) in parallel.
+        :param load_bars: Callable returning the OHLC DataFrame for a symbol, or None to skip it.
+        :return: Dictionary of symbol -> signals DataFrame for the symbols that ran successfully.
+        """
+        if symbols is None:
+            symbols = self.take_dirty()
+        futures = {}
+        for symbol in symbols:
+            ohlc_df = load_bars(symbol)
+            if ohlc_df is None or ohlc_df.empty:
+                continue
+            if self.executor is None:
+                self.executor = self._create_executor()
+            futures[symbol] = self.executor.submit(run_signal_pipeline, symbol, ohlc_df)
+
+        results = {}
+        for symbol, future in futures.items():
+            try:
+                results[symbol] = self._record(symbol, future.result())
+            except Exception:
+                logger.exception("Error generating signals", extra={'symbol': symbol})
+        return results
+
+    def _create_executor(self):
+        if not self.use_processes:
+            return ThreadPoolExecutor(max_workers=self.max_workers)
+        context = multiprocessing.get_context(self.start_method)
+        # Records logged in the workers are sent back to this process's log writer
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context, initializer=setup_worker_logging,
+                                   initargs=(worker_log_queue(context), logging.getLogger().getEffectiveLevel()))
+
+    def run_engine_cycle(self, builders, engines, symbols=None):
+        """
+        Bring the signal engines of the given symbols (default: the dirty ones) up to date in the
+        calling thread; a cycle only costs the bars added since the previous one.
+        :param builders: Dictionary of symbol -> BarBuilder, e.g. data_loader.bar_builders.
+        :param engines: Dictionary of symbol -> SignalEngine, e.g. data_loader.signal_engines.
+        :return: Dictionary of symbol -> recent signals DataFrame.
+        """
+        if symbols is None:
+            symbols = self.take_dirty()
+        results = {}
+        for symbol in symbols:
+            builder, engine = builders.get(symbol), engines.get(symbol)
+            if builder is None or engine is None or not len(builder):
+                continue
+            try:
+                results[symbol] = self._record(symbol, run_signal_engine(symbol, builder, engine))
+            except Exception:
+                logger.exception("Error generating signals", extra={'symbol': symbol})
+        return results
+
+    @staticmethod
+    def _record(symbol, df_signals):
+        for stage, seconds in df_signals.attrs.get('timings', {}).items():
+            recorder.record(stage, symbol, seconds)
+        return df_signals
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
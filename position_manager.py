@@ -0,0 +1,211 @@
+# position_manager.py
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from mt5_backend import mt5
+
+logger = logging.getLogger(__name__)
+
+VOLUME_EPSILON = 1e-8
+
+
+def signal_direction(signal):
+    """Map a final signal ('Buy'/'Sell' or int8 1/-1) to +1/-1; anything else (Hold, NaN) gives 0."""
+    if signal == 'Buy' or signal == 1:
+        return 1
+    if signal == 'Sell' or signal == -1:
+        return -1
+    return 0
+
+
+class PositionManager:
+    """
+    Cached open positions per symbol that turn signals into orders only when they change exposure.
+    The target for a symbol is +lot_size after a Buy and -lot_size after a Sell; a repeated signal,
+    a Hold or a signal within `cooldown` seconds of the last order produces no order.
+    The cache is refreshed from mt5.positions_get every `sync_interval` seconds on its own thread
+    (start_periodic_sync) and is updated right away from order results, so the signal loop never
+    waits on the terminal.
+    :param magic: Only positions with this magic number are counted (all positions if None).
+    :param netting: Netting account (one order for the difference) instead of hedging (opposite
+        positions are closed by ticket before opening the new one).
+    :param pending_timeout: Seconds after which an order without a result no longer blocks new ones.
+    """
+
+    def __init__(self, lot_size=0.1, cooldown=60.0, sync_interval=30.0, magic=None, netting=True,
+                 pending_timeout=30.0):
+        self.lot_size = lot_size
+        self.cooldown = cooldown
+        self.sync_interval = sync_interval
+        self.magic = magic
+        self.netting = netting
+        self.pending_timeout = pending_timeout
+        self.positions = {}  # ticket -> (symbol, signed volume)
+        self.net = {}  # symbol -> signed volume of the open positions
+        self.pending = {}  # symbol -> {position ticket (None for an opening order): sent at}
+        self.last_signal = {}  # symbol -> direction of the last signal acted on
+        self.last_order_at = {}  # symbol -> time of the last order
+        self.last_sync = None
+        self._lock = threading.Lock()
+        self._sync_due = threading.Event()
+        self._sync_thread = None
+        self._stop_sync = threading.Event()
+
+    def sync(self, force=False):
+        """
+        Refresh the position cache from the terminal if it is older than sync_interval (or if forced).
+        Only symbols whose tickets or volumes changed are recomputed.
+        :return: Set of symbols whose net position changed, or None if no sync was due or it failed.
+        """
+        now = time.monotonic()
+        if not force and self.last_sync is not None and now - self.last_sync < self.sync_interval:
+            return None
+        positions = mt5.positions_get()
+        if positions is None:
+            logger.warning("Position sync failed: %s", mt5.last_error())
+            return None
+        current = {}
+        for position in positions:
+            if self.magic is not None and position.magic != self.magic:
+                continue
+            volume = position.volume if position.type == mt5.POSITION_TYPE_BUY else -position.volume
+            current[position.ticket] = (position.symbol, volume)
+
+        with self._lock:
+            changed = {self.positions[ticket][0] for ticket in self.positions.keys() - current.keys()}
+            changed.update(symbol for ticket, (symbol, volume) in current.items()
+                           if self.positions.get(ticket) != (symbol, volume))
+            self.positions = current
+            for symbol in changed:
+                self.net[symbol] = sum(volume for s, volume in current.values() if s == symbol)
+            self.last_sync = now
+        return changed
+
+    def start_periodic_sync(self):
+        """
+        Reconcile with the terminal every sync_interval seconds, and right after fills (whose new
+        tickets are only known from the terminal), in a daemon thread.
+        :return: The thread; stop it with stop_periodic_sync().
+        """
+        def run():
+            while not self._stop_sync.is_set():
+                self._sync_due.wait(self.sync_interval)
+                if self._stop_sync.is_set():
+                    break
+                self._sync_due.clear()
+                try:
+                    self.sync(force=True)
+                except Exception:
+                    logger.exception("Error syncing positions")
+
+        self._stop_sync.clear()
+        self._sync_thread = threading.Thread(target=run, daemon=True)
+        self._sync_thread.start()
+        return self._sync_thread
+
+    def stop_periodic_sync(self):
+        self._stop_sync.set()
+        self._sync_due.set()
+        if self._sync_thread is not None:
+            self._sync_thread.join()
+            self._sync_thread = None
+
+    def net_position(self, symbol):
+        """Signed open volume of a symbol according to the cache (+ long, - short)."""
+        with self._lock:
+            return self.net.get(symbol, 0.0)
+
+    def _tickets(self, symbol, direction):
+        """Tickets and volumes of the cached positions of a symbol on one side (+1 long, -1 short)."""
+        return [(ticket, abs(volume)) for ticket, (s, volume) in self.positions.items()
+                if s == symbol and volume * direction > 0]
+
+    def on_signal(self, symbol, signal, now=None):
+        """
+        Decide the orders needed to follow a signal.
+        :return: List of (action, volume, position ticket or None) orders, empty if nothing should be sent.
+        """
+        direction = signal_direction(signal)
+        if direction == 0:
+            return []
+        now = time.monotonic() if now is None else now
+        if not self.netting and self.last_sync is None and self.last_signal.get(symbol) != direction:
+            # Closing by ticket needs the tickets of positions opened since the last sync
+            if self._sync_thread is not None:
+                self._sync_due.set()
+                return []  # Acted on in a later cycle, once the sync thread has the tickets
+            self.sync(force=True)
+        with self._lock:
+            if self.last_signal.get(symbol) == direction:
+                return []
+            pending = self.pending.get(symbol)
+            if pending and any(now - sent_at < self.pending_timeout for sent_at in pending.values()):
+                return []
+            last_order_at = self.last_order_at.get(symbol)
+            if last_order_at is not None and now - last_order_at < self.cooldown:
+                return []
+
+            target = direction * self.lot_size
+            current = self.net.get(symbol, 0.0)
+            delta = round(target - current, 8)
+            self.last_signal[symbol] = direction
+            if abs(delta) < VOLUME_EPSILON:
+                return []
+
+            action = 'buy' if delta > 0 else 'sell'
+            if self.netting:
+                orders = [(action, abs(delta), None)]
+            else:
+                # Close the positions on the other side by ticket, then open what is still missing
+                orders = [(action, volume, ticket) for ticket, volume in self._tickets(symbol, -direction)]
+                remaining = round(abs(delta) - sum(volume for _, volume, _ in orders), 8)
+                if remaining > VOLUME_EPSILON:
+                    orders.append((action, remaining, None))
+            self.pending[symbol] = {ticket: now for _, _, ticket in orders}
+            self.last_order_at[symbol] = now
+        return orders
+
+    def get_state(self):
+        """Last signal acted on per symbol, for snapshot files (positions themselves come from the terminal)."""
+        with self._lock:
+            symbols = list(self.last_signal)
+            return {'symbols': np.array(symbols, dtype=str),
+                    'last_signal': np.array([self.last_signal[s] for s in symbols], dtype=np.int8)}
+
+    def set_state(self, state):
+        """Restore the signals saved by get_state, so a restart does not act on the same signal again."""
+        with self._lock:
+            self.last_signal.update(zip(np.asarray(state['symbols']).tolist(),
+                                        np.asarray(state['last_signal']).tolist()))
+
+    def on_fill(self, symbol, action, volume, ticket, result):
+        """
+        Apply an order result to the cache (use as the executor callback). A failed order clears the
+        remembered signal, so the same signal is tried again on the next cycle. New signals for the
+        symbol wait until every order of the previous one has a result.
+        """
+        with self._lock:
+            pending = self.pending.get(symbol)
+            if pending is not None:
+                pending.pop(ticket, None)
+                if not pending:
+                    del self.pending[symbol]
+            if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
+                self.last_signal.pop(symbol, None)
+                return
+            signed = result.volume if action == 'buy' else -result.volume
+            self.net[symbol] = round(self.net.get(symbol, 0.0) + signed, 8)
+            if ticket is not None:
+                position_symbol, position_volume = self.positions.get(ticket, (symbol, 0.0))
+                remaining = round(position_volume + signed, 8)
+                if abs(remaining) < VOLUME_EPSILON:
+                    self.positions.pop(ticket, None)
+                else:
+                    self.positions[ticket] = (position_symbol, remaining)
+            # New positions get their tickets from the next sync
+            self.last_sync = None
+        self._sync_due.set()
@@ -0,0 +1,199 @@
+# signal_engine.py
+
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicator_engine import OnlineEMA, OnlineMACD, OnlineRSI, OnlineSMA
+from signal_generator import (DEFAULT_INDICATOR_WEIGHTS, DEFAULT_TIMEFRAME_WEIGHTS, FINAL_REASONING, SIGNAL_BUY,
+                              SIGNAL_SELL, TIMEFRAMES)
+
+BASE_PERIOD = 60  # Seconds per row: the engine follows 1-minute bars
+RECENT_SIGNALS = 60  # Finished 1-minute rows kept for to_frame, more than enough between two signal cycles
+_EMPTY_BAR = (math.nan, math.nan, math.nan, math.nan)
+
+
+def _merge(bar, minute):
+    """OHLC of `bar` extended by a later minute; empty (NaN) bars are skipped like resample does."""
+    if math.isnan(minute[3]):
+        return bar
+    if math.isnan(bar[3]):
+        return tuple(minute)
+    return bar[0], max(bar[1], minute[1]), min(bar[2], minute[2]), minute[3]
+
+
+class TimeframeSignal:
+    """
+    Bars, indicators and the combined indicator/candlestick signal of one timeframe, as computed by
+    signal_generator.generate_weighted_signals and combine_pattern_and_indicator_signals for its last bar.
+    The open bar is only pushed into the indicators when its signal is needed or the bar closes.
+    """
+
+    def __init__(self, timeframe, indicator_weights=None, rsi_upper=70, rsi_lower=30):
+        self.timeframe = timeframe
+        self.period = int(pd.Timedelta(timeframe).total_seconds())
+        self.weights = DEFAULT_INDICATOR_WEIGHTS if indicator_weights is None else indicator_weights
+        self.rsi_upper = rsi_upper
+        self.rsi_lower = rsi_lower
+        # Same indicators as the signal_generator.calculate_* helpers
+        self.sma = OnlineSMA(20)
+        self.ema = OnlineEMA(20)
+        self.rsi = OnlineRSI(14)
+        self.macd = OnlineMACD(12, 26, 9)
+        self.start = None  # Start of the open bar
+        self.count = 0  # Bars so far, including the open one
+        self.closed = _EMPTY_BAR  # OHLC of the finished minutes of the open bar
+        self.pushed = False  # Whether the indicators already hold a value for the open bar
+        self.previous = _EMPTY_BAR  # OHLC of the bar before the open one
+        self.previous_signal = None  # Signal of the bar before the open one
+
+    def _push(self, close):
+        indicators = (self.sma, self.ema, self.rsi, self.macd)
+        for indicator in indicators:
+            if self.pushed:
+                indicator.revise(close)
+            else:
+                indicator.update(close)
+        self.pushed = True
+
+    def _signal(self, bar):
+        """SIGNAL_BUY or SIGNAL_SELL for the open bar with the given OHLC."""
+        self._push(bar[3])
+        if self.count == 1:
+            return SIGNAL_SELL  # The first bar has no previous bar and is always Sell
+        o, h, l, c = bar
+        rsi = self.rsi.value
+        macd = self.macd.macd - self.macd.signal
+        rsi_signal = -1 if rsi > self.rsi_upper else (1 if rsi < self.rsi_lower else 0)
+        macd_signal = 1 if macd > 0 else (-1 if macd < 0 else 0)
+        sma_signal = 1 if self.sma.value > c else -1
+        ema_signal = 1 if self.ema.value > c else -1
+        weighted = (rsi_signal * self.weights['RSI'] + macd_signal * self.weights['MACD'] +
+                    sma_signal * self.weights['SMA'] + ema_signal * self.weights['EMA'])
+        if weighted > 0:
+            return SIGNAL_BUY
+        if weighted < 0:
+            return SIGNAL_SELL
+        # Hold: a bullish engulfing or bullish pin bar gives Buy, see candlestick_patterns.detect_patterns
+        o1, c1 = self.previous[0], self.previous[3]
+        body = abs(c - o)
+        bullish_engulfing = c1 < o1 and c > o and c > o1 and o < c1
+        bullish_pin_bar = min(c, o) - l > body * 2 and h - max(c, o) < body
+        return SIGNAL_BUY if bullish_engulfing or bullish_pin_bar else SIGNAL_SELL
+
+    def begin(self, minute_start):
+        self.start = minute_start - minute_start % self.period
+        self.count = 1
+
+    def roll(self, minute, next_start):
+        """Add a finished minute; when the next minute starts a new bar, close the open one."""
+        self.closed = _merge(self.closed, minute)
+        if next_start - next_start % self.period == self.start:
+            return
+        self.previous_signal = self._signal(self.closed)
+        self.previous = self.closed
+        self.start += self.period
+        self.count += 1
+        self.closed = _EMPTY_BAR
+        self.pushed = False
+
+    def vote(self, minute_start, minute):
+        """
+        Vote of this timeframe for the 1-minute row starting at minute_start: the signal of its latest
+        bar closed by the end of that minute, 0 (abstain) if it has none yet.
+        """
+        if minute_start + BASE_PERIOD >= self.start + self.period:
+            return self._signal(_merge(self.closed, minute))
+        return 0 if self.previous_signal is None else self.previous_signal
+
+
+class SignalEngine:
+    """
+    Online counterpart of signal_generator.generate_signals(align='time') for one symbol's 1-minute bars.
+    Every timeframe keeps its own bars and TA-Lib compatible online indicators, so a new or revised
+    bar costs the same whatever the length of the history, and the signal of every 1-minute row equals
+    the batch output for the same bars. Minutes without bars count as empty (NaN) rows, as in
+    BarBuilder.to_frame.
+    """
+
+    def __init__(self, timeframe_weights=None, indicator_weights=None, rsi_upper=70, rsi_lower=30):
+        self.weights = DEFAULT_TIMEFRAME_WEIGHTS if timeframe_weights is None else timeframe_weights
+        self.timeframes = [TimeframeSignal(timeframe, indicator_weights, rsi_upper, rsi_lower)
+                           for timeframe in TIMEFRAMES]
+        self.minute = None  # [start, open, high, low, close] of the latest row
+        self.signals = deque(maxlen=RECENT_SIGNALS)  # (start, signal) of the latest finished rows
+
+    @property
+    def last_time(self):
+        """Start of the latest row, None before the first bar."""
+        return None if self.minute is None else self.minute[0]
+
+    def _row_signal(self):
+        start, minute = self.minute[0], self.minute[1:]
+        weighted_sum = 0.0
+        for timeframe in self.timeframes:
+            weighted_sum += self.weights[timeframe.timeframe] * timeframe.vote(start, minute)
+        return SIGNAL_BUY if weighted_sum > 0 else SIGNAL_SELL
+
+    def update_bar(self, start, open_price, high, low, close, record=True):
+        """
+        Feed a 1-minute bar; repeated starts revise the latest row, older ones are ignored.
+        :param record: Keep the signals of the rows finished by this bar (skipped while seeding).
+        """
+        bar = [int(start), float(open_price), float(high), float(low), float(close)]
+        if self.minute is None:
+            self.minute = bar
+            for timeframe in self.timeframes:
+                timeframe.begin(bar[0])
+            return
+        if bar[0] == self.minute[0]:
+            self.minute = bar
+            return
+        if bar[0] < self.minute[0]:
+            return
+        while True:
+            if record:
+                self.signals.append((self.minute[0], self._row_signal()))
+            next_start = self.minute[0] + BASE_PERIOD
+            for timeframe in self.timeframes:
+                timeframe.roll(self.minute[1:], next_start)
+            if next_start == bar[0]:
+                self.minute = bar
+                return
+            self.minute = [next_start] + list(_EMPTY_BAR)  # Minute without ticks
+
+    def sync(self, builder):
+        """
+        Feed the bars a BarBuilder added or revised since the previous call (all of them the first time).
+        :return: Number of bars fed.
+        """
+        rows = builder.rows_since(self.last_time)
+        first_recorded = len(rows) - RECENT_SIGNALS - 1
+        for i, row in enumerate(rows):
+            self.update_bar(*row, record=i >= first_recorded)
+        return len(rows)
+
+    def latest(self):
+        """(start, signal) of the latest row, or None before the first bar."""
+        if self.minute is None:
+            return None
+        return self.minute[0], self._row_signal()
+
+    def to_frame(self, symbol='Unknown'):
+        """
+        Signals of the recent rows in the format of generate_signals(encoding='str'), oldest first.
+        :return: DataFrame with time, final_signal, reasoning and Symbol columns (empty before the first bar).
+        """
+        rows = list(self.signals)
+        if self.minute is not None:
+            rows.append(self.latest())
+        times = np.array([row[0] for row in rows], dtype='datetime64[s]').astype('datetime64[ns]')
+        final_df = pd.DataFrame({
+            'time': times,
+            'final_signal': np.where(np.array([row[1] for row in rows]) == SIGNAL_BUY, 'Buy', 'Sell').astype(object),
+            'reasoning': FINAL_REASONING,
+        })
+        final_df['Symbol'] = symbol
+        return final_df
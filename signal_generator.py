@@ -1,203 +1,353 @@
-import pandas as pd
-import numpy as np
-import talib
-
-
-def calculate_rsi(df, period=14):
-    """Calculate Relative Strength Index (RSI) using Talib for a DataFrame."""
-    rsi = talib.RSI(df['close'], timeperiod=period)
-    return rsi
-
-def calculate_macd(df, short_period=12, long_period=26, signal_period=9):
-    """Calculate MACD (MACD minus its signal line) using Talib for a DataFrame."""
-    macd, macd_signal, _ = talib.MACD(df['close'], fastperiod=short_period, slowperiod=long_period, signalperiod=signal_period)
-    return macd - macd_signal
-
-def calculate_sma(df, period=20):
-    """Calculate Simple Moving Average (SMA) for a DataFrame."""
-    sma = talib.SMA(df['close'], timeperiod=period)
-    return sma
-
-def calculate_ema(df, period=20):
-    """Calculate Exponential Moving Average (EMA) for a DataFrame."""
-    ema = talib.EMA(df['close'], timeperiod=period)
-    return ema
-
-
-def identify_candlestick_patterns(df):
-    """
-    Identifies basic candlestick patterns: Doji, Engulfing, and Pin Bar.
-    """
-    df['Body'] = abs(df['close'] - df['open'])
-    df['UpperShadow'] = df['high'] - df[['close', 'open']].max(axis=1)
-    df['LowerShadow'] = df[['close', 'open']].min(axis=1) - df['low']
-
-    # Doji: small body relative to overall range
-    df['Doji'] = (df['Body'] < (df['high'] - df['low']) * 0.1)
-
-    # Bullish Engulfing
-    df['Bullish_Engulfing'] = (
-            (df['close'].shift(1) < df['open'].shift(1)) &
-            (df['close'] > df['open']) &
-            (df['close'] > df['open'].shift(1)) &
-            (df['open'] < df['close'].shift(1))
-    )
-
-    # Bearish Engulfing
-    df['Bearish_Engulfing'] = (
-            (df['close'].shift(1) > df['open'].shift(1)) &
-            (df['close'] < df['open']) &
-            (df['open'] > df['close'].shift(1)) &
-            (df['close'] < df['open'].shift(1))
-    )
-
-    # Pin Bar patterns
-    df['Bullish_Pin_Bar'] = (df['LowerShadow'] > df['Body'] * 2) & (df['UpperShadow'] < df['Body'])
-    df['Bearish_Pin_Bar'] = (df['UpperShadow'] > df['Body'] * 2) & (df['LowerShadow'] < df['Body'])
-
-    return df
-
-def generate_weighted_signals(df_indicators):
-    """
-    Generates trading signals (Buy/Sell) based on weighted indicators (RSI, MACD, SMA, EMA).
-    If any indicator is missing from the DataFrame, it is calculated.
-    :param df_indicators: DataFrame containing OHLC data.
-    :return: DataFrame with additional columns for individual signals, weighted signal, and final signal.
-    """
-    # Calculate missing indicators if needed
-    if 'RSI' not in df_indicators.columns:
-        df_indicators['RSI'] = calculate_rsi(df_indicators)
-    if 'MACD' not in df_indicators.columns:
-        df_indicators['MACD'] = calculate_macd(df_indicators)
-    if 'SMA' not in df_indicators.columns:
-        df_indicators['SMA'] = calculate_sma(df_indicators)
-    if 'EMA' not in df_indicators.columns:
-        df_indicators['EMA'] = calculate_ema(df_indicators)
-
-    # Weight factors for each indicator
-    indicator_weights = {
-        'RSI': 0.4,
-        'MACD': 0.3,
-        'SMA': 0.2,
-        'EMA': 0.1,
-    }
-
-    # Ensure all required indicators exist in df_indicators
-    for indicator in indicator_weights.keys():
-        if indicator not in df_indicators.columns:
-            raise ValueError(f"Indicator column '{indicator}' is missing from the dataframe.")
-
-    # Calculate individual signals based on thresholds
-    df_indicators['RSI_signal'] = np.where(df_indicators['RSI'] > 70, 'Sell',
-                                           np.where(df_indicators['RSI'] < 30, 'Buy', 'Neutral'))
-    df_indicators['MACD_signal'] = np.where(df_indicators['MACD'] > 0, 'Buy',
-                                            np.where(df_indicators['MACD'] < 0, 'Sell', 'Neutral'))
-    df_indicators['SMA_signal'] = np.where(df_indicators['SMA'] > df_indicators['close'], 'Buy', 'Sell')
-    df_indicators['EMA_signal'] = np.where(df_indicators['EMA'] > df_indicators['close'], 'Buy', 'Sell')
-
-    # Calculate the weighted signal
-    df_indicators['weighted_signal'] = (
-        df_indicators['RSI_signal'].map({'Buy': 1, 'Sell': -1, 'Neutral': 0}) * indicator_weights['RSI'] +
-        df_indicators['MACD_signal'].map({'Buy': 1, 'Sell': -1, 'Neutral': 0}) * indicator_weights['MACD'] +
-        df_indicators['SMA_signal'].map({'Buy': 1, 'Sell': -1}) * indicator_weights['SMA'] +
-        df_indicators['EMA_signal'].map({'Buy': 1, 'Sell': -1}) * indicator_weights['EMA']
-    )
-
-    # Determine the final signal based on the weighted score
-    df_indicators['final_signal'] = np.where(df_indicators['weighted_signal'] > 0, 'Buy',
-                                             np.where(df_indicators['weighted_signal'] < 0, 'Sell', 'Hold'))
-    return df_indicators
-
-def generate_signals(df):
-    """
-    Generates buy/sell signals based on candlestick patterns and weighted technical indicators
-    using a weighted majority algorithm. Provides reasoning for signals.
-    :param df: DataFrame with OHLC data and 'close' column.
-    :return: DataFrame with final signals, including time, final_signal, reasoning, and Symbol.
-    """
-    # Convert 'time' to datetime and set as index
-    df['time'] = pd.to_datetime(df['time'], errors='coerce')
-    df.set_index('time', inplace=True)
-
-    if df.empty:
-        print("Error: DataFrame is empty")
-        return pd.DataFrame()
-
-    # Define timeframes and weights for the multi-timeframe approach
-    timeframes = ['1min', '5min', '15min', '30min', '1h', '4h', '1d']
-    weights = {
-        '1min': 1,
-        '5min': 1,
-        '15min': 2,
-        '30min': 3,
-        '1h': 4,
-        '4h': 5,
-        '1d': 6
-    }
-
-    all_signals = []  # To store signals for each timeframe
-
-    # Generate signals for each timeframe
-    for timeframe in timeframes:
-        df_resampled = df.resample(timeframe).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
-        df_resampled = identify_candlestick_patterns(df_resampled)
-        # Generate weighted technical indicator signals
-        df_resampled = generate_weighted_signals(df_resampled)
-
-        timeframe_signals = []
-        for i in range(1, len(df_resampled)):
-            signal = None
-            current_time = df_resampled.index[i]
-            # Candlestick pattern signal
-            if df_resampled['Bullish_Engulfing'].iloc[i] or df_resampled['Bullish_Pin_Bar'].iloc[i]:
-                signal = 'Buy'
-            elif df_resampled['Bearish_Engulfing'].iloc[i] or df_resampled['Bearish_Pin_Bar'].iloc[i]:
-                signal = 'Sell'
-
-            # Incorporate weighted technical indicator signal
-            if df_resampled['final_signal'].iloc[i] == 'Buy':
-                signal = 'Buy' if signal != 'Sell' else 'Buy'
-            elif df_resampled['final_signal'].iloc[i] == 'Sell':
-                signal = 'Sell' if signal != 'Buy' else 'Sell'
-
-            timeframe_signals.append({'time': current_time, 'Signal': signal if signal else 'Sell'})  # Default to Sell if no signal
-        all_signals.append(timeframe_signals)
-
-    # Combine signals from all timeframes using a weighted majority vote
-    final_signals = []
-    for index in range(len(df_resampled)):
-        weighted_sum = 0
-        reasoning = []
-        for tf_idx, timeframe_signals in enumerate(all_signals):
-            if index - 1 >= 0 and index - 1 < len(timeframe_signals):
-                sig = timeframe_signals[index - 1]['Signal']
-            else:
-                sig = 'Sell'  # Default to Sell if no signal
-
-            if sig == 'Buy':
-                weighted_sum += weights[timeframes[tf_idx]]
-                reasoning.append(f"{timeframes[tf_idx]}: Buy signal")
-            elif sig == 'Sell':
-                weighted_sum -= weights[timeframes[tf_idx]]
-                reasoning.append(f"{timeframes[tf_idx]}: Sell signal")
-
-        if weighted_sum > 0:
-            final_signal = 'Buy'
-            final_reasoning = "Strong entry from 1-min and 5-min signals, supported by trend strength from higher timeframes."
-        else:
-            final_signal = 'Sell'
-            final_reasoning = "Strong entry from 1-min and 5-min signals, supported by trend strength from higher timeframes."
-
-        final_signals.append({
-            'time': df_resampled.index[index],
-            'final_signal': final_signal,
-            'reasoning': final_reasoning
-        })
-
-    final_df = pd.DataFrame(final_signals)
-    # Propagate Symbol if available
-    if 'Symbol' in df.columns:
-        final_df['Symbol'] = df['Symbol'].iloc[0]
-    else:
-        final_df['Symbol'] = 'Unknown'
-    return final_df
+import logging
+
+import pandas as pd
+import numpy as np
+
+from candlestick_patterns import BULLISH_ENGULFING, BULLISH_PIN_BAR, detect_patterns, has_pattern
+
+logger = logging.getLogger(__name__)
+
+# Weight factors for each indicator in generate_weighted_signals
+DEFAULT_INDICATOR_WEIGHTS = {
+    'RSI': 0.4,
+    'MACD': 0.3,
+    'SMA': 0.2,
+    'EMA': 0.1,
+}
+
+# Reasoning text of every signal with encoding='str'
+FINAL_REASONING = "Strong entry from 1-min and 5-min signals, supported by trend strength from higher timeframes."
+
+# Numeric signal codes used with encoding='int8'
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_HOLD = 0
+
+# Timeframes and weights for the multi-timeframe approach in generate_signals
+TIMEFRAMES = ['1min', '5min', '15min', '30min', '1h', '4h', '1d']
+DEFAULT_TIMEFRAME_WEIGHTS = {
+    '1min': 1,
+    '5min': 1,
+    '15min': 2,
+    '30min': 3,
+    '1h': 4,
+    '4h': 5,
+    '1d': 6
+}
+
+def calculate_rsi(df, period=14):
+    """Calculate Relative Strength Index (RSI) using Talib for a DataFrame."""
+    import talib
+    rsi = talib.RSI(df['close'], timeperiod=period)
+    return rsi
+
+def calculate_macd(df, short_period=12, long_period=26, signal_period=9):
+    """Calculate MACD (MACD minus its signal line) using Talib for a DataFrame."""
+    import talib
+    macd, macd_signal, _ = talib.MACD(df['close'], fastperiod=short_period, slowperiod=long_period, signalperiod=signal_period)
+    return macd - macd_signal
+
+def calculate_sma(df, period=20):
+    """Calculate Simple Moving Average (SMA) for a DataFrame."""
+    import talib
+    sma = talib.SMA(df['close'], timeperiod=period)
+    return sma
+
+def calculate_ema(df, period=20):
+    """Calculate Exponential Moving Average (EMA) for a DataFrame."""
+    import talib
+    ema = talib.EMA(df['close'], timeperiod=period)
+    return ema
+
+
+def identify_candlestick_patterns(df):
+    """
+    Identifies basic candlestick patterns: Doji, Engulfing, and Pin Bar.
+    """
+    df['Body'] = abs(df['close'] - df['open'])
+    df['UpperShadow'] = df['high'] - df[['close', 'open']].max(axis=1)
+    df['LowerShadow'] = df[['close', 'open']].min(axis=1) - df['low']
+
+    # Doji: small body relative to overall range
+    df['Doji'] = (df['Body'] < (df['high'] - df['low']) * 0.1)
+
+    # Bullish Engulfing
+    df['Bullish_Engulfing'] = (
+            (df['close'].shift(1) < df['open'].shift(1)) &
+            (df['close'] > df['open']) &
+            (df['close'] > df['open'].shift(1)) &
+            (df['open'] < df['close'].shift(1))
+    )
+
+    # Bearish Engulfing
+    df['Bearish_Engulfing'] = (
+            (df['close'].shift(1) > df['open'].shift(1)) &
+            (df['close'] < df['open']) &
+            (df['open'] > df['close'].shift(1)) &
+            (df['close'] < df['open'].shift(1))
+    )
+
+    # Pin Bar patterns
+    df['Bullish_Pin_Bar'] = (df['LowerShadow'] > df['Body'] * 2) & (df['UpperShadow'] < df['Body'])
+    df['Bearish_Pin_Bar'] = (df['UpperShadow'] > df['Body'] * 2) & (df['LowerShadow'] < df['Body'])
+
+    return df
+
+def generate_weighted_signals(df_indicators, indicator_weights=None, rsi_upper=70, rsi_lower=30, encoding='str'):
+    """
+    Generates trading signals (Buy/Sell) based on weighted indicators (RSI, MACD, SMA, EMA).
+    If any indicator is missing from the DataFrame, it is calculated.
+    :param df_indicators: DataFrame containing OHLC data.
+    :param indicator_weights: Weight per indicator, defaults to DEFAULT_INDICATOR_WEIGHTS.
+    :param rsi_upper: RSI level above which RSI signals Sell.
+    :param rsi_lower: RSI level below which RSI signals Buy.
+    :param encoding: 'str' for 'Buy'/'Sell'/'Neutral'/'Hold' columns, 'int8' for SIGNAL_BUY/SIGNAL_SELL/SIGNAL_HOLD
+        codes (Neutral is 0).
+    :return: DataFrame with additional columns for individual signals, weighted signal, and final signal.
+    """
+    if encoding not in ('str', 'int8'):
+        raise ValueError(f"Unknown encoding '{encoding}', expected 'str' or 'int8'.")
+
+    # Calculate missing indicators if needed
+    if 'RSI' not in df_indicators.columns:
+        df_indicators['RSI'] = calculate_rsi(df_indicators)
+    if 'MACD' not in df_indicators.columns:
+        df_indicators['MACD'] = calculate_macd(df_indicators)
+    if 'SMA' not in df_indicators.columns:
+        df_indicators['SMA'] = calculate_sma(df_indicators)
+    if 'EMA' not in df_indicators.columns:
+        df_indicators['EMA'] = calculate_ema(df_indicators)
+
+    # Weight factors for each indicator
+    if indicator_weights is None:
+        indicator_weights = DEFAULT_INDICATOR_WEIGHTS
+
+    # Ensure all required indicators exist in df_indicators
+    for indicator in indicator_weights.keys():
+        if indicator not in df_indicators.columns:
+            raise ValueError(f"Indicator column '{indicator}' is missing from the dataframe.")
+
+    if encoding == 'int8':
+        rsi = df_indicators['RSI'].to_numpy()
+        macd = df_indicators['MACD'].to_numpy()
+        close = df_indicators['close'].to_numpy()
+        df_indicators['RSI_signal'] = np.where(rsi > rsi_upper, SIGNAL_SELL,
+                                               np.where(rsi < rsi_lower, SIGNAL_BUY, SIGNAL_HOLD)).astype(np.int8)
+        df_indicators['MACD_signal'] = np.where(macd > 0, SIGNAL_BUY,
+                                                np.where(macd < 0, SIGNAL_SELL, SIGNAL_HOLD)).astype(np.int8)
+        df_indicators['SMA_signal'] = np.where(df_indicators['SMA'].to_numpy() > close, SIGNAL_BUY, SIGNAL_SELL).astype(np.int8)
+        df_indicators['EMA_signal'] = np.where(df_indicators['EMA'].to_numpy() > close, SIGNAL_BUY, SIGNAL_SELL).astype(np.int8)
+        df_indicators['weighted_signal'] = (
+            df_indicators['RSI_signal'] * indicator_weights['RSI'] +
+            df_indicators['MACD_signal'] * indicator_weights['MACD'] +
+            df_indicators['SMA_signal'] * indicator_weights['SMA'] +
+            df_indicators['EMA_signal'] * indicator_weights['EMA']
+        )
+        df_indicators['final_signal'] = np.sign(df_indicators['weighted_signal'].to_numpy()).astype(np.int8)
+        return df_indicators
+
+    # Calculate individual signals based on thresholds
+    df_indicators['RSI_signal'] = np.where(df_indicators['RSI'] > rsi_upper, 'Sell',
+                                           np.where(df_indicators['RSI'] < rsi_lower, 'Buy', 'Neutral'))
+    df_indicators['MACD_signal'] = np.where(df_indicators['MACD'] > 0, 'Buy',
+                                            np.where(df_indicators['MACD'] < 0, 'Sell', 'Neutral'))
+    df_indicators['SMA_signal'] = np.where(df_indicators['SMA'] > df_indicators['close'], 'Buy', 'Sell')
+    df_indicators['EMA_signal'] = np.where(df_indicators['EMA'] > df_indicators['close'], 'Buy', 'Sell')
+
+    # Calculate the weighted signal
+    df_indicators['weighted_signal'] = (
+        df_indicators['RSI_signal'].map({'Buy': 1, 'Sell': -1, 'Neutral': 0}) * indicator_weights['RSI'] +
+        df_indicators['MACD_signal'].map({'Buy': 1, 'Sell': -1, 'Neutral': 0}) * indicator_weights['MACD'] +
+        df_indicators['SMA_signal'].map({'Buy': 1, 'Sell': -1}) * indicator_weights['SMA'] +
+        df_indicators['EMA_signal'].map({'Buy': 1, 'Sell': -1}) * indicator_weights['EMA']
+    )
+
+    # Determine the final signal based on the weighted score
+    df_indicators['final_signal'] = np.where(df_indicators['weighted_signal'] > 0, 'Buy',
+                                             np.where(df_indicators['weighted_signal'] < 0, 'Sell', 'Hold'))
+    return df_indicators
+
+def combine_pattern_and_indicator_signals(df_resampled, return_patterns=False, pattern_mask=None):
+    """
+    Combines candlestick patterns with the weighted indicator signal for every bar at once.
+    The weighted signal wins when it is Buy or Sell; on Hold a bullish pattern gives Buy and
+    everything else defaults to Sell. The first bar has no previous bar and is always Sell.
+    :param df_resampled: DataFrame from generate_weighted_signals (either encoding), with the
+        identify_candlestick_patterns columns unless pattern_mask is given.
+    :param return_patterns: Also return a bool array marking bars whose Buy came from a pattern.
+    :param pattern_mask: Optional candlestick_patterns.detect_patterns mask for the bars.
+    :return: int8 array with +1 for Buy and -1 for Sell per bar.
+    """
+    final = df_resampled['final_signal'].to_numpy()
+    if final.dtype == object:
+        indicator_buy, indicator_hold = final == 'Buy', final == 'Hold'
+    else:
+        indicator_buy, indicator_hold = final == SIGNAL_BUY, final == SIGNAL_HOLD
+    if pattern_mask is not None:
+        bullish_pattern = has_pattern(pattern_mask, BULLISH_ENGULFING | BULLISH_PIN_BAR)
+    else:
+        bullish_pattern = (df_resampled['Bullish_Engulfing'] | df_resampled['Bullish_Pin_Bar']).to_numpy()
+    pattern_buy = indicator_hold & bullish_pattern
+    signal_values = np.where(indicator_buy | pattern_buy, 1, -1).astype(np.int8)
+    signal_values[:1] = -1
+    if return_patterns:
+        pattern_buy[:1] = False
+        return signal_values, pattern_buy
+    return signal_values
+
+def resample_timeframes(df, timeframes):
+    """
+    Resamples OHLC bars into every timeframe in ascending order. Only the first timeframe is
+    resampled from df; each higher timeframe is aggregated from the bars of the one before it,
+    which gives the same bars because the timeframes nest into each other.
+    :param df: DataFrame with a DatetimeIndex and open/high/low/close columns.
+    :param timeframes: Pandas frequency strings, each a multiple of the previous one.
+    :return: Dictionary of timeframe -> resampled OHLC DataFrame.
+    """
+    resampled = {}
+    source = df[['open', 'high', 'low', 'close']]
+    for timeframe in timeframes:
+        source = source.resample(timeframe).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
+        resampled[timeframe] = source
+    return resampled
+
+def align_timeframe_positions(index_by_timeframe, base_timeframe):
+    """
+    For every base timeframe bar, finds the position of the latest bar of each timeframe that has
+    closed by the time the base bar closes, with an as-of merge on the bar close times.
+    :param index_by_timeframe: Dictionary of timeframe -> DatetimeIndex of bar start times.
+    :param base_timeframe: Timeframe the positions are aligned to.
+    :return: Dictionary of timeframe -> int64 array of positions (-1 where no bar has closed yet).
+    """
+    base_index = index_by_timeframe[base_timeframe]
+    base_close = pd.DataFrame({'close_time': base_index + pd.Timedelta(base_timeframe)})
+    positions = {}
+    for timeframe, index in index_by_timeframe.items():
+        timeframe_close = pd.DataFrame({
+            'close_time': index + pd.Timedelta(timeframe),
+            'position': np.arange(len(index), dtype=float)
+        })
+        aligned = pd.merge_asof(base_close, timeframe_close, on='close_time', direction='backward')
+        positions[timeframe] = aligned['position'].fillna(-1).to_numpy().astype(np.int64)
+    return positions
+
+def encode_reasoning(votes, pattern_votes):
+    """
+    Packs the per-timeframe votes behind each fused signal into a uint32 bitmask.
+    Bit k is set when timeframe k voted Buy, bit 8 + k when it voted Sell (neither: it abstained)
+    and bit 16 + k when its Buy came from a candlestick pattern.
+    :param votes: int8 array (timeframes x bars) of +1/-1/0 votes.
+    :param pattern_votes: bool array (timeframes x bars).
+    :return: uint32 array with one mask per bar.
+    """
+    mask = np.zeros(votes.shape[1], dtype=np.uint32)
+    for k in range(votes.shape[0]):
+        mask |= (votes[k] == 1).astype(np.uint32) << k
+        mask |= (votes[k] == -1).astype(np.uint32) << (8 + k)
+        mask |= pattern_votes[k].astype(np.uint32) << (16 + k)
+    return mask
+
+def decode_reasoning(mask, timeframes=TIMEFRAMES):
+    """Turns a reasoning bitmask from encode_reasoning back into text."""
+    mask = int(mask)
+    reasoning = []
+    for k, timeframe in enumerate(timeframes):
+        if mask & (1 << k):
+            pattern = " (candlestick pattern)" if mask & (1 << (16 + k)) else ""
+            reasoning.append(f"{timeframe}: Buy signal{pattern}")
+        elif mask & (1 << (8 + k)):
+            reasoning.append(f"{timeframe}: Sell signal")
+    return ", ".join(reasoning)
+
+def generate_signals(df, align='position', timeframe_weights=None, indicator_weights=None, rsi_upper=70, rsi_lower=30,
+                     encoding='str'):
+    """
+    Generates buy/sell signals based on candlestick patterns and weighted technical indicators
+    using a weighted majority algorithm. Provides reasoning for signals.
+    :param df: DataFrame with OHLC data and 'close' column.
+    :param align: 'position' combines timeframes by row position (one row per daily bar, original
+        behaviour); 'time' aligns every timeframe to the 1-minute bars by time (one row per 1-minute bar).
+    :param timeframe_weights: Vote weight per timeframe, defaults to DEFAULT_TIMEFRAME_WEIGHTS.
+    :param indicator_weights, rsi_upper, rsi_lower: Passed on to generate_weighted_signals.
+    :param encoding: 'str' for 'Buy'/'Sell' signals and a text reasoning column; 'int8' for int8
+        SIGNAL_BUY/SIGNAL_SELL signals, a uint32 reasoning_mask column (see decode_reasoning)
+        and a categorical Symbol column.
+    :return: DataFrame with final signals, including time, final_signal, reasoning, and Symbol.
+    """
+    if align not in ('position', 'time'):
+        raise ValueError(f"Unknown alignment '{align}', expected 'position' or 'time'.")
+    if encoding not in ('str', 'int8'):
+        raise ValueError(f"Unknown encoding '{encoding}', expected 'str' or 'int8'.")
+
+    # Convert 'time' to datetime and set as index
+    df['time'] = pd.to_datetime(df['time'], errors='coerce')
+    df.set_index('time', inplace=True)
+
+    if df.empty:
+        logger.error("DataFrame is empty")
+        return pd.DataFrame()
+
+    # Define timeframes and weights for the multi-timeframe approach
+    timeframes = TIMEFRAMES
+    weights = DEFAULT_TIMEFRAME_WEIGHTS if timeframe_weights is None else timeframe_weights
+
+    all_signals = []  # Per-timeframe signal arrays, +1 for Buy and -1 for Sell
+    all_patterns = []  # Per-timeframe flags for Buy signals that came from a candlestick pattern
+
+    # Generate signals for each timeframe, higher timeframes are built from the lower timeframe bars
+    bars_by_timeframe = resample_timeframes(df, timeframes)
+    for timeframe in timeframes:
+        df_resampled = bars_by_timeframe[timeframe]
+        pattern_mask = detect_patterns(df_resampled['open'], df_resampled['high'], df_resampled['low'],
+                                       df_resampled['close'])
+        # Generate weighted technical indicator signals
+        df_resampled = generate_weighted_signals(df_resampled, indicator_weights, rsi_upper, rsi_lower, encoding)
+        signal_values, pattern_buy = combine_pattern_and_indicator_signals(df_resampled, return_patterns=True,
+                                                                           pattern_mask=pattern_mask)
+        all_signals.append(signal_values)
+        all_patterns.append(pattern_buy)
+        bars_by_timeframe[timeframe] = df_resampled
+
+    if align == 'time':
+        # Every timeframe votes with its latest closed bar, timeframes without one abstain
+        signal_times = bars_by_timeframe[timeframes[0]].index
+        positions = align_timeframe_positions(
+            {timeframe: bars_by_timeframe[timeframe].index for timeframe in timeframes}, timeframes[0])
+        votes = np.zeros((len(timeframes), len(signal_times)), dtype=np.int8)
+        pattern_votes = np.zeros(votes.shape, dtype=bool)
+        for k, timeframe in enumerate(timeframes):
+            has_bar = positions[timeframe] >= 0
+            votes[k] = np.where(has_bar, all_signals[k][positions[timeframe]], 0)
+            pattern_votes[k] = has_bar & all_patterns[k][positions[timeframe]]
+    else:
+        # Bar positions are shared across timeframes, positions a timeframe does not have count as Sell
+        signal_times = df_resampled.index
+        votes = np.full((len(timeframes), len(signal_times)), -1, dtype=np.int8)
+        pattern_votes = np.zeros(votes.shape, dtype=bool)
+        for k in range(len(timeframes)):
+            count = min(len(signal_times), len(all_signals[k]))
+            votes[k, :count] = all_signals[k][:count]
+            pattern_votes[k, :count] = all_patterns[k][:count]
+
+    weighted_sum = np.zeros(len(signal_times))
+    for k, timeframe in enumerate(timeframes):
+        weighted_sum += weights[timeframe] * votes[k]
+
+    symbol = df['Symbol'].iloc[0] if 'Symbol' in df.columns else 'Unknown'
+    if encoding == 'int8':
+        final_df = pd.DataFrame({
+            'time': signal_times,
+            'final_signal': np.where(weighted_sum > 0, SIGNAL_BUY, SIGNAL_SELL).astype(np.int8),
+            'reasoning_mask': encode_reasoning(votes, pattern_votes)
+        })
+        final_df['Symbol'] = pd.Categorical.from_codes(np.zeros(len(final_df), dtype=np.int8), [symbol])
+        return final_df
+
+    final_df = pd.DataFrame({
+        'time': signal_times,
+        'final_signal': np.where(weighted_sum > 0, 'Buy', 'Sell').astype(object),
+        'reasoning': FINAL_REASONING
+    })
+    # Propagate Symbol if available
+    final_df['Symbol'] = symbol
+    return final_df
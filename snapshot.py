@@ -0,0 +1,115 @@
+# snapshot.py
+
+import logging
+import os
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+import data_loader
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = os.path.join("snapshots", "engine_state.npz")
+SNAPSHOT_INTERVAL = 60  # Seconds between periodic snapshots
+SNAPSHOT_VERSION = 1
+
+# Component name in the snapshot file -> data_loader dictionary holding it per symbol. Signal engines
+# are not saved: the signal loop rebuilds them from the restored bars on its first cycle.
+COMPONENTS = {
+    'ticks': data_loader.all_ticks,
+    'bars': data_loader.bar_builders,
+}
+
+
+def save_snapshot(path=SNAPSHOT_PATH, positions=None):
+    """
+    Write the tick stores and bar builders of every symbol (and the last signals of a
+    PositionManager) to one uncompressed .npz file of plain NumPy arrays. The state is
+    captured under data_loader.state_lock, so no symbol is caught halfway through a tick, and the
+    file is written to a temporary name and renamed, so a crash never leaves a partial snapshot.
+    :return: Path of the snapshot.
+    """
+    arrays = {'version': np.array(SNAPSHOT_VERSION), 'saved_at': np.array(time.time())}
+    with data_loader.state_lock:
+        for component, objects in COMPONENTS.items():
+            for symbol, obj in objects.items():
+                for key, value in obj.get_state().items():
+                    arrays[f"{symbol}/{component}/{key}"] = value
+    if positions is not None:
+        for key, value in positions.get_state().items():
+            arrays[f"positions/{key}"] = value
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def restore_snapshot(path=SNAPSHOT_PATH, positions=None):
+    """
+    Load a snapshot written by save_snapshot into the registered symbols; symbols no longer
+    configured are skipped. Call it before the feed is started, then data_loader.catch_up().
+    :return: Dictionary with 'saved_at' and the restored 'symbols', or None if there is no usable snapshot.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if int(data['version']) != SNAPSHOT_VERSION:
+                logger.warning("Ignoring snapshot of another version", extra={'path': path})
+                return None
+            states = {}
+            for name in data.files:
+                parts = name.split('/')
+                if len(parts) == 3:
+                    symbol, component, key = parts
+                    states.setdefault((symbol, component), {})[key] = data[name]
+            saved_at = float(data['saved_at'])
+            position_state = {name[len('positions/'):]: data[name] for name in data.files
+                              if name.startswith('positions/')}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        logger.exception("Could not read snapshot", extra={'path': path})
+        return None
+
+    restored = set()
+    for (symbol, component), state in states.items():
+        objects = COMPONENTS.get(component)
+        if objects is None or symbol not in objects:
+            continue
+        objects[symbol].set_state(state)
+        restored.add(symbol)
+    if positions is not None and position_state:
+        positions.set_state(position_state)
+    logger.info("Restored snapshot", extra={'path': path, 'symbols': len(restored),
+                                            'age_s': round(time.time() - saved_at, 1)})
+    return {'saved_at': saved_at, 'symbols': sorted(restored)}
+
+
+def start_periodic_snapshot(interval=SNAPSHOT_INTERVAL, path=SNAPSHOT_PATH, positions=None):
+    """
+    Save a snapshot every `interval` seconds in a daemon thread.
+    :return: threading.Event that stops the thread when set.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                started = time.perf_counter()
+                save_snapshot(path, positions)
+                logger.debug("Saved snapshot", extra={'path': path,
+                                                      'ms': round((time.perf_counter() - started) * 1000, 1)})
+            except Exception:
+                logger.exception("Error saving snapshot", extra={'path': path})
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop
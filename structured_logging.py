@@ -0,0 +1,197 @@
+# structured_logging.py
+
+import atexit
+import json
+import logging
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_QUEUE_SIZE = 10000  # Records waiting for the writer thread; further records are dropped
+TICK_LOG_INTERVAL = 1.0  # Per-symbol window of the tick logger's rate limit, in seconds
+TICK_LOG_BURST = 1  # Tick records let through per symbol and window
+
+# Attributes every LogRecord has; anything else was passed with extra= and is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+_worker_queue = None  # Records sent by worker processes, see worker_log_queue
+_worker_listener = None
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    One line per record: timestamp, level, logger and message followed by the extra fields
+    as key=value pairs, or everything as a JSON object with json_lines=True.
+    """
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = _fields(record)
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}'
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if self.json_lines:
+            entry = {'time': timestamp, 'level': record.levelname, 'logger': record.name, 'message': message}
+            entry.update(fields)
+            if record.exc_text:
+                entry['exception'] = record.exc_text
+            return json.dumps(entry, default=str)
+        line = f"{timestamp} {record.levelname:<7} {record.name}: {message}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: records that do not fit in the queue are counted and dropped."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _ParentLoggerHandler(logging.Handler):
+    """Hands records from worker processes to the logger of the same name in this process."""
+
+    def handle(self, record):
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records per `interval` seconds through for each (logger, symbol) key.
+    The next record let through carries the number of suppressed ones in its `suppressed` field.
+    """
+
+    def __init__(self, interval=TICK_LOG_INTERVAL, burst=TICK_LOG_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}  # key -> [window start, records let through, records suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, getattr(record, 'symbol', None))
+        now = record.created
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def setup_logging(level=logging.INFO, stream=None, filename=None, json_lines=False, queue_size=LOG_QUEUE_SIZE):
+    """
+    Route all logging through a bounded queue to a background writer thread, so callers only pay
+    for an enqueue. Safe to call more than once; later calls return the running listener.
+    :param stream: Stream to write to (stdout by default) unless filename is given.
+    :return: The QueueListener writing the records.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+    if filename is not None:
+        target = logging.FileHandler(filename)
+    else:
+        target = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    target.setFormatter(StructuredFormatter(json_lines))
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(_queue_handler.queue, target, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def worker_log_queue(mp_context=None):
+    """
+    Multiprocessing queue for the records of worker processes (see setup_worker_logging), created on
+    first use. A listener thread passes them on to the loggers of this process, so they reach the
+    same writer as the records logged here.
+    :param mp_context: multiprocessing context the workers are started with, the default one if None.
+    """
+    global _worker_queue, _worker_listener
+    if _worker_queue is None:
+        context = mp_context if mp_context is not None else multiprocessing.get_context()
+        _worker_queue = context.Queue(LOG_QUEUE_SIZE)
+        _worker_listener = QueueListener(_worker_queue, _ParentLoggerHandler())
+        _worker_listener.start()
+    return _worker_queue
+
+
+def setup_worker_logging(log_queue, level=logging.INFO):
+    """
+    Process pool initializer: send every record of the worker process through log_queue (from
+    worker_log_queue) instead of the handlers it may have inherited from the parent.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+
+def stop_logging():
+    """Write the records still queued and stop the writer thread."""
+    global _listener, _queue_handler, _worker_listener, _worker_queue
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_listener = None
+        _worker_queue = None
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+
+def dropped_records():
+    """Number of records dropped because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def get_tick_logger(name='ticks'):
+    """
+    Logger for per-tick messages: DEBUG level (so it costs one level check when disabled) and
+    rate-limited per symbol. Pass the symbol with extra={'symbol': ...}.
+    """
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter())
+    return logger
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+pytest.importorskip('talib')
+
+import data_loader
+import mt5_backend
+from mt5_backend import FakeMT5
+
+SYMBOL = 'R_TEST'
+DATA_COUNT = 300
+
+
+class GappedMT5(FakeMT5):
+    """Terminal whose M1 history has no bars before `first_bar`, as after an outage on its side."""
+
+    def __init__(self, first_bar):
+        super().__init__()
+        self.first_bar = first_bar
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        rates = super().copy_rates_from_pos(symbol, timeframe, start_pos, count)
+        return rates[rates['time'] >= self.first_bar]
+
+
+class FailingMT5(FakeMT5):
+    """Terminal whose first `failures` downloads return None, as when it is still synchronizing."""
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        if self.failures:
+            self.failures -= 1
+            return None
+        return super().copy_rates_from_pos(symbol, timeframe, start_pos, count)
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    """data_loader with one fake-backed symbol and no config.py; yields a function shifting the clock."""
+    settings = {'HISTORICAL_DATA_COUNT': DATA_COUNT, 'MT5_SYMBOLS': [SYMBOL]}
+    monkeypatch.setattr(data_loader, 'config_value', settings.__getitem__)
+    monkeypatch.setattr(mt5_backend, '_backend', FakeMT5())
+    data_loader.register_symbol(SYMBOL)
+    data_loader.warm_start()
+    real_time = time.time
+
+    def advance(seconds):
+        monkeypatch.setattr(time, 'time', lambda: real_time() + seconds)
+
+    yield advance
+    for objects in (data_loader.all_ticks, data_loader.bar_builders, data_loader.signal_engines):
+        objects.pop(SYMBOL, None)
+
+
+def bar_times():
+    builder = data_loader.bar_builders[SYMBOL]
+    return [row[0] for row in builder.bars] + [builder.current[0]]
+
+
+def test_catch_up_continues_restored_bars(loader):
+    restored = data_loader.bar_builders[SYMBOL]
+    loader(10 * 60)
+    applied = data_loader.catch_up()
+    times = bar_times()
+    assert data_loader.bar_builders[SYMBOL] is restored
+    assert 10 <= applied[SYMBOL] <= 12
+    assert len(times) > DATA_COUNT
+    assert all(b - a == 60 for a, b in zip(times, times[1:]))
+
+
+def test_catch_up_warm_starts_when_snapshot_is_too_old(loader):
+    restored = data_loader.bar_builders[SYMBOL]
+    loader((DATA_COUNT + 50) * 60)
+    applied = data_loader.catch_up()
+    times = bar_times()
+    assert data_loader.bar_builders[SYMBOL] is not restored
+    assert applied[SYMBOL] == DATA_COUNT == len(times)
+    assert all(b - a == 60 for a, b in zip(times, times[1:]))
+
+
+def test_catch_up_warm_starts_when_history_has_a_hole(loader, monkeypatch):
+    restored = data_loader.bar_builders[SYMBOL]
+    loader(20 * 60)
+    now = int(time.time())
+    first_bar = now - now % 60 - 5 * 60
+    monkeypatch.setattr(mt5_backend, '_backend', GappedMT5(first_bar))
+    applied = data_loader.catch_up()
+    times = bar_times()
+    assert data_loader.bar_builders[SYMBOL] is not restored
+    assert applied[SYMBOL] == 6
+    assert times[0] == first_bar
+    assert all(b - a == 60 for a, b in zip(times, times[1:]))
+
+
+def test_catch_up_warm_starts_when_missed_bars_cannot_be_fetched(loader, monkeypatch):
+    restored = data_loader.bar_builders[SYMBOL]
+    loader(10 * 60)
+    monkeypatch.setattr(mt5_backend, '_backend', FailingMT5())
+    applied = data_loader.catch_up()
+    times = bar_times()
+    assert data_loader.bar_builders[SYMBOL] is not restored
+    assert applied[SYMBOL] == DATA_COUNT == len(times)
+    assert all(b - a == 60 for a, b in zip(times, times[1:]))
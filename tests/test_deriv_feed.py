@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+import pytest
+
+websockets_server = pytest.importorskip('websockets.asyncio.server')
+
+from deriv_feed import DerivFeed, parse_tick
+
+TICK_FRAME = json.dumps({"msg_type": "tick", "tick": {"symbol": "R_75", "epoch": 1700000000, "quote": 101.5}})
+# Frame as sent by the Deriv API for a batched subscription
+DERIV_FRAME = ('{"echo_req":{"subscribe":1,"ticks":["R_50","R_75"]},"msg_type":"tick",'
+               '"subscription":{"id":"9ed45a5e-8f87-c735-2b63-36108719eadd"},'
+               '"tick":{"ask":238.9286,"bid":238.9086,"epoch":1700000001,'
+               '"id":"9ed45a5e-8f87-c735-2b63-36108719eadd","pip_size":4,"quote":238.9186,"symbol":"R_50"}}')
+
+
+def test_parse_tick_reads_a_deriv_frame():
+    assert parse_tick(DERIV_FRAME) == ('R_50', 1700000001, 238.9186, 238.9086, 238.9286)
+    assert parse_tick(json.dumps(json.loads(DERIV_FRAME), indent=1)) == ('R_50', 1700000001, 238.9186, 238.9086, 238.9286)
+    assert parse_tick('{"echo_req":{"ticks":["R_50"]},"msg_type":"ticks"}') is None
+
+
+def test_feed_retries_after_rejected_handshake():
+    """A server answering the handshake with HTTP 503 must not kill the feed; it retries and subscribes."""
+    attempts = []
+    ticks = []
+    received = threading.Event()
+
+    def process_request(connection, request):
+        attempts.append(request.path)
+        if len(attempts) <= 2:
+            return connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, "busy\n")
+        return None
+
+    async def handler(ws):
+        await ws.recv()  # Subscription request
+        await ws.send(TICK_FRAME)
+        await ws.wait_closed()
+
+    def on_tick(*tick):
+        ticks.append(tick)
+        received.set()
+
+    async def scenario():
+        async with websockets_server.serve(handler, '127.0.0.1', 0, process_request=process_request) as server:
+            port = server.sockets[0].getsockname()[1]
+            feed = DerivFeed(['R_75'], on_tick, f"ws://127.0.0.1:{port}", reconnect_delay=0.01)
+            task = asyncio.create_task(feed.run())
+            await asyncio.get_running_loop().run_in_executor(None, received.wait, 5.0)
+            feed.stop()
+            await asyncio.wait_for(task, 5.0)
+
+    asyncio.run(scenario())
+    assert len(attempts) == 3
+    assert ticks == [('R_75', 1700000000, 101.5, None, None)]
+
+
+def test_feed_resubscribes_after_the_server_drops_the_connection():
+    """Every connection, including the one after a server-side close, subscribes to all symbols again."""
+    subscriptions = []
+    ticks = []
+    received = threading.Event()
+
+    async def handler(ws):
+        subscriptions.append(json.loads(await ws.recv()))
+        await ws.send(DERIV_FRAME)
+        if len(subscriptions) == 1:
+            await ws.close()  # Drop the established connection
+        else:
+            await ws.wait_closed()
+
+    def on_tick(*tick):
+        ticks.append(tick)
+        if len(ticks) == 2:
+            received.set()
+
+    async def scenario():
+        async with websockets_server.serve(handler, '127.0.0.1', 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            feed = DerivFeed(['R_50', 'R_75'], on_tick, f"ws://127.0.0.1:{port}", reconnect_delay=0.01)
+            task = asyncio.create_task(feed.run())
+            await asyncio.get_running_loop().run_in_executor(None, received.wait, 5.0)
+            feed.stop()
+            await asyncio.wait_for(task, 5.0)
+
+    asyncio.run(scenario())
+    assert subscriptions == [{"ticks": ['R_50', 'R_75'], "subscribe": 1}] * 2
+    assert ticks == [('R_50', 1700000001, 238.9186, 238.9086, 238.9286)] * 2
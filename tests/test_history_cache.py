@@ -0,0 +1,128 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from history_cache import HEADER_SIZE, HISTORY_COMPLETE, HistoryCache
+from mt5_backend import RATES_DTYPE, FakeMT5
+
+SYMBOL = 'R_TEST'
+M1 = FakeMT5.TIMEFRAME_M1
+DATA_COUNT = 300
+NOW = 1_700_000_000
+
+
+class RecordingMT5(FakeMT5):
+    """FakeMT5 that records the requested bar counts and has no bars before `first_bar`."""
+
+    def __init__(self, first_bar=None):
+        super().__init__()
+        self.first_bar = first_bar
+        self.counts = []
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self.counts.append(count)
+        rates = super().copy_rates_from_pos(symbol, timeframe, start_pos, count)
+        return rates if self.first_bar is None else rates[rates['time'] >= self.first_bar]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fixed wall clock; call it with a number of minutes to move it forward."""
+    now = [NOW]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+
+    def advance(minutes):
+        now[0] += minutes * 60
+        return now[0] - now[0] % 60  # Start of the open bar
+
+    return advance
+
+
+@pytest.fixture
+def source():
+    return RecordingMT5()
+
+
+@pytest.fixture
+def cache(tmp_path, source):
+    return HistoryCache(cache_dir=str(tmp_path), source=source)
+
+
+def cached_bars(cache):
+    path = cache.path(SYMBOL, M1)
+    assert (os.path.getsize(path) - HEADER_SIZE) % RATES_DTYPE.itemsize == 0
+    return cache.load(SYMBOL, M1)
+
+
+def assert_latest_bars(rates, open_bar, count=DATA_COUNT):
+    assert len(rates) == count and rates['time'][-1] == open_bar
+    assert np.all(np.diff(rates['time']) == 60)
+    expected = FakeMT5().copy_rates_from_pos(SYMBOL, M1, 0, count)
+    assert np.array_equal(rates, expected)
+
+
+def test_update_appends_only_the_new_bars(cache, source, clock):
+    assert_latest_bars(cache.update(SYMBOL, M1, DATA_COUNT), clock(0))
+    assert source.counts == [DATA_COUNT]
+    size = os.path.getsize(cache.path(SYMBOL, M1))
+
+    open_bar = clock(5)
+    assert_latest_bars(cache.update(SYMBOL, M1, DATA_COUNT), open_bar)
+    assert source.counts[1:] == [64]
+    # The previously open bar is rewritten and five bars are appended after it
+    assert os.path.getsize(cache.path(SYMBOL, M1)) == size + 5 * RATES_DTYPE.itemsize
+    assert_latest_bars(cached_bars(cache), open_bar, DATA_COUNT + 5)
+
+
+def test_partial_trailing_record_is_dropped(cache, clock):
+    cache.update(SYMBOL, M1, DATA_COUNT)
+    with open(cache.path(SYMBOL, M1), 'ab') as f:
+        f.write(b'\x00' * (RATES_DTYPE.itemsize // 2))  # Crash in the middle of an append
+    assert len(cache.load(SYMBOL, M1)) == DATA_COUNT
+
+    open_bar = clock(2)
+    assert_latest_bars(cache.update(SYMBOL, M1, DATA_COUNT), open_bar)
+    assert_latest_bars(cached_bars(cache), open_bar, DATA_COUNT + 2)
+
+
+def test_short_history_is_marked_complete(cache, source, clock):
+    source.first_bar = clock(0) - 99 * 60
+    rates = cache.update(SYMBOL, M1, DATA_COUNT)
+    assert len(rates) == 100 and rates['time'][0] == source.first_bar
+    assert cache.flags(SYMBOL, M1) & HISTORY_COMPLETE
+
+    # Fewer bars than requested are cached, but there is nothing older: only the new bars are fetched
+    open_bar = clock(3)
+    rates = cache.update(SYMBOL, M1, DATA_COUNT)
+    assert source.counts == [DATA_COUNT, 64]
+    assert len(rates) == 103 and rates['time'][-1] == open_bar
+    assert cache.flags(SYMBOL, M1) & HISTORY_COMPLETE
+
+
+def test_fetch_since_widens_until_it_reaches_the_cache(cache, source, clock):
+    cache.update(SYMBOL, M1, DATA_COUNT)
+    open_bar = clock(1000)
+    assert_latest_bars(cache.update(SYMBOL, M1, DATA_COUNT), open_bar)
+    assert source.counts == [DATA_COUNT, 64, 256, 1024]
+    assert_latest_bars(cached_bars(cache), open_bar, DATA_COUNT + 1000)
+
+
+def test_fetch_since_stops_at_max_fetch(tmp_path, source, clock):
+    cache = HistoryCache(cache_dir=str(tmp_path), source=source, max_fetch=500)
+    cache.update(SYMBOL, M1, DATA_COUNT)
+    clock(1000)
+    cache.update(SYMBOL, M1, DATA_COUNT)
+    assert source.counts == [DATA_COUNT, 64, 256, 500]
+
+
+def test_cache_starts_over_rather_than_keep_a_hole(cache, source, clock):
+    cache.update(SYMBOL, M1, DATA_COUNT)
+    open_bar = clock(600)
+    source.first_bar = open_bar - 199 * 60  # The terminal lost the bars right after the cached ones
+    rates = cache.update(SYMBOL, M1, DATA_COUNT)
+    assert len(rates) == 200 and rates['time'][0] == source.first_bar
+    cached = cached_bars(cache)
+    assert cached['time'][0] == source.first_bar and cached['time'][-1] == open_bar
+    assert np.all(np.diff(cached['time']) == 60)
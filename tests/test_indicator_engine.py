@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+talib = pytest.importorskip('talib')
+
+from indicator_engine import IndicatorEngine
+
+
+def talib_values(closes):
+    """Latest values of indicators.calculate_indicators' TA-Lib columns for a close series."""
+    macd, macd_signal, _ = talib.MACD(closes, fastperiod=12, slowperiod=26, signalperiod=9)
+    return {
+        'SMA_50': talib.SMA(closes, timeperiod=50)[-1],
+        'SMA_200': talib.SMA(closes, timeperiod=200)[-1],
+        'EMA_20': talib.EMA(closes, timeperiod=20)[-1],
+        'RSI': talib.RSI(closes, timeperiod=14)[-1],
+        'MACD': macd[-1],
+        'MACD_signal': macd_signal[-1],
+    }
+
+
+def assert_matches(values, expected):
+    for name, value in expected.items():
+        np.testing.assert_allclose(values[name], value, rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+
+@pytest.mark.parametrize('gaps', [(), (5, 20, 120, 260)], ids=['no_gaps', 'gaps'])
+def test_update_bar_matches_talib_with_revisions(gaps):
+    rng = np.random.default_rng(7)
+    closes = 100 + np.cumsum(rng.normal(0, 0.5, 320))
+    closes[list(gaps)] = np.nan  # Minutes without ticks are NaN bars in BarBuilder.to_frame
+    engine = IndicatorEngine()
+    for i, close in enumerate(closes):
+        bar_time = 1_700_000_040 + 60 * i
+        # Ticks inside the open bar revise its close before the final one
+        for revision in close + rng.normal(0, 0.3, 3):
+            assert_matches(engine.update_bar(bar_time, revision), talib_values(np.append(closes[:i], revision)))
+        assert_matches(engine.update_bar(bar_time, close), talib_values(closes[:i + 1]))
+
+
+def test_seed_continues_the_batch_output():
+    rng = np.random.default_rng(11)
+    closes = 100 + np.cumsum(rng.normal(0, 0.5, 300))
+    engine = IndicatorEngine()
+    engine.seed(closes[:-1], last_time=0)
+    engine.update_bar(0, closes[-2] + 1.0)
+    assert_matches(engine.update_bar(60, closes[-1]),
+                   talib_values(np.append(closes[:-2], [closes[-2] + 1.0, closes[-1]])))
@@ -0,0 +1,39 @@
+import threading
+import time
+
+import instrumentation
+from instrumentation import apply_profile_flag, enable_profiler, disable_profiler, format_profile
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_flag_file_starts_and_stops_the_profiler(tmp_path):
+    flag = tmp_path / "profile.flag"
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,))
+    worker.start()
+    try:
+        assert apply_profile_flag(str(flag)) is None and instrumentation.profiler is None
+        flag.touch()
+        assert apply_profile_flag(str(flag)) is None and instrumentation.profiler is not None
+        time.sleep(0.1)
+        flag.unlink()
+        top = apply_profile_flag(str(flag))
+    finally:
+        stop.set()
+        worker.join()
+    assert instrumentation.profiler is None
+    assert any('busy_loop' in location for location, _ in top)
+    assert 'busy_loop' in format_profile(top)
+
+
+def test_flag_file_leaves_a_profiler_started_in_code_running(tmp_path):
+    enable_profiler()
+    try:
+        assert apply_profile_flag(str(tmp_path / "profile.flag")) is None
+        assert instrumentation.profiler is not None
+    finally:
+        disable_profiler()
@@ -0,0 +1,148 @@
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+import mt5_backend
+import trade_executor
+from mt5_backend import FakeMT5
+from order_router import OrderIntent, OrderRouter, TerminalSession, retcode_summary
+from position_manager import PositionManager
+
+
+class ScriptedMT5(FakeMT5):
+    """FakeMT5 that answers the first order_send calls from a script (None, 'requote' or 'reject')."""
+
+    def __init__(self, script=(), **kwargs):
+        super().__init__(**kwargs)
+        self.script = list(script)
+        self.requests = []
+        self.initialized_count = 0
+        self.logins = 0
+
+    def initialize(self, *args, **kwargs):
+        self.initialized_count += 1
+        return super().initialize(*args, **kwargs)
+
+    def login(self, *args, **kwargs):
+        self.logins += 1
+        return super().login(*args, **kwargs)
+
+    def order_send(self, request):
+        self.requests.append(request)
+        if self.script:
+            answer = self.script.pop(0)
+            if answer is None:
+                return None
+            tick = self.symbol_info_tick(request['symbol'])
+            retcode = self.TRADE_RETCODE_REQUOTE if answer == 'requote' else self.TRADE_RETCODE_REJECT
+            return SimpleNamespace(retcode=retcode, deal=0, order=0, volume=0.0, price=0.0, bid=tick.bid, ask=tick.ask,
+                                   comment=answer, request=request)
+        return super().order_send(request)
+
+
+def make_router(backend, **session_kwargs):
+    session = TerminalSession(backend=backend, login=1, password='secret', server='Demo', **session_kwargs)
+    return OrderRouter([session], lot_sizes={'R_10': 0.1234}, default_lot=0.1)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """ScriptedMT5 as the active backend (PositionManager and OrderResult use the module-level proxy)."""
+    backend = ScriptedMT5()
+    monkeypatch.setattr(mt5_backend, '_backend', backend)
+    return backend
+
+
+def test_volumes_are_normalized_to_the_symbol(fake):
+    router = make_router(fake)
+    results = router.route([OrderIntent('R_10', 'buy'), OrderIntent('R_25', 'buy', volume=0.001),
+                            OrderIntent('R_50', 'sell', volume=500)])
+    router.shutdown()
+    assert [request['volume'] for request in fake.requests] == [0.12, 0.01, 100.0]
+    assert all(result.ok for result in results)
+
+
+def test_requote_is_retried_at_a_fresh_price_without_reconnecting(fake):
+    fake.script = ['requote']
+    streamed = lambda symbol: (time.time(), float('nan'), float('nan'), 1.0)  # Fresh tick far off the market
+    router = make_router(fake, price_source=streamed)
+    result = router.route([OrderIntent('R_10', 'buy')])[0]
+    router.shutdown()
+    assert result.ok and result.attempts == 2
+    first, retry = fake.requests
+    assert first['price'] != retry['price'] == fake.symbol_info_tick('R_10').ask
+    assert fake.initialized_count == fake.logins == 1
+
+
+def test_lost_connection_is_reestablished_once(fake):
+    fake.script = [None]
+    router = make_router(fake)
+    result = router.route([OrderIntent('R_10', 'buy')])[0]
+    assert result.ok and result.attempts == 2
+    assert fake.initialized_count == fake.logins == 2
+
+    fake.script = [None, None]
+    result = router.route([OrderIntent('R_10', 'buy')])[0]
+    router.shutdown()
+    assert result.result is None and result.attempts == 2
+    assert fake.initialized_count == 3  # One reconnect, then the order is given up
+
+
+def test_session_without_credentials_logs_in_with_config(fake, monkeypatch):
+    calls = []
+    monkeypatch.setattr(trade_executor, 'connect_mt5', lambda: calls.append(1) or fake.initialize())
+    fake.script = [None]
+    router = OrderRouter([TerminalSession(backend=fake)])
+    assert router.route([OrderIntent('R_10', 'buy')])[0].ok
+    router.shutdown()
+    assert len(calls) == 2 and fake.logins == 0
+
+
+def test_retcodes_are_counted(fake):
+    fake.script = ['reject']
+    router = make_router(fake)
+    results = router.route([OrderIntent('R_10', 'buy'), OrderIntent('R_25', 'sell'), OrderIntent('R_50', 'buy')])
+    router.shutdown()
+    expected = Counter({fake.TRADE_RETCODE_DONE: 2, fake.TRADE_RETCODE_REJECT: 1})
+    assert router.retcodes == expected == retcode_summary(results)
+    assert results[0].retcode == fake.TRADE_RETCODE_REJECT and results[0].attempts == 1
+
+
+def send(router, positions, symbol, orders):
+    """Route PositionManager orders with on_fill as the callback, as main.handle_signals does."""
+    intents = [OrderIntent(symbol, action, volume, position=ticket,
+                           callback=lambda result, a=action, v=volume, t=ticket: positions.on_fill(symbol, a, v, t,
+                                                                                                  result))
+               for action, volume, ticket in orders]
+    return router.route(intents)
+
+
+def test_position_manager_gates_orders_on_a_netting_account(fake):
+    router = make_router(fake)
+    positions = PositionManager(lot_size=0.1, cooldown=60, netting=True)
+    orders = positions.on_signal('R_10', 'Buy', now=0)
+    assert orders == [('buy', 0.1, None)]
+    assert positions.on_signal('R_10', 'Sell', now=1) == []  # Waits for the pending order
+    send(router, positions, 'R_10', orders)
+    assert positions.net_position('R_10') == 0.1
+    assert positions.on_signal('R_10', 'Buy', now=2) == []  # Repeated signal
+    assert positions.on_signal('R_10', 'Sell', now=30) == []  # Cooldown
+    assert positions.on_signal('R_10', 'Sell', now=61) == [('sell', 0.2, None)]
+    router.shutdown()
+
+
+def test_position_manager_closes_by_ticket_on_a_hedging_account(fake):
+    router = make_router(fake)
+    positions = PositionManager(lot_size=0.1, cooldown=0, netting=False)
+    send(router, positions, 'R_10', positions.on_signal('R_10', 'Buy', now=0))
+    assert positions.on_signal('R_10', 'Buy', now=1) == []
+    (ticket,) = fake.positions
+    orders = positions.on_signal('R_10', 'Sell', now=2)  # Syncs first, the fill left no ticket
+    assert orders == [('sell', 0.1, ticket), ('sell', 0.1, None)]
+    send(router, positions, 'R_10', orders)
+    router.shutdown()
+    assert fake.requests[-2]['position'] == ticket
+    positions.sync(force=True)
+    assert ticket not in fake.positions and positions.net_position('R_10') == -0.1
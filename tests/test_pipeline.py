@@ -0,0 +1,28 @@
+import logging
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('talib')
+
+from pipeline import SignalScheduler
+
+
+def bars_without_close(symbol):
+    return pd.DataFrame({'time': pd.date_range('2024-01-01', periods=3, freq='1min'), 'open': [1.0, 2.0, 3.0]})
+
+
+def test_worker_records_reach_the_parent_loggers(caplog):
+    caplog.set_level(logging.INFO)
+    scheduler = SignalScheduler(max_workers=1)
+    try:
+        assert scheduler.run_cycle(bars_without_close, symbols=['R_TEST']) == {}
+    finally:
+        scheduler.shutdown()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not any(record.name == 'indicators' for record in caplog.records):
+        time.sleep(0.01)  # Worker records arrive on the listener thread
+    (record,) = [record for record in caplog.records if record.name == 'indicators']
+    assert record.processName.startswith('SpawnProcess')  # Not forked from a process running threads
+    assert record.getMessage() == "DataFrame does not contain 'close' column"
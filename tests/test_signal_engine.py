@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('talib')
+
+from bar_builder import BarBuilder
+from signal_engine import RECENT_SIGNALS, SignalEngine
+from signal_generator import generate_signals
+
+START = 1_700_006_400 - 3 * 3600 + 17 * 60  # 20:17 UTC, so daily bars close during the stream
+GAP = (150 * 60, 185 * 60)  # Seconds after START without ticks
+MINUTES = 5650  # Long enough for every timeframe's indicators, with Buy and Sell signals near the end
+
+
+def tick_stream(minutes=MINUTES, seed=9):
+    """(epoch, quote) ticks every 20 seconds with a gap of empty minutes."""
+    rng = np.random.default_rng(seed)
+    quote = 100.0
+    for second in range(0, minutes * 60, 20):
+        quote += rng.normal(0, 0.05)
+        if not GAP[0] <= second < GAP[1]:
+            yield START + second, quote
+
+
+def batch_signals(builder):
+    return generate_signals(builder.to_frame(), align='time')
+
+
+def assert_same_signals(engine, builder):
+    online = engine.to_frame()
+    batch = batch_signals(builder).tail(len(online)).reset_index(drop=True)
+    assert online['time'].tolist() == batch['time'].tolist()
+    assert online['final_signal'].tolist() == batch['final_signal'].tolist()
+    assert online['reasoning'].tolist() == batch['reasoning'].tolist()
+
+
+def test_streamed_bars_match_generate_signals():
+    builder = BarBuilder('1min')
+    engine = SignalEngine()
+    streamed = {}
+    for i, (epoch, quote) in enumerate(tick_stream()):
+        builder.update(epoch, quote)
+        # Syncs land mid-minute, so the next sync revises the open bar
+        if i % 41 == 0:
+            engine.sync(builder)
+            online = engine.to_frame()
+            streamed.update(zip(online['time'], online['final_signal']))
+            if i % (41 * 43) == 0:
+                assert_same_signals(engine, builder)
+    engine.sync(builder)
+    online = engine.to_frame()
+    streamed.update(zip(online['time'], online['final_signal']))
+
+    batch = batch_signals(builder)
+    assert set(batch['final_signal']) == {'Buy', 'Sell'}
+    assert list(streamed) == batch['time'].tolist()
+    assert list(streamed.values()) == batch['final_signal'].tolist()
+
+
+def test_seeded_engine_matches_generate_signals():
+    builder = BarBuilder('1min')
+    for epoch, quote in tick_stream():
+        builder.update(epoch, quote)
+    engine = SignalEngine()
+    assert engine.sync(builder) == len(builder)
+    assert len(engine.to_frame()) == RECENT_SIGNALS + 1
+    assert set(engine.to_frame()['final_signal']) == {'Buy', 'Sell'}
+    assert_same_signals(engine, builder)
+    assert engine.sync(builder) == 1  # Only the open bar is fed again
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('talib')
+
+from signal_generator import (combine_pattern_and_indicator_signals, generate_signals, generate_weighted_signals,
+                              identify_candlestick_patterns)
+
+TIMEFRAMES = ['1min', '5min', '15min', '30min', '1h', '4h', '1d']
+WEIGHTS = {'1min': 1, '5min': 1, '15min': 2, '30min': 3, '1h': 4, '4h': 5, '1d': 6}
+
+
+def loop_timeframe_signals(df_resampled):
+    """Per-bar Buy/Sell of one timeframe, frozen from the loop generate_signals used before vectorizing."""
+    timeframe_signals = []
+    for i in range(1, len(df_resampled)):
+        signal = None
+        current_time = df_resampled.index[i]
+        # Candlestick pattern signal
+        if df_resampled['Bullish_Engulfing'].iloc[i] or df_resampled['Bullish_Pin_Bar'].iloc[i]:
+            signal = 'Buy'
+        elif df_resampled['Bearish_Engulfing'].iloc[i] or df_resampled['Bearish_Pin_Bar'].iloc[i]:
+            signal = 'Sell'
+
+        # Incorporate weighted technical indicator signal
+        if df_resampled['final_signal'].iloc[i] == 'Buy':
+            signal = 'Buy' if signal != 'Sell' else 'Buy'
+        elif df_resampled['final_signal'].iloc[i] == 'Sell':
+            signal = 'Sell' if signal != 'Buy' else 'Sell'
+
+        timeframe_signals.append({'time': current_time, 'Signal': signal if signal else 'Sell'})
+    return timeframe_signals
+
+
+def loop_generate_signals(df):
+    """generate_signals (align='position') as it was before vectorizing, frozen for comparison."""
+    df['time'] = pd.to_datetime(df['time'], errors='coerce')
+    df.set_index('time', inplace=True)
+
+    all_signals = []
+    for timeframe in TIMEFRAMES:
+        df_resampled = df.resample(timeframe).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
+        df_resampled = identify_candlestick_patterns(df_resampled)
+        df_resampled = generate_weighted_signals(df_resampled)
+        all_signals.append(loop_timeframe_signals(df_resampled))
+
+    final_signals = []
+    for index in range(len(df_resampled)):
+        weighted_sum = 0
+        for tf_idx, timeframe_signals in enumerate(all_signals):
+            if index - 1 >= 0 and index - 1 < len(timeframe_signals):
+                sig = timeframe_signals[index - 1]['Signal']
+            else:
+                sig = 'Sell'
+            if sig == 'Buy':
+                weighted_sum += WEIGHTS[TIMEFRAMES[tf_idx]]
+            elif sig == 'Sell':
+                weighted_sum -= WEIGHTS[TIMEFRAMES[tf_idx]]
+        final_signals.append({
+            'time': df_resampled.index[index],
+            'final_signal': 'Buy' if weighted_sum > 0 else 'Sell',
+            'reasoning': "Strong entry from 1-min and 5-min signals, supported by trend strength from higher timeframes."
+        })
+
+    final_df = pd.DataFrame(final_signals)
+    final_df['Symbol'] = df['Symbol'].iloc[0] if 'Symbol' in df.columns else 'Unknown'
+    return final_df
+
+
+def gapped_bars(minutes, seed=1):
+    """1-minute bars with missing minutes, NaN rows (as BarBuilder.to_frame emits) and a gap of several hours."""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2024-01-01 21:13', periods=minutes, freq='1min')
+    close = 100 + np.cumsum(rng.normal(0, 0.05, minutes)) + 3 * np.sin(np.arange(minutes) / 900)
+    open_prices = np.r_[close[0], close[:-1]] + rng.normal(0, 0.01, minutes)
+    df = pd.DataFrame({'time': times, 'open': open_prices,
+                       'high': np.maximum(open_prices, close) + rng.exponential(0.03, minutes),
+                       'low': np.minimum(open_prices, close) - rng.exponential(0.03, minutes), 'close': close})
+    df.loc[rng.random(minutes) < 0.02, ['open', 'high', 'low', 'close']] = np.nan
+    df.loc[3000:3300, ['open', 'high', 'low', 'close']] = np.nan
+    df['Symbol'] = 'R_TEST'
+    return df[rng.random(minutes) > 0.02].reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def bars():
+    # A month, so that the bars voting by position have valid indicators and give Buy and Sell rows
+    return gapped_bars(30 * 1440)
+
+
+@pytest.mark.parametrize('timeframe', TIMEFRAMES)
+def test_combined_signals_match_the_per_bar_loop(bars, timeframe):
+    df = bars.set_index('time')
+    df_resampled = df.resample(timeframe).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
+    df_resampled = generate_weighted_signals(identify_candlestick_patterns(df_resampled))
+    expected = ['Sell'] + [row['Signal'] for row in loop_timeframe_signals(df_resampled)]
+    signals = combine_pattern_and_indicator_signals(df_resampled)
+    assert np.where(signals == 1, 'Buy', 'Sell').tolist() == expected
+    if timeframe in ('1min', '5min', '15min'):
+        assert set(expected) == {'Buy', 'Sell'}
+
+
+def test_position_aligned_signals_match_the_per_bar_loop(bars):
+    expected = loop_generate_signals(bars.copy())
+    assert set(expected['final_signal']) == {'Buy', 'Sell'}
+    pd.testing.assert_frame_equal(generate_signals(bars.copy(), align='position'), expected)
@@ -0,0 +1,217 @@
+# tick_journal.py
+
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TICK_JOURNAL_DIR = "tick_journal"
+JOURNAL_MAGIC = b'TICKJRN1'
+SYMBOL_SIZE = 16  # Bytes available for the symbol name in a record
+
+# One fixed-width little-endian record per tick; 'received' is the local wall-clock arrival time,
+# which keeps the spacing of ticks sharing the same epoch second for real-time replay
+RECORD_DTYPE = np.dtype([
+    ('received', '<f8'),
+    ('epoch', '<i8'),
+    ('quote', '<f8'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('symbol', f'S{SYMBOL_SIZE}'),
+])
+HEADER_SIZE = len(JOURNAL_MAGIC) + 8  # Magic followed by the record size as uint64
+
+
+def default_journal_path(directory=TICK_JOURNAL_DIR):
+    """Path of a new journal file named after the current UTC time."""
+    return os.path.join(directory, datetime.now(timezone.utc).strftime("ticks-%Y%m%d-%H%M%S.bin"))
+
+
+class TickJournal:
+    """
+    Append-only binary tick journal. record() only puts the tick on a bounded queue; a background
+    thread writes the queued ticks as RECORD_DTYPE records in batches, so the feed never waits on disk.
+    If the writer falls behind and the queue is full, ticks are dropped and counted in `dropped`.
+    Ticks of symbols longer than SYMBOL_SIZE bytes would be cut off, so they are not recorded
+    (counted in `rejected`, with one warning per symbol).
+    :param path: Journal file, appended to if it already exists.
+    """
+
+    def __init__(self, path, max_queue=100000, batch_size=4096):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._symbols = {}  # symbol -> whether it fits in a record
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(JOURNAL_MAGIC + np.uint64(RECORD_DTYPE.itemsize).tobytes())
+            self._file.flush()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record(self, symbol, epoch, quote, bid=None, ask=None):
+        """Queue one tick for writing; safe to call from the feed thread."""
+        fits = self._symbols.get(symbol)
+        if fits is None:
+            fits = self._symbols[symbol] = len(symbol.encode()) <= SYMBOL_SIZE
+            if not fits:
+                logger.warning("Symbol too long for the tick journal, its ticks are not recorded",
+                               extra={'symbol': symbol, 'max_bytes': SYMBOL_SIZE})
+        if not fits:
+            self.rejected += 1
+            return
+        try:
+            self._queue.put_nowait((time.time(), epoch, quote,
+                                    np.nan if bid is None else bid, np.nan if ask is None else ask, symbol))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            if item is None:
+                break
+
+    def _write(self, batch):
+        records = np.empty(len(batch), dtype=RECORD_DTYPE)
+        received, epoch, quote, bid, ask, symbol = zip(*batch)
+        records['received'] = received
+        records['epoch'] = epoch
+        records['quote'] = quote
+        records['bid'] = bid
+        records['ask'] = ask
+        records['symbol'] = [s.encode() for s in symbol]
+        try:
+            self._file.write(records.tobytes())
+            self._file.flush()
+            self.written += len(records)
+        except OSError:
+            logger.exception("Error writing tick journal", extra={'path': self.path})
+
+    def close(self):
+        """Write everything still queued and close the file."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._file.close()
+
+
+def read_journal(path):
+    """
+    Memory-map a journal file. A trailing partial record (e.g. after a crash) is ignored.
+    :return: Read-only structured array of RECORD_DTYPE records, oldest first.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+        raise ValueError(f"{path} is not a tick journal.")
+    if int(np.frombuffer(header, dtype='<u8', offset=len(JOURNAL_MAGIC))[0]) != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} was written with a different record layout.")
+    count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+
+class TickReplay:
+    """
+    Feeds a recorded journal back through on_tick(symbol, epoch, quote, bid, ask), e.g.
+    data_loader.store_tick, so the live pipeline sees the same tick stream again.
+    :param records: Journal path or an array from read_journal.
+    :param speed: Replay speed relative to the recorded arrival times (1.0 = real time, 100.0 = 100x);
+        None replays as fast as possible.
+    :param symbols: Optional subset of symbols to replay.
+    :param on_batch: Optional callable run on the replay thread after each batch of ticks that arrived
+        within `batch_window` seconds of the batch's first tick (by recorded arrival time). Driving
+        signal cycles from it makes a fast replay group ticks the same way on every run.
+    """
+
+    def __init__(self, records, on_tick, speed=1.0, symbols=None, chunk_size=65536, on_batch=None,
+                 batch_window=0.05):
+        self.records = read_journal(records) if isinstance(records, (str, os.PathLike)) else records
+        self.on_tick = on_tick
+        self.speed = speed
+        self.symbols = None if symbols is None else {s.encode() for s in symbols}
+        self.chunk_size = chunk_size
+        self.on_batch = on_batch
+        self.batch_window = batch_window
+        self.replayed = 0
+        self.finished = threading.Event()
+        self._stopped = False
+
+    def recorded_symbols(self):
+        """Sorted names of the symbols in the journal (within the `symbols` subset, if given)."""
+        names = np.unique(self.records['symbol']).tolist()
+        if self.symbols is not None:
+            names = [name for name in names if name in self.symbols]
+        return [name.decode() for name in names]
+
+    def run(self):
+        """Replay every record in order (blocking)."""
+        records = self.records
+        if len(records) == 0:
+            self.finished.set()
+            return
+        first_received = float(records['received'][0])
+        started = time.perf_counter()
+        batch_start = None
+        try:
+            for offset in range(0, len(records), self.chunk_size):
+                chunk = records[offset:offset + self.chunk_size]
+                if self.symbols is not None:
+                    chunk = chunk[np.isin(chunk['symbol'], list(self.symbols))]
+                # Plain Python values are much cheaper to hand out than NumPy scalars
+                symbols = [s.decode() for s in chunk['symbol'].tolist()]
+                for symbol, received, epoch, quote, bid, ask in zip(
+                        symbols, chunk['received'].tolist(), chunk['epoch'].tolist(), chunk['quote'].tolist(),
+                        chunk['bid'].tolist(), chunk['ask'].tolist()):
+                    if self._stopped:
+                        return
+                    if self.speed:
+                        delay = (received - first_received) / self.speed - (time.perf_counter() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+                    if self.on_batch is not None:
+                        if batch_start is not None and received - batch_start > self.batch_window:
+                            self.on_batch()
+                            batch_start = None
+                        if batch_start is None:
+                            batch_start = received
+                    self.on_tick(symbol, epoch, quote, bid, ask)
+                    self.replayed += 1
+            if batch_start is not None and not self._stopped:
+                self.on_batch()
+        finally:
+            self.finished.set()
+
+    def start_in_thread(self):
+        """Run the replay in a daemon thread and return the thread."""
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped = True
@@ -0,0 +1,105 @@
+# tick_store.py
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ('epoch', 'quote', 'bid', 'ask')
+
+
+class TickStore:
+    """
+    Fixed-capacity tick storage for a single symbol backed by preallocated NumPy arrays.
+    Once full, the oldest ticks are overwritten. Every tick is written twice (at i and
+    i + capacity), so any window of up to `capacity` ticks is a contiguous slice and can
+    be returned as a view without copying.
+    Views stay valid until `capacity` further ticks have been appended; copy them if
+    they need to be kept longer.
+    """
+
+    def __init__(self, capacity=100000):
+        if capacity <= 0:
+            raise ValueError("TickStore capacity must be positive.")
+        self.capacity = capacity
+        self.epoch = np.zeros(2 * capacity, dtype=np.int64)
+        self.quote = np.full(2 * capacity, np.nan)
+        self.bid = np.full(2 * capacity, np.nan)
+        self.ask = np.full(2 * capacity, np.nan)
+        self.count = 0  # Total ticks appended since creation
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, epoch, quote, bid=None, ask=None):
+        """Append a single tick, evicting the oldest one when the store is full."""
+        bid = np.nan if bid is None else bid
+        ask = np.nan if ask is None else ask
+        with self._lock:
+            i = self.count % self.capacity
+            j = i + self.capacity
+            self.epoch[i] = self.epoch[j] = epoch
+            self.quote[i] = self.quote[j] = quote
+            self.bid[i] = self.bid[j] = bid
+            self.ask[i] = self.ask[j] = ask
+            self.count += 1
+
+    def append_tick(self, tick):
+        """Append a Deriv tick dictionary (with 'epoch', 'quote' and optionally 'bid'/'ask')."""
+        self.append(tick['epoch'], tick['quote'], tick.get('bid'), tick.get('ask'))
+
+    def _window(self, n):
+        """Return (start, stop) in the doubled buffer for the most recent n ticks."""
+        with self._lock:
+            size = min(self.count, self.capacity)
+            n = size if n is None else max(0, min(n, size))
+            stop = self.count % self.capacity + self.capacity
+        return stop - n, stop
+
+    def last(self, n=None):
+        """
+        Return views of the most recent n ticks (all stored ticks if n is None).
+        :return: Dictionary of field name -> NumPy view, oldest tick first.
+        """
+        start, stop = self._window(n)
+        return {field: getattr(self, field)[start:stop] for field in FIELDS}
+
+    def between(self, start_epoch=None, end_epoch=None):
+        """
+        Return views of the stored ticks with start_epoch <= epoch <= end_epoch.
+        :return: Dictionary of field name -> NumPy view, oldest tick first.
+        """
+        start, stop = self._window(None)
+        epochs = self.epoch[start:stop]
+        lo = 0 if start_epoch is None else np.searchsorted(epochs, start_epoch, side='left')
+        hi = len(epochs) if end_epoch is None else np.searchsorted(epochs, end_epoch, side='right')
+        return {field: getattr(self, field)[start + lo:start + hi] for field in FIELDS}
+
+    def get_state(self):
+        """Copies of the stored ticks (oldest first) and the total count, for snapshot files."""
+        state = {field: values.copy() for field, values in self.last().items()}
+        state['count'] = np.array(self.count, dtype=np.int64)
+        return state
+
+    def set_state(self, state):
+        """Replace the contents with ticks saved by get_state (the newest `capacity` are kept)."""
+        count = int(state['count'])
+        n = min(len(state['epoch']), self.capacity)
+        # Slot of the k-th most recent tick, so later appends continue the ring where it left off
+        slots = (count - n + np.arange(n)) % self.capacity
+        with self._lock:
+            for field in FIELDS:
+                values = np.asarray(state[field])[len(state[field]) - n:]
+                buffer = getattr(self, field)
+                buffer[slots] = values
+                buffer[slots + self.capacity] = values
+            self.count = count
+
+    def to_frame(self, n=None):
+        """Return the most recent n ticks as a DataFrame indexed by tick time."""
+        window = self.last(n)
+        df = pd.DataFrame({field: window[field].copy() for field in FIELDS})
+        df['time'] = pd.to_datetime(df['epoch'], unit='s')
+        df.set_index('time', inplace=True)
+        return df
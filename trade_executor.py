@@ -1,43 +1,213 @@
-# trade_executor.py
-
-import MetaTrader5 as mt5
-from config import MT5_LOGIN, MT5_PASSWORD, MT5_SERVER
-
-def connect_mt5():
-    if not mt5.initialize():
-        print("MT5 initialization failed")
-        return False
-    authorized = mt5.login(MT5_LOGIN, password=MT5_PASSWORD, server=MT5_SERVER)
-    if not authorized:
-        print("MT5 login failed")
-        return False
-    return True
-
-def place_trade(symbol, action, lot_size=0.1):
-    if not connect_mt5():
-        return
-    # Get the current price tick
-    tick = mt5.symbol_info_tick(symbol)
-    if tick is None:
-        print("No tick data for symbol:", symbol)
-        return
-    price = tick.ask if action.lower() == 'buy' else tick.bid
-    order_type = mt5.ORDER_TYPE_BUY if action.lower() == 'buy' else mt5.ORDER_TYPE_SELL
-
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": symbol,
-        "volume": lot_size,
-        "type": order_type,
-        "price": price,
-        "deviation": 10,
-        "magic": 234000,
-        "comment": "Trend detection trade",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
-    }
-    result = mt5.order_send(request)
-    if result.retcode == mt5.TRADE_RETCODE_DONE:
-        print(f"Trade executed: {action} {symbol} at {price}")
-    else:
-        print("Trade execution failed:", result)
+# trade_executor.py
+
+import logging
+import queue
+import threading
+import math
+import time
+from collections import deque
+
+from instrumentation import recorder
+from mt5_backend import connect_mt5, get_backend
+
+logger = logging.getLogger(__name__)
+
+class TradeExecutor:
+    """
+    Keeps one MT5 session open for the life of the process and sends market orders from a
+    dedicated worker thread, so callers never block on the terminal.
+    Request templates and symbol info are cached per symbol, and the submit-to-fill latency
+    of every order is recorded in `latencies` as (symbol, action, seconds).
+    :param price_source: Optional callable(symbol) -> (epoch, bid, ask, quote) of the latest streamed
+        tick (e.g. data_loader.latest_price). Orders are priced from it while it is at most
+        max_price_age seconds old, so they do not wait for a symbol_info_tick round trip.
+    :param backend: MT5 module or object, the active backend from mt5_backend by default.
+    """
+
+    def __init__(self, deviation=10, magic=234000, comment="Trend detection trade", max_latencies=1000,
+                 price_source=None, max_price_age=5.0, backend=None):
+        self._backend = backend
+        self.deviation = deviation
+        self.magic = magic
+        self.comment = comment
+        self.price_source = price_source
+        self.max_price_age = max_price_age
+        self.connected = False
+        self.symbol_info = {}
+        self.templates = {}
+        self.latencies = deque(maxlen=max_latencies)
+        self.orders = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    def _login(self):
+        """Initialize the terminal and log in; the credentials come from config.py."""
+        return connect_mt5()
+
+    def connect(self):
+        """Initialize and log in once; later calls reuse the session."""
+        with self._lock:
+            if not self.connected:
+                self.connected = self._login()
+            return self.connected
+
+    def get_symbol_info(self, symbol):
+        """Return cached symbol info, selecting the symbol in Market Watch on first use."""
+        info = self.symbol_info.get(symbol)
+        if info is None:
+            info = self.backend.symbol_info(symbol)
+            if info is not None and not info.visible:
+                self.backend.symbol_select(symbol, True)
+            self.symbol_info[symbol] = info
+        return info
+
+    def get_template(self, symbol, action):
+        """Return the pre-built order request for a symbol and action (without volume and price)."""
+        key = (symbol, action)
+        template = self.templates.get(key)
+        if template is None:
+            backend = self.backend
+            template = {
+                "action": backend.TRADE_ACTION_DEAL,
+                "symbol": symbol,
+                "type": backend.ORDER_TYPE_BUY if action == 'buy' else backend.ORDER_TYPE_SELL,
+                "deviation": self.deviation,
+                "magic": self.magic,
+                "comment": self.comment,
+                "type_time": backend.ORDER_TIME_GTC,
+                "type_filling": backend.ORDER_FILLING_IOC,
+            }
+            self.templates[key] = template
+        return template
+
+    def build_request(self, symbol, action, volume, price, position=None, **overrides):
+        """
+        Order request from the cached template with volume and price filled in.
+        :param position: Ticket of the position to close (hedging accounts).
+        :param overrides: Request fields replacing the template's, e.g. magic or comment.
+        """
+        request = dict(self.get_template(symbol, action), volume=volume, price=price, **overrides)
+        if position is not None:
+            request["position"] = position
+        return request
+
+    def normalize_volume(self, info, volume):
+        """Round lots down to the symbol's volume step and clamp them to its minimum and maximum."""
+        step = getattr(info, 'volume_step', 0) or 0
+        if step > 0:
+            volume = math.floor(round(volume / step, 8)) * step
+        volume = max(volume, getattr(info, 'volume_min', 0) or 0)
+        volume_max = getattr(info, 'volume_max', 0) or 0
+        if volume_max > 0:
+            volume = min(volume, volume_max)
+        return round(volume, 8)
+
+    def current_price(self, symbol, action, info=None, fresh=False):
+        """
+        Price for a market order: ask for buys, bid for sells. Taken from the latest streamed tick
+        when it is fresh (a tick without bid/ask is widened by the cached symbol spread), otherwise
+        from the terminal.
+        :param fresh: Always ask the terminal, e.g. after a requote.
+        :return: Price, or None if no price is available.
+        """
+        latest = self.price_source(symbol) if self.price_source is not None and not fresh else None
+        if latest is not None and time.time() - latest[0] <= self.max_price_age:
+            _, bid, ask, quote = latest
+            if math.isnan(bid) or math.isnan(ask):
+                half_spread = (getattr(info, 'spread', 0) or 0) * (getattr(info, 'point', 0) or 0) / 2
+                bid, ask = quote - half_spread, quote + half_spread
+            return ask if action == 'buy' else bid
+        tick = self.backend.symbol_info_tick(symbol)
+        if tick is None:
+            return None
+        return tick.ask if action == 'buy' else tick.bid
+
+    def order_send(self, request):
+        """
+        Send one prepared request to the terminal and record the round trip.
+        :return: The order_send result; None means the connection was lost and the next call logs in again.
+        """
+        sent_at = time.perf_counter()
+        result = self.backend.order_send(request)
+        recorder.record('order_send', request['symbol'], time.perf_counter() - sent_at)
+        if result is None:
+            self.connected = False
+        return result
+
+    def send(self, symbol, action, lot_size=0.1, price=None, submitted_at=None, position=None):
+        """
+        Send a market order synchronously on the current thread.
+        :param price: Order price; the current price (see current_price) when not given.
+        :param submitted_at: perf_counter() timestamp the latency is measured from.
+        :param position: Ticket of the position to close (hedging accounts), None to open or net.
+        :return: The order_send result, or None if the order could not be sent.
+        """
+        action = action.lower()
+        if submitted_at is None:
+            submitted_at = time.perf_counter()
+        if not self.connect():
+            return None
+        info = self.get_symbol_info(symbol)
+        if price is None:
+            price = self.current_price(symbol, action, info)
+            if price is None:
+                logger.warning("No tick data", extra={'symbol': symbol})
+                return None
+
+        result = self.order_send(self.build_request(symbol, action, lot_size, price, position))
+        latency = time.perf_counter() - submitted_at
+        if result is None:
+            logger.error("Trade execution failed: %s", self.backend.last_error(), extra={'symbol': symbol})
+            return None
+        self.latencies.append((symbol, action, latency))
+        recorder.record('submit_to_fill', symbol, latency)
+        if result.retcode == self.backend.TRADE_RETCODE_DONE:
+            logger.info("Trade executed", extra={'symbol': symbol, 'action': action, 'price': price,
+                                                 'latency_ms': round(latency * 1000, 1)})
+        else:
+            logger.error("Trade execution failed: %s", result, extra={'symbol': symbol})
+        return result
+
+    def submit(self, symbol, action, lot_size=0.1, price=None, callback=None, position=None):
+        """Queue a market order for the worker thread and return immediately."""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self.orders.put((symbol, action, lot_size, price, callback, time.perf_counter(), position))
+
+    def _run(self):
+        while True:
+            order = self.orders.get()
+            if order is None:
+                break
+            symbol, action, lot_size, price, callback, submitted_at, position = order
+            try:
+                result = self.send(symbol, action, lot_size, price, submitted_at, position)
+                if callback is not None:
+                    callback(result)
+            except Exception:
+                logger.exception("Error sending order", extra={'symbol': symbol})
+            finally:
+                self.orders.task_done()
+
+    def stop(self):
+        """Let the worker finish the queued orders and exit."""
+        if self._worker is not None and self._worker.is_alive():
+            self.orders.put(None)
+            self._worker.join()
+
+
+executor = TradeExecutor()  # Shared session used by place_trade
+
+
+def place_trade(symbol, action, lot_size=0.1):
+    """Send a market order through the shared, already logged-in executor session."""
+    return executor.send(symbol, action, lot_size)